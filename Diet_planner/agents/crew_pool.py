@@ -0,0 +1,138 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+from agents import registry
+from agents.llm_backends import FAKE_OUTPUTS, FakeCrewOutput, fake_llm, render_task_messages, use_fake_llm
+from profiling import profiler
+from prompts import token_ledger
+from ratelimit import llm_limiter
+
+
+class CrewPool:
+    """
+    Pool of ready-made single-agent crews.
+
+    kickoff() mutates the crew's Task objects, so a crew must never be shared
+    between concurrent requests. Each pooled crew is a copy of a template
+    crew (its own agent and task copies); a request checks one out, runs it
+    and returns it. When the pool is empty a fresh copy is built on demand.
+    The template, and with it the agent and task, is only built on warm()
+    or the first checkout.
+    """
+
+    def __init__(self, name, agent_name, task_name, size=4):
+        self.name = name
+        self.agent_name = agent_name
+        self.task_name = task_name
+        self.size = size
+        self._template = None
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._stats = {"builds": 0, "build_seconds": 0.0, "kickoffs": 0, "kickoff_seconds": 0.0,
+                       "checkout_seconds": 0.0, "pool_misses": 0}
+
+    def warm(self):
+        while self._idle.qsize() < self.size:
+            self._idle.put(self._build())
+
+    @contextmanager
+    def checkout(self):
+        started = time.perf_counter()
+        try:
+            crew = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self._stats["pool_misses"] += 1
+            crew = self._build()
+        with self._lock:
+            self._stats["checkout_seconds"] += time.perf_counter() - started
+        try:
+            yield crew
+        finally:
+            if self._idle.qsize() < self.size:
+                self._idle.put(crew)
+
+    def kickoff(self, inputs):
+        with self.checkout() as crew:
+            started = time.perf_counter()
+            try:
+                result = llm_limiter.call(self.agent_name, self._run, crew, inputs)
+            except Exception:
+                metrics.llm_errors.inc(self.agent_name)
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                metrics.kickoff_seconds.observe(elapsed, self.agent_name)
+                with self._lock:
+                    self._stats["kickoffs"] += 1
+                    self._stats["kickoff_seconds"] += elapsed
+        messages = render_task_messages(registry.get(self.agent_name), registry.get(self.task_name), inputs)
+        token_ledger.record_call(self.agent_name, messages, result.raw)
+        return result
+
+    def _run(self, crew, inputs):
+        if use_fake_llm():
+            return FakeCrewOutput(fake_llm(FAKE_OUTPUTS[self.agent_name]).complete([]))
+        if profiler.enabled:
+            return profiler.call(self.agent_name, crew.kickoff, inputs=inputs)
+        return crew.kickoff(inputs=inputs)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["idle"] = self._idle.qsize()
+        stats["size"] = self.size
+        stats["avg_build_ms"] = round(1000 * stats["build_seconds"] / stats["builds"], 3) if stats["builds"] else 0.0
+        stats["avg_kickoff_ms"] = round(1000 * stats["kickoff_seconds"] / stats["kickoffs"], 3) if stats["kickoffs"] else 0.0
+        stats["avg_checkout_ms"] = round(1000 * stats["checkout_seconds"] / stats["kickoffs"], 3) if stats["kickoffs"] else 0.0
+        return stats
+
+    def _get_template(self):
+        if self._template is None:
+            with self._lock:
+                if self._template is None:
+                    from crewai import Crew, Process
+
+                    agent = registry.get(self.agent_name)
+                    task = registry.get(self.task_name)
+                    self._template = Crew(agents=[agent], tasks=[task], process=Process.sequential, verbose=False)
+        return self._template
+
+    def _build(self):
+        template = self._get_template()
+        started = time.perf_counter()
+        crew = template.copy()
+        with self._lock:
+            self._stats["builds"] += 1
+            self._stats["build_seconds"] += time.perf_counter() - started
+        return crew
+
+
+CREW_POOL_SIZE = int(os.getenv("CREW_POOL_SIZE", os.getenv("AGENT_JOB_WORKERS", "4")))
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def register_pool(name, agent_name, task_name, size=CREW_POOL_SIZE):
+    with _pools_lock:
+        if name not in _pools:
+            _pools[name] = CrewPool(name, agent_name, task_name, size=size)
+        return _pools[name]
+
+
+def get_pool(name):
+    return _pools[name]
+
+
+def warm_pools():
+    for pool in list(_pools.values()):
+        pool.warm()
+
+
+def pool_stats():
+    return {name: pool.stats() for name, pool in _pools.items()}
@@ -0,0 +1,170 @@
+import os
+import re
+import time
+from textwrap import dedent
+
+SAMPLE_MEAL_PLAN = dedent("""
+    🍳 الفطور:
+    - بيضتان مسلوقتان
+    - شريحة خبز أسمر
+    - نصف كوب شوفان مع حليب اللوز ورشة قرفة
+
+    🍽️ الغداء:
+    - صدر دجاج مشوي (150 جم) متبل بالأعشاب
+    - طبق سلطة خضراء كبير مع زيت زيتون وخل
+    - 4 ملاعق أرز بني
+
+    🥣 العشاء:
+    - سمك مشوي (150 جم)
+    - طبق خضار مشكلة
+
+    🥕 سناكس:
+    - حفنة مكسرات غير مملحة
+
+    إجمالي السعرات الحرارية التقريبي للخطة: 1800-2000 سعرة حرارية
+""").strip()
+
+
+SAMPLE_MOTIVATION = (
+    "**💪 خطوة بخطوة نحو هدفك!**\n\n"
+    "يا أحمد، أنت قريب جدًا من هدفك، وكل يوم تلتزم فيه يقربك أكثر.\n\n"
+    "**💡 نصائح سريعة:**\n"
+    "* جهّز وجبة العشاء مسبقًا في الأيام المزدحمة.\n"
+    "* احمل وجبة خفيفة صحية معك.\n"
+    "* اشرب كوب ماء قبل كل وجبة.\n\n"
+    "**📚 مقالات مقترحة:**\n"
+    "* [10 خطوات لحياة أكثر صحة](https://www.mayoclinic.org/healthy-lifestyle/adult-health/in-depth/10-steps-to-a-healthier-life/art-20047764)\n"
+    "* [كيف تجعل الأكل الصحي ممتعًا؟](https://www.eatingwell.com/article/290634/how-to-make-healthy-eating-fun/)\n"
+    "* [فوائد الرياضة للصحة النفسية](https://www.helpguide.org/articles/healthy-living/the-mental-health-benefits-of-exercise.htm)"
+)
+
+# What the fake backend answers for each agent.
+FAKE_OUTPUTS = {
+    "meal_planner_agent": SAMPLE_MEAL_PLAN,
+    "tracker_agent": "72% 🟡👍",
+    "motivation_agent": SAMPLE_MOTIVATION,
+}
+
+
+class LiteLLMStream:
+    """
+    Streams a chat completion through litellm (the client crewai's LLM uses underneath).
+    """
+
+    def __init__(self, model, api_key=None, temperature=0, max_tokens=None):
+        self.model = model
+        self.api_key = api_key
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    def stream(self, messages):
+        import litellm
+
+        response = litellm.completion(
+            model=self.model, messages=messages, api_key=self.api_key,
+            temperature=self.temperature, max_tokens=self.max_tokens, stream=True
+        )
+        for chunk in response:
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
+
+    def complete(self, messages):
+        return "".join(self.stream(messages))
+
+
+class FakeStreamingLLM:
+    """
+    Deterministic offline stand-in for Gemini.
+
+    Emits `text` in `chunk_size`-character pieces, waiting `first_token_delay`
+    seconds before the first one and `chunk_delay` seconds between the rest,
+    or, with `tokens_per_second`, as long as that rate takes to produce the
+    piece.
+    """
+
+    def __init__(self, text=SAMPLE_MEAL_PLAN, first_token_delay=0.05, chunk_delay=0.01, chunk_size=8,
+                 tokens_per_second=None):
+        self.text = text
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+        self.tokens_per_second = tokens_per_second
+
+    def stream(self, messages):
+        if self.tokens_per_second:
+            from prompts import count_tokens
+        time.sleep(self.first_token_delay)
+        for start in range(0, len(self.text), self.chunk_size):
+            piece = self.text[start:start + self.chunk_size]
+            if start:
+                time.sleep(count_tokens(piece) / self.tokens_per_second if self.tokens_per_second else self.chunk_delay)
+            yield piece
+
+    def complete(self, messages):
+        return "".join(self.stream(messages))
+
+
+class FakeCrewOutput:
+    """
+    The part of crewai's CrewOutput the app reads.
+    """
+    __slots__ = ("raw",)
+
+    def __init__(self, raw):
+        self.raw = raw
+
+
+def use_fake_llm():
+    return os.getenv("LLM_BACKEND", "").lower() == "fake"
+
+
+def fake_llm(text=SAMPLE_MEAL_PLAN):
+    """
+    FakeStreamingLLM timed by FAKE_LLM_FIRST_TOKEN_DELAY and FAKE_LLM_CHUNK_DELAY or FAKE_LLM_TOKENS_PER_SECOND.
+    """
+    return FakeStreamingLLM(
+        text,
+        first_token_delay=float(os.getenv("FAKE_LLM_FIRST_TOKEN_DELAY", "0.05")),
+        chunk_delay=float(os.getenv("FAKE_LLM_CHUNK_DELAY", "0.01")),
+        tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "0")) or None
+    )
+
+
+def get_streaming_llm(agent):
+    """
+    Returns the streaming client for an agent, or the fake backend when LLM_BACKEND=fake.
+    """
+    if use_fake_llm():
+        return fake_llm()
+    llm = agent.llm
+    return LiteLLMStream(llm.model, api_key=llm.api_key, temperature=llm.temperature, max_tokens=llm.max_tokens)
+
+
+_PLACEHOLDER = re.compile(r"\{([A-Za-z_][A-Za-z0-9_\-]*)\}")
+
+
+def interpolate_inputs(template, inputs):
+    """
+    Fills `{name}` placeholders the way crewai interpolates task descriptions.
+
+    Unlike str.format, braces are not escapes: "{{name}}" becomes "{value}",
+    and braces around anything other than a name are left as they are.
+    Raises KeyError for a placeholder missing from `inputs`.
+    """
+    names = _PLACEHOLDER.findall(template)
+    missing = [name for name in names if name not in inputs]
+    if missing:
+        raise KeyError(f"Template variable '{missing[0]}' not found in inputs dictionary")
+    for name in dict.fromkeys(names):
+        template = template.replace("{" + name + "}", str(inputs[name]))
+    return template
+
+
+def render_task_messages(agent, task, inputs):
+    """
+    Builds the same system/user prompt the crew would send for a single-task run.
+    """
+    system = f"You are {agent.role}. {agent.backstory}\nYour personal goal is: {agent.goal}"
+    user = f"{interpolate_inputs(task.description, inputs)}\n\nThis is the expected criteria for your final answer: {task.expected_output}"
+    return [{"role": "system", "content": system}, {"role": "user", "content": user}]
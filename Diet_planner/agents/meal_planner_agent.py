@@ -1,35 +1,63 @@
 import os
-from dotenv import load_dotenv
-from crewai import Agent, Task, LLM
 from textwrap import dedent
 
-load_dotenv()
-meal_planner_agent = Agent(
-    role='خبير تغذية ومخطط وجبات',
-    goal=dedent("""
-        توليد خطط وجبات صحية ومخصصة للمستخدمين العرب، مع مراعاة
-        أهدافهم الصحية، تفضيلاتهم الغذائية، وحالتهم الطبية والحساسيات.
-    """),
-    backstory=dedent("""
-        أنت خبير تغذية معتمد ولديك سنوات من الخبرة في تصميم خطط وجبات
-        مغذية ولذيذة تساعد الأفراد على تحقيق أهدافهم الصحية، سواء كان ذلك
-        لفقدان الوزن، زيادة الوزن، أو الحفاظ عليه. تتميز بقدرتك على
-        تخصيص الخطط لتناسب الاحتياجات الفردية، بما في ذلك أنواع الحمية
-        المختلفة والحساسيات الغذائية والحالات الطبية.
-    """),
-    verbose=True,
-    allow_delegation=False,
-    llm=LLM(
-        model="gemini/gemini-2.0-flash",
-        api_key=os.getenv("GEMINI_API_KEY"),
-        temperature=0
+from agents import registry
+from canonical import canonicalize
+from energy import canonical_goal, energy_targets
+
+
+MEAL_PLANNER_MAX_TOKENS = int(os.getenv("MEAL_PLANNER_MAX_TOKENS", "1200"))
+
+
+def build_meal_planner_agent():
+    from crewai import Agent, LLM
+
+    return Agent(
+        role='خبير تغذية ومخطط وجبات',
+        goal=dedent("""
+            توليد خطط وجبات صحية ومخصصة للمستخدمين العرب، مع مراعاة
+            أهدافهم الصحية، تفضيلاتهم الغذائية، وحالتهم الطبية والحساسيات.
+        """),
+        backstory=dedent("""
+            أنت خبير تغذية معتمد ولديك سنوات من الخبرة في تصميم خطط وجبات
+            مغذية ولذيذة تساعد الأفراد على تحقيق أهدافهم الصحية، سواء كان ذلك
+            لفقدان الوزن، زيادة الوزن، أو الحفاظ عليه. تتميز بقدرتك على
+            تخصيص الخطط لتناسب الاحتياجات الفردية، بما في ذلك أنواع الحمية
+            المختلفة والحساسيات الغذائية والحالات الطبية.
+        """),
+        verbose=True,
+        allow_delegation=False,
+        llm=LLM(
+            model="gemini/gemini-2.0-flash",
+            api_key=os.getenv("GEMINI_API_KEY"),
+            temperature=0,
+            max_tokens=MEAL_PLANNER_MAX_TOKENS
+        )
     )
-)
 
 def prepare_inputs(user_data):
     """
     يحضر المدخلات لوكيل مخطط الوجبات.
+
+    Diet type, allergies and conditions are reduced to their canonical
+    labels (canonical.py). With a bucketed prompt version the body
+    measurements and name are replaced by the profile's calorie band and
+    macro targets (energy.py), so profiles in the same band share one cached plan.
     """
+    user_data = canonicalize(user_data)
+    if MEAL_PLAN_PROMPT_VERSION in BUCKETED_PROMPT_VERSIONS:
+        targets = energy_targets(user_data)
+        return {
+            "goal": canonical_goal(user_data.get("goal")),
+            "calorie_min": targets["calorie_min"],
+            "calorie_max": targets["calorie_max"],
+            "protein_g": targets["protein_g"],
+            "carbs_g": targets["carbs_g"],
+            "fat_g": targets["fat_g"],
+            "diet_type": user_data.get("diet_type"),
+            "allergy": user_data.get("allergy"),
+            "conditions": user_data.get("conditions")
+        }
     return {
         "name": user_data.get("name", "الزائر"),
         "weight": user_data.get("weight"),
@@ -43,8 +71,7 @@ def prepare_inputs(user_data):
         "conditions": user_data.get("conditions")
     }
 
-generate_meal_plan_task = Task(
-    description=dedent("""
+GENERATE_MEAL_PLAN_DESCRIPTION = dedent("""
         بناءً على معلومات المستخدم التالية:
         الاسم: {name}
         الوزن: {weight} كجم
@@ -99,8 +126,90 @@ generate_meal_plan_task = Task(
 
         إجمالي السعرات الحرارية التقريبي للخطة: 1800-2000 سعرة حرارية
         ---
-    """),
-    agent=meal_planner_agent,
-    expected_output="str",
-    async_execution=False
-)
+    """)
+
+
+GENERATE_MEAL_PLAN_COMPACT_DESCRIPTION = dedent("""
+        المستخدم: {name}، {sex}، {age} سنة، {weight} كجم، {height} سم، النشاط: {activity_level}.
+        الهدف: {goal}. النظام الغذائي: {diet_type}. الحساسيات: {allergy}. الحالات الطبية: {conditions}.
+
+        اكتب خطة وجبات ليوم واحد واقعية بالعربية الفصحى المبسطة تراعي كل ما سبق.
+        نص عادي فقط: بلا Markdown ولا JSON ولا مقدمات.
+        كل قسم في سطر مستقل: 🍳 الفطور: / 🍽️ الغداء: / 🥣 العشاء: / 🥕 سناكس: / 🍐 تحلية: (اختيارية)،
+        وتحته العناصر بكمياتها، كل عنصر في سطر يبدأ بـ "- ".
+        السطر الأخير: إجمالي السعرات الحرارية التقريبي للخطة: <من>-<إلى> سعرة حرارية
+    """)
+
+GENERATE_MEAL_PLAN_BUCKETED_DESCRIPTION = GENERATE_MEAL_PLAN_DESCRIPTION.replace(dedent("""
+        الاسم: {name}
+        الوزن: {weight} كجم
+        الطول: {height} سم
+        العمر: {age} سنة
+        الجنس: {sex}
+        مستوى النشاط: {activity_level}
+        الهدف: {goal}
+    """), dedent("""
+        الهدف: {goal}
+        السعرات اليومية المستهدفة: {calorie_min}-{calorie_max} سعرة حرارية
+        البروتين: {protein_g} جم، الكربوهيدرات: {carbs_g} جم، الدهون: {fat_g} جم
+    """)).replace("1800-2000 سعرة حرارية", "{calorie_min}-{calorie_max} سعرة حرارية")
+
+GENERATE_MEAL_PLAN_BUCKETED_COMPACT_DESCRIPTION = dedent("""
+        الهدف: {goal}. السعرات المستهدفة: {calorie_min}-{calorie_max} سعرة حرارية
+        (بروتين {protein_g} جم، كربوهيدرات {carbs_g} جم، دهون {fat_g} جم).
+        النظام الغذائي: {diet_type}. الحساسيات: {allergy}. الحالات الطبية: {conditions}.
+
+        اكتب خطة وجبات ليوم واحد واقعية بالعربية الفصحى المبسطة تراعي كل ما سبق.
+        نص عادي فقط: بلا Markdown ولا JSON ولا مقدمات.
+        كل قسم في سطر مستقل: 🍳 الفطور: / 🍽️ الغداء: / 🥣 العشاء: / 🥕 سناكس: / 🍐 تحلية: (اختيارية)،
+        وتحته العناصر بكمياتها، كل عنصر في سطر يبدأ بـ "- ".
+        السطر الأخير: إجمالي السعرات الحرارية التقريبي للخطة: <من>-<إلى> سعرة حرارية
+    """)
+
+# Every version that was ever served stays here: the version is part of the
+# plan-cache key, so changing a template means adding a new version.
+GENERATE_MEAL_PLAN_PROMPTS = {
+    "1": GENERATE_MEAL_PLAN_DESCRIPTION,
+    "2": GENERATE_MEAL_PLAN_COMPACT_DESCRIPTION,
+    "3": GENERATE_MEAL_PLAN_BUCKETED_DESCRIPTION,
+    "4": GENERATE_MEAL_PLAN_BUCKETED_COMPACT_DESCRIPTION,
+}
+# Versions rendered from calorie-band inputs instead of the raw profile (see prepare_inputs).
+BUCKETED_PROMPT_VERSIONS = {"3", "4"}
+MEAL_PLAN_PROMPT_VERSION = os.getenv("MEAL_PLAN_PROMPT_VERSION", "3")
+
+# Appended to the selected version for days 2..N of a multi-day plan (day 1 uses the plain task,
+# so it shares the single-day plan cache).
+WEEK_DAY_SUFFIX = dedent("""
+        هذه خطة اليوم {day_number} من خطة متعددة الأيام؛ نوّع الوجبات عن باقي الأيام.
+        ركّز في بروتينات هذا اليوم على: {day_focus} (إن كان ذلك يناسب النظام الغذائي والحساسيات).
+        تجنب تكرار هذه الأصناف: {avoid_items}.
+    """)
+
+
+def build_generate_meal_plan_task():
+    from crewai import Task
+
+    return Task(
+        description=GENERATE_MEAL_PLAN_PROMPTS[MEAL_PLAN_PROMPT_VERSION],
+        agent=registry.get("meal_planner_agent"),
+        expected_output="str",
+        async_execution=False
+    )
+
+
+def build_generate_week_day_task():
+    from crewai import Task
+
+    return Task(
+        description=GENERATE_MEAL_PLAN_PROMPTS[MEAL_PLAN_PROMPT_VERSION] + WEEK_DAY_SUFFIX,
+        agent=registry.get("meal_planner_agent"),
+        expected_output="str",
+        async_execution=False
+    )
+
+
+registry.register("meal_planner_agent", build_meal_planner_agent)
+registry.register("generate_meal_plan_task", build_generate_meal_plan_task)
+registry.register("generate_week_day_task", build_generate_week_day_task)
+__getattr__ = registry.lazy_module_getattr({"meal_planner_agent", "generate_meal_plan_task", "generate_week_day_task"})
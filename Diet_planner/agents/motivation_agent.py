@@ -1,31 +1,38 @@
 import os
-from dotenv import load_dotenv
-from crewai import Agent, Task ,LLM
 from textwrap import dedent
 
-load_dotenv()
-motivation_agent = Agent(
-    role='خبير تحفيز صحي وتغذوي',
-    goal=dedent("""
-        تقديم رسائل تحفيزية مخصصة ونصائح عملية ومقالات مفيدة
-        للمستخدم العربي بأسلوب مشجع وداعم وسهل القراءة.
-    """),
-    backstory=dedent("""
-        أنت خبير في مجال التحفيز النفسي والسلوك الصحي.
-        تساعد الأشخاص على تخطي التحديات وتحقيق أهدافهم الصحية
-        من خلال الدعم الإيجابي، الإرشادات البسيطة، والمصادر المفيدة.
-    """),
-    verbose=True,
-    allow_delegation=False,
-    llm=LLM(
-        model="gemini/gemini-2.0-flash",
-        api_key=os.getenv("GEMINI_API_KEY"),
-        temperature=0
+from agents import registry
+
+
+MOTIVATION_MAX_TOKENS = int(os.getenv("MOTIVATION_MAX_TOKENS", "700"))
+
+
+def build_motivation_agent():
+    from crewai import Agent, LLM
+
+    return Agent(
+        role='خبير تحفيز صحي وتغذوي',
+        goal=dedent("""
+            تقديم رسائل تحفيزية مخصصة ونصائح عملية ومقالات مفيدة
+            للمستخدم العربي بأسلوب مشجع وداعم وسهل القراءة.
+        """),
+        backstory=dedent("""
+            أنت خبير في مجال التحفيز النفسي والسلوك الصحي.
+            تساعد الأشخاص على تخطي التحديات وتحقيق أهدافهم الصحية
+            من خلال الدعم الإيجابي، الإرشادات البسيطة، والمصادر المفيدة.
+        """),
+        verbose=True,
+        allow_delegation=False,
+        llm=LLM(
+            model="gemini/gemini-2.0-flash",
+            api_key=os.getenv("GEMINI_API_KEY"),
+            temperature=0,
+            max_tokens=MOTIVATION_MAX_TOKENS
+        )
     )
-)
 
-motivate_user_task = Task(
-    description=dedent("""
+
+MOTIVATE_USER_DESCRIPTION = dedent("""
         أنت الآن بصدد توليد رسالة تحفيزية للمستخدم {username} (إذا توفر الاسم).
         لديك معلومات حول نسبة التزام المستخدم داخلياً لتكييف رسالتك،
         **ولكن لا تقم بذكر النسبة المئوية للالتزام بشكل صريح في الناتج النهائي.**
@@ -64,8 +71,36 @@ motivate_user_task = Task(
         * [فوائد ممارسة الرياضة للصحة النفسية](https://www.helpguide.org/articles/healthy-living/the-mental-health-benefits-of-exercise.htm)
         * [كيفية التغلب على التسويف في تحقيق الأهداف](https://www.mindtools.com/a5444x0/overcoming-procrastination)
         ---
-    """),
-    agent=motivation_agent,
-    expected_output="str",
-    async_execution=False
-)
+    """)
+
+
+MOTIVATE_USER_COMPACT_DESCRIPTION = dedent("""
+        اكتب رسالة تحفيزية بالعربية الفصحى المبسطة وبتنسيق Markdown للمستخدم {username}.
+        نسبة التزامه {commitment_percentage}% للاستخدام الداخلي فقط ولا تذكرها:
+        ≥85 شجّع على الاستمرار، 70-84 ادعم التحسن، 50-69 اقترح خطوات عملية، <50 ابنِ الثقة بخطوات صغيرة.
+        الأقسام بالترتيب: **💪 عنوان قصير** ثم فقرة قصيرة، **💡 نصائح سريعة:** 3-4 نقاط،
+        **📚 مقالات مقترحة:** 3-4 مقالات حقيقية بصيغة [العنوان](الرابط).
+        بلا JSON ولا مقدمات.
+    """)
+
+MOTIVATE_USER_PROMPTS = {
+    "1": MOTIVATE_USER_DESCRIPTION,
+    "2": MOTIVATE_USER_COMPACT_DESCRIPTION,
+}
+MOTIVATE_USER_PROMPT_VERSION = os.getenv("MOTIVATE_USER_PROMPT_VERSION", "1")
+
+
+def build_motivate_user_task():
+    from crewai import Task
+
+    return Task(
+        description=MOTIVATE_USER_PROMPTS[MOTIVATE_USER_PROMPT_VERSION],
+        agent=registry.get("motivation_agent"),
+        expected_output="str",
+        async_execution=False
+    )
+
+
+registry.register("motivation_agent", build_motivation_agent)
+registry.register("motivate_user_task", build_motivate_user_task)
+__getattr__ = registry.lazy_module_getattr({"motivation_agent", "motivate_user_task"})
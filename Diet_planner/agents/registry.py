@@ -0,0 +1,63 @@
+import threading
+import time
+
+_builders = {}
+_instances = {}
+_build_seconds = {}
+_lock = threading.RLock()
+_env_loaded = False
+
+
+def register(name, builder):
+    """
+    Registers a zero-argument builder; the object is built on first get(name).
+    """
+    _builders[name] = builder
+
+
+def get(name):
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    with _lock:
+        if name not in _instances:
+            _load_env()
+            started = time.perf_counter()
+            _instances[name] = _builders[name]()
+            _build_seconds[name] = time.perf_counter() - started
+        return _instances[name]
+
+
+def is_built(name):
+    return name in _instances
+
+
+def warm_up(names=None):
+    """
+    Builds the given (default: all registered) agents and tasks now instead of on first use.
+    """
+    for name in list(names or _builders):
+        get(name)
+
+
+def build_timings():
+    return {name: round(seconds * 1000, 3) for name, seconds in _build_seconds.items()}
+
+
+def _load_env():
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
+def lazy_module_getattr(names):
+    """
+    Module __getattr__ (PEP 562) that resolves the given attribute names through the registry.
+    """
+    def __getattr__(attr):
+        if attr in names:
+            return get(attr)
+        raise AttributeError(attr)
+    return __getattr__
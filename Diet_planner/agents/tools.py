@@ -1,7 +1,70 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from crewai.tools import BaseTool
 import os
 import json
+import threading
+
+from cache import TTLCache, make_cache_key
+
+SPOONACULAR_BASE_URL = os.getenv("SPOONACULAR_BASE_URL", "https://api.spoonacular.com")
+SPOONACULAR_TIMEOUT = (
+    float(os.getenv("SPOONACULAR_CONNECT_TIMEOUT", "3.05")),
+    float(os.getenv("SPOONACULAR_READ_TIMEOUT", "10"))
+)
+NUTRIENT_FIELDS = {"calories": "calories", "protein": "protein", "carbohydrates": "carbs", "fat": "fats"}
+
+spoonacular_cache = TTLCache(
+    os.getenv("SPOONACULAR_CACHE_PATH", "spoonacular_cache.db"),
+    table="recipes",
+    max_items=int(os.getenv("SPOONACULAR_CACHE_MAX_ITEMS", "512")),
+    ttl=int(os.getenv("SPOONACULAR_CACHE_TTL", str(24 * 3600)))
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Shared keep-alive session that retries 429/5xx responses with exponential backoff.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = Retry(
+                    total=int(os.getenv("SPOONACULAR_RETRIES", "3")),
+                    backoff_factor=0.5,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=frozenset(["GET"]),
+                    respect_retry_after_header=True,
+                    raise_on_status=False
+                )
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def extract_recipe(recipe):
+    amounts = {}
+    for nutrient in recipe.get("nutrition", {}).get("nutrients", []):
+        field = NUTRIENT_FIELDS.get(str(nutrient.get("name", "")).lower())
+        if field and field not in amounts:
+            amounts[field] = nutrient.get("amount")
+    return {
+        "title": recipe.get("title"),
+        "link": recipe.get("sourceUrl"),
+        "calories": amounts.get("calories", "N/A"),
+        "protein": amounts.get("protein", "N/A"),
+        "carbs": amounts.get("carbs", "N/A"),
+        "fats": amounts.get("fats", "N/A")
+    }
+
 
 class SpoonacularTool(BaseTool):
     name: str = "Spoonacular Recipe Finder"
@@ -23,7 +86,14 @@ class SpoonacularTool(BaseTool):
         intolerances = query_data.get("allergy", "")  # or 'intolerances'
         max_calories = query_data.get("calories", "")
 
-        url = "https://api.spoonacular.com/recipes/complexSearch"
+        cache_key = make_cache_key({
+            "query": keyword, "diet": diet_type, "intolerances": intolerances, "maxCalories": max_calories
+        })
+        cached = spoonacular_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        url = f"{SPOONACULAR_BASE_URL}/recipes/complexSearch"
         params = {
             "query": keyword,
             "number": 5,
@@ -35,34 +105,25 @@ class SpoonacularTool(BaseTool):
             "maxCalories": max_calories
         }
 
-        response = requests.get(url, params=params)
+        try:
+            response = get_session().get(url, params=params, timeout=SPOONACULAR_TIMEOUT)
+        except requests.RequestException as e:
+            return json.dumps([{"error": f"Error contacting Spoonacular API: {e}"}])
         if response.status_code != 200:
             return json.dumps([{
                 "error": f"Error from Spoonacular API: {response.status_code} - {response.text}"
             }])
 
-        data = response.json()
+        try:
+            data = response.json()
+        except ValueError:
+            return json.dumps([{
+                "error": f"Error from Spoonacular API: {response.status_code} - {response.text}"
+            }])
         results = data.get("results", [])
         if not results:
             return json.dumps([{"error": "No recipe found."}])
 
-        recipes = []
-        for recipe in results:
-            nutrients = recipe.get("nutrition", {}).get("nutrients", [])
-
-            def get_nutrient(name):
-                for n in nutrients:
-                    if n["name"].lower() == name.lower():
-                        return n["amount"]
-                return "N/A"
-
-            recipes.append({
-                "title": recipe.get("title"),
-                "link": recipe.get("sourceUrl"),
-                "calories": get_nutrient("Calories"),
-                "protein": get_nutrient("Protein"),
-                "carbs": get_nutrient("Carbohydrates"),
-                "fats": get_nutrient("Fat")
-            })
-
-        return json.dumps(recipes)
+        recipes = json.dumps([extract_recipe(recipe) for recipe in results])
+        spoonacular_cache.set(cache_key, recipes)
+        return recipes
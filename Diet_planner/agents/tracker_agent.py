@@ -1,41 +1,74 @@
-from crewai import Agent, Task
-from crewai.llm import LLM
-from dotenv import load_dotenv
 import os
 
-load_dotenv()
-
-tracker_agent = Agent(
-    role="متابع خطة التغذية",
-    goal="تقييم مدى التزام المستخدم بالخطة الغذائية اليومية بشكل رقمي فقط بدون تقديم توصيات إضافية أو نصائح.",
-    backstory="خبير تحليل تغذية يقوم بمقارنة الخطة الغذائية المقترحة بما تناوله المستخدم فعليًا لحساب نسبة الالتزام فقط.",
-    verbose=True,
-    allow_delegation=False,
-    llm=LLM(
-        model="gemini/gemini-2.0-flash",
-        api_key=os.getenv("GEMINI_API_KEY"),
-        temperature=0
+from agents import registry
+
+
+TRACKER_MAX_TOKENS = int(os.getenv("TRACKER_MAX_TOKENS", "32"))
+
+
+def build_tracker_agent():
+    from crewai import Agent
+    from crewai.llm import LLM
+
+    return Agent(
+        role="متابع خطة التغذية",
+        goal="تقييم مدى التزام المستخدم بالخطة الغذائية اليومية بشكل رقمي فقط بدون تقديم توصيات إضافية أو نصائح.",
+        backstory="خبير تحليل تغذية يقوم بمقارنة الخطة الغذائية المقترحة بما تناوله المستخدم فعليًا لحساب نسبة الالتزام فقط.",
+        verbose=True,
+        allow_delegation=False,
+        llm=LLM(
+            model="gemini/gemini-2.0-flash",
+            api_key=os.getenv("GEMINI_API_KEY"),
+            temperature=0,
+            max_tokens=TRACKER_MAX_TOKENS
+        )
     )
+
+
+TRACK_PROGRESS_DESCRIPTION = (
+    "قارن بين الخطة الغذائية المقترحة للمستخدم (تشمل الوجبات والمكونات فقط) "
+    "وما تم تناوله فعليًا خلال اليوم. احسب نسبة الالتزام كنسبة مئوية دقيقة (مثلاً: 80%).\n"
+    "- لا تقدم أي توصيات أو نصائح أو تحفيز.\n"
+    "- أخرج النسبة في سطر واحد فقط، متبوعًا بإيموجي يعكس مستوى الالتزام:\n"
+    "  🟢🔥 إذا كانت النسبة 85% أو أكثر\n"
+    "  🟡👍 إذا كانت بين 70% و84%\n"
+    "  🟠⚠️ إذا كانت بين 50% و69%\n"
+    "  🔴❌ إذا كانت أقل من 50%\n\n"
+    "الخطة الغذائية المقترحة:\n"
+    "{{planned_meal}}\n\n"
+    "ما تم تناوله فعليًا:\n"
+    "{{eaten_meal}}\n\n"
+    "العوامل الخارجية:\n"
+    "{{external_factors}}"
 )
 
-track_progress_task = Task(
-    description=(
-        "قارن بين الخطة الغذائية المقترحة للمستخدم (تشمل الوجبات والمكونات فقط) "
-        "وما تم تناوله فعليًا خلال اليوم. احسب نسبة الالتزام كنسبة مئوية دقيقة (مثلاً: 80%).\n"
-        "- لا تقدم أي توصيات أو نصائح أو تحفيز.\n"
-        "- أخرج النسبة في سطر واحد فقط، متبوعًا بإيموجي يعكس مستوى الالتزام:\n"
-        "  🟢🔥 إذا كانت النسبة 85% أو أكثر\n"
-        "  🟡👍 إذا كانت بين 70% و84%\n"
-        "  🟠⚠️ إذا كانت بين 50% و69%\n"
-        "  🔴❌ إذا كانت أقل من 50%\n\n"
-        "الخطة الغذائية المقترحة:\n"
-        "{{planned_meal}}\n\n"
-        "ما تم تناوله فعليًا:\n"
-        "{{eaten_meal}}\n\n"
-        "العوامل الخارجية:\n"
-        "{{external_factors}}"
-    ),
-    expected_output="سطر واحد فقط يحتوي على النسبة المئوية + الإيموجي المناسب بدون شرح أو تعليق.",
-    agent=tracker_agent,
-    inputs=["planned_meal", "eaten_meal", "external_factors"]
+
+TRACK_PROGRESS_COMPACT_DESCRIPTION = (
+    "احسب نسبة التزام المستخدم بالخطة الغذائية. أجب بسطر واحد: النسبة ثم الإيموجي "
+    "(🟢🔥 ≥85%، 🟡👍 70-84%، 🟠⚠️ 50-69%، 🔴❌ <50%) بلا شرح.\n"
+    "الخطة: {planned_meal}\n"
+    "ما تم تناوله: {eaten_meal}\n"
+    "عوامل خارجية: {external_factors}"
 )
+
+TRACK_PROGRESS_PROMPTS = {
+    "1": TRACK_PROGRESS_DESCRIPTION,
+    "2": TRACK_PROGRESS_COMPACT_DESCRIPTION,
+}
+TRACK_PROGRESS_PROMPT_VERSION = os.getenv("TRACK_PROGRESS_PROMPT_VERSION", "1")
+
+
+def build_track_progress_task():
+    from crewai import Task
+
+    return Task(
+        description=TRACK_PROGRESS_PROMPTS[TRACK_PROGRESS_PROMPT_VERSION],
+        expected_output="سطر واحد فقط يحتوي على النسبة المئوية + الإيموجي المناسب بدون شرح أو تعليق.",
+        agent=registry.get("tracker_agent"),
+        inputs=["planned_meal", "eaten_meal", "external_factors"]
+    )
+
+
+registry.register("tracker_agent", build_tracker_agent)
+registry.register("track_progress_task", build_track_progress_task)
+__getattr__ = registry.lazy_module_getattr({"tracker_agent", "track_progress_task"})
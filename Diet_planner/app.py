@@ -1,23 +1,49 @@
+from startup import mark, startup_report
 import dash
 from dash import dcc
 from dash import html
-from dash.dependencies import Input, Output, State
+from dash.dependencies import Input, Output, State, ClientsideFunction
 import dash_bootstrap_components as dbc
 import os
 from dotenv import load_dotenv
 import traceback
 import re
-import plotly.graph_objects as go
 from datetime import datetime
 import time
-from crewai import Crew, Process
+from flask import Response, stream_with_context
 
 
-from agents.meal_planner_agent import meal_planner_agent, generate_meal_plan_task, prepare_inputs
-from agents.tracker_agent import tracker_agent, track_progress_task
-from agents.motivation_agent import motivation_agent, motivate_user_task
+from agents import registry
+from agents.meal_planner_agent import prepare_inputs
+import agents.tracker_agent
+import agents.motivation_agent
+from agents.crew_pool import register_pool, warm_pools, pool_stats
+from cache import plan_cache, make_cache_key
+from planner import generate_meal_plan_text, generate_week_plan_texts
+from singleflight import get_flight, inflight_snapshot
+from jobs import job_manager, DONE, FAILED, CANCELLED, FINISHED_STATES, JOB_LOST
+from streaming import stream_registry, sse_events
+from scoring import score_commitment
+from meal_plan import parse_meal_plan, load_meal_plan, load_day_plan, combine_day_plans
+from reports import render_report
+from pdf_exporter import render_pdf_report
+from session import session_store, new_session_id, valid_id
+from history import history_store
+from motivation import motivation_library
+import auth
+from nutrition import get_nutrition_index
+from prompts import token_ledger, template_stats
+from ratelimit import llm_limiter
+import metrics
+from metrics import timed_callback
 
 load_dotenv(dotenv_path="./.env")
+mark("imports")
+
+tracker_pool = register_pool("tracker", "tracker_agent", "track_progress_task")
+motivation_pool = register_pool("motivation", "motivation_agent", "motivate_user_task")
+tracker_flight = get_flight("tracker")
+motivation_flight = get_flight("motivation")
 
 app = dash.Dash(__name__,
                 external_stylesheets=[dbc.themes.BOOTSTRAP],
@@ -25,6 +51,68 @@ app = dash.Dash(__name__,
                 meta_tags=[{'name': 'viewport',
                             'content': 'width=device-width, initial-scale=1.0'}])
 server = app.server 
+auth.init_app(server)
+mark("dash_app")
+
+EMPTY_FIGURE = {"data": [], "layout": {}}
+
+
+@server.route("/cache/stats")
+def cache_stats():
+    return plan_cache.stats()
+
+
+@server.route("/sessions/stats")
+def sessions_stats():
+    return session_store.stats()
+
+
+@server.route("/crews/stats")
+def crews_stats():
+    return pool_stats()
+
+
+@server.route("/startup")
+def startup_timings():
+    return startup_report()
+
+
+@server.route("/inflight")
+def inflight():
+    return inflight_snapshot()
+
+
+@server.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@server.route("/tokens")
+def token_usage():
+    return {"templates": template_stats(), "usage": token_ledger.stats()}
+
+
+@server.route("/jobs/<job_id>")
+def job_status(job_id):
+    status = job_manager.status(job_id)
+    if status is None: return {"error": "job not found"}, 404
+    status.pop("result", None)
+    return status
+
+
+@server.route("/stream/meal-plan/<job_id>")
+def stream_meal_plan(job_id):
+    job = job_manager.get(job_id)
+    if job is None or not job.streaming: return {"error": "job not found"}, 404
+    buffer = stream_registry.get_or_create(job_id)
+    return Response(stream_with_context(sse_events(buffer)), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+JOB_POLL_INTERVAL_MS = 1000
+MEAL_PLAN_STREAMING = os.getenv("MEAL_PLAN_STREAMING", "1") == "1"
+TRACKER_LLM_FALLBACK = os.getenv("TRACKER_LLM_FALLBACK", "1") == "1"
+TRACKER_MIN_CONFIDENCE = float(os.getenv("TRACKER_MIN_CONFIDENCE", "0.5"))
 
 
 PAGE_ORDER = ['/', '/meal-planner', '/tracker', '/motivation']
@@ -142,6 +230,8 @@ def get_main_layout():
                         html.H3("تقريرك الشامل", className="text-center my-4"),
                         dbc.Button("تحميل تقرير شامل (HTML)", id="download-report-button", color="warning", className="w-100 mb-4"),
                         dcc.Download(id="download-html-report"),
+                        dbc.Button("تحميل تقرير شامل (PDF)", id="download-pdf-button", color="warning", outline=True, className="w-100 mb-4"),
+                        dcc.Download(id="download-pdf-report"),
                         html.Div(id="download-report-status",
                                      style={'color': 'white', 'text-align': 'center', 'margin-top': '10px'})
                     ], style={'background-color': 'rgba(0,0,0,0.4)', 'padding': '20px', 'border-radius': '10px'}),
@@ -229,8 +319,26 @@ meal_planner_layout = html.Div(
                                 dbc.Col(dbc.Label("الحالات الطبية (افصل بفاصلة):", className="form-group"), width=3),
                                 dbc.Col(dbc.Input(id="conditions-input", type="text", placeholder="مثال: سكري، ضغط", className="form-control"), width=9)
                             ], className="mb-3"),
-                            dbc.Button("توليد خطة الوجبات", id="generate-meal-plan-button", color="primary", className="mt-3 w-100")
+                            dbc.Row([
+                                dbc.Col(dbc.Label("مدة الخطة:", className="form-group"), width=3),
+                                dbc.Col(dcc.Dropdown(
+                                    id="plan-days-input",
+                                    options=[
+                                        {'label': 'يوم واحد', 'value': 1},
+                                        {'label': '3 أيام', 'value': 3},
+                                        {'label': 'أسبوع', 'value': 7}
+                                    ],
+                                    value=1,
+                                    clearable=False,
+                                    className="dash-dropdown"
+                                ), width=9)
+                            ], className="mb-3"),
+                            dbc.Button("توليد خطة الوجبات", id="generate-meal-plan-button", color="primary", className="mt-3 w-100"),
+                            dbc.Button("إلغاء", id="cancel-meal-plan-button", color="secondary", outline=True, className="mt-2 w-100")
                         ]),
+                        dcc.Store(id="meal-plan-job-store"),
+                        dcc.Store(id="meal-plan-stream-store"),
+                        dcc.Interval(id="meal-plan-job-interval", interval=JOB_POLL_INTERVAL_MS, disabled=True),
                         html.Hr(),
                         html.Div(id="meal-plan-output", style={'white-space': 'pre-wrap', 'direction': 'rtl', 'text-align': 'right', 'color': '#333'}),
                         html.Div(id="meal-plan-error-output", style={'color': 'red', 'white-space': 'pre-wrap', 'direction': 'rtl', 'text-align': 'right', 'marginTop': '10px'})
@@ -258,7 +366,10 @@ tracker_layout = html.Div(
                         dcc.Textarea(id="eaten-meal-input", style={'width': '100%', 'height': 150}, placeholder="اذكر ما تناولته فعليًا خلال اليوم (مثال: إفطار: بيض، غداء: دجاج وأرز...).", className="dcc-textarea"),
                         dbc.Label("العوامل الخارجية التي أثرت على التزامك (اختياري):", className="form-group"),
                         dcc.Textarea(id="external-factors-input", style={'width': '100%', 'height': 100}, placeholder="مثال: ضغط عمل، مناسبات اجتماعية...", className="dcc-textarea"),
-                        dbc.Button("تقييم الالتزام", id="evaluate-commitment-button", color="success", className="mt-3 w-100")
+                        dbc.Button("تقييم الالتزام", id="evaluate-commitment-button", color="success", className="mt-3 w-100"),
+                        dbc.Button("إلغاء", id="cancel-commitment-button", color="secondary", outline=True, className="mt-2 w-100"),
+                        dcc.Store(id="tracker-job-store"),
+                        dcc.Interval(id="tracker-job-interval", interval=JOB_POLL_INTERVAL_MS, disabled=True)
                     ]),
                     style={'background-color': 'rgba(255,255,255,0.85)', 'border-radius': '10px'}
                 ),
@@ -266,6 +377,24 @@ tracker_layout = html.Div(
                 dcc.Graph(id='commitment-pie-chart', config={'displayModeBar': False}),
                 html.Div(id="tracker-output", style={'white-space': 'pre-wrap', 'direction': 'rtl', 'text-align': 'center', 'color': '#333', 'font-size': '1.8em', 'font-weight': 'bold', 'marginTop': '10px'}),
                 html.Div(id="tracker-error-output", style={'color': 'red', 'white-space': 'pre-wrap', 'direction': 'rtl', 'text-align': 'right', 'marginTop': '10px'}),
+                dbc.Card(
+                    dbc.CardBody([
+                        html.H5("تطور الالتزام", className="text-center"),
+                        dcc.RadioItems(
+                            id="trend-range-input",
+                            options=[
+                                {'label': 'شهر', 'value': 30},
+                                {'label': '3 أشهر', 'value': 90},
+                                {'label': 'سنة', 'value': 365}
+                            ],
+                            value=90, inline=True, className="text-center",
+                            inputStyle={'margin-left': '5px', 'margin-right': '15px'}
+                        ),
+                        dcc.Graph(id='commitment-trend-chart', config={'displayModeBar': False})
+                    ]),
+                    className="mt-3",
+                    style={'background-color': 'rgba(255,255,255,0.85)', 'border-radius': '10px'}
+                ),
                 create_nav_buttons('/tracker')
             ]),
         ]
@@ -281,7 +410,11 @@ motivation_layout = html.Div(
                 html.H2("التحفيز", className="text-center my-4"),
                 dbc.Card(
                     dbc.CardBody([
+                        dbc.Switch(id="fresh-motivation-input", label="رسالة جديدة مكتوبة لك بالذكاء الاصطناعي (أبطأ)", value=False),
                         dbc.Button("احصل على تحفيز", id="get-motivation-button", color="info", className="mt-3 w-100"),
+                        dbc.Button("إلغاء", id="cancel-motivation-button", color="secondary", outline=True, className="mt-2 w-100"),
+                        dcc.Store(id="motivation-job-store"),
+                        dcc.Interval(id="motivation-job-interval", interval=JOB_POLL_INTERVAL_MS, disabled=True),
                         html.Hr(),
                         html.Div(id="motivation-output", style={'white-space': 'pre-wrap', 'direction': 'rtl', 'text-align': 'right', 'color': '#333'}),
                         html.Div(id="motivation-error-output", style={'color': 'red', 'white-space': 'pre-wrap', 'direction': 'rtl', 'text-align': 'right', 'marginTop': '10px'})
@@ -294,20 +427,29 @@ motivation_layout = html.Div(
     )
 
 
-app.layout = html.Div([
-    dcc.Location(id='url', refresh=False),
-    dcc.Store(id='meal-plan-data-store', data={}),
-    dcc.Store(id='tracker-summary-store', data={'summary': '', 'commitment_percentage': 0}),
-    dcc.Store(id='user-inputs-store', data={}),
-    dcc.Store(id='motivation-data-store', data={}),
-    html.Div(id='page-content'),
-])
+def serve_layout():
+    # Each page load starts a new server-side session; the data stores only hold references into it.
+    return html.Div([
+        dcc.Location(id='url', refresh=False),
+        dcc.Store(id='session-store', data=new_session_id()),
+        # Kept in localStorage: the browser keeps its first key, so history follows it across tabs and visits.
+        dcc.Store(id='user-key-store', storage_type='local', data=new_session_id()),
+        dcc.Store(id='history-store'),
+        dcc.Store(id='meal-plan-data-store'),
+        dcc.Store(id='tracker-summary-store'),
+        dcc.Store(id='user-inputs-store'),
+        dcc.Store(id='motivation-data-store'),
+        html.Div(id='page-content'),
+    ])
+
+app.layout = serve_layout
 
 # Callbacks
 @app.callback(
     Output('page-content', 'children'),
     [Input('url', 'pathname')]
 )
+@timed_callback
 def display_page(pathname):
     if pathname == '/meal-planner':
         return meal_planner_layout
@@ -322,7 +464,9 @@ def display_page(pathname):
     Output('welcome-message', 'children'),
     [Input('user-inputs-store', 'data')]
 )
-def update_welcome_message(user_data):
+@timed_callback
+def update_welcome_message(user_ref):
+    user_data = session_store.get(user_ref, 'user_inputs')
     name = user_data.get('name') if user_data and user_data.get('name') else 'الزائر'
     return f"مرحباً بك يا {name} في مساعد النظام الغذائي"
 
@@ -334,14 +478,17 @@ def update_welcome_message(user_data):
      State('meal-plan-data-store', 'data')],
     prevent_initial_call=True
 )
-def navigate_next(n_clicks, current_path, user_data, meal_data):
+@timed_callback
+def navigate_next(n_clicks, current_path, user_ref, meal_ref):
     if not n_clicks: return dash.no_update
+    user_data = session_store.get(user_ref, 'user_inputs')
+    meal_data = session_store.get(meal_ref, 'meal_plan')
     if current_path == '/meal-planner':
         required_fields = ["weight", "height", "age", "sex", "activity_level", "goal"]
         if not user_data: return dash.no_update
         missing_fields = [field for field in required_fields if not user_data.get(field)]
         if missing_fields: return f"الحقول التالية مطلوبة: {', '.join(missing_fields)}"
-        if not meal_data or 'meal_plan_text' not in meal_data: return "يجب توليد خطة الوجبات أولاً"
+        if not meal_data or 'plan' not in meal_data: return "يجب توليد خطة الوجبات أولاً"
     current_index = PAGE_ORDER.index(current_path)
     if current_index < len(PAGE_ORDER) - 1:
         time.sleep(0.3)
@@ -354,6 +501,7 @@ def navigate_next(n_clicks, current_path, user_data, meal_data):
     [State('url', 'pathname')],
     prevent_initial_call=True
 )
+@timed_callback
 def navigate_prev(n_clicks, current_path):
     if n_clicks:
         current_index = PAGE_ORDER.index(current_path)
@@ -368,13 +516,16 @@ def navigate_prev(n_clicks, current_path):
      State('meal-plan-data-store', 'data')],
     prevent_initial_call=True
 )
-def show_navigation_errors(n_clicks, current_path, user_data, meal_data):
+@timed_callback
+def show_navigation_errors(n_clicks, current_path, user_ref, meal_ref):
     if n_clicks and current_path == '/meal-planner':
+        user_data = session_store.get(user_ref, 'user_inputs')
+        meal_data = session_store.get(meal_ref, 'meal_plan')
         required_fields = ["weight", "height", "age", "sex", "activity_level", "goal"]
         if not user_data: return "الرجاء ملء جميع البيانات الأساسية"
         missing_fields = [field for field in required_fields if not user_data.get(field)]
         if missing_fields: return f"الحقول التالية مطلوبة: {', '.join(missing_fields)}"
-        if not meal_data or 'meal_plan_text' not in meal_data: return "يجب توليد خطة الوجبات أولاً"
+        if not meal_data or 'plan' not in meal_data: return "يجب توليد خطة الوجبات أولاً"
     return ""
 
 @app.callback(
@@ -384,10 +535,13 @@ def show_navigation_errors(n_clicks, current_path, user_data, meal_data):
         "activity-level", "goal", "diet-type",
         "allergy", "conditions"
     ]],
-    [State('user-inputs-store', 'data')]
+    [State('user-inputs-store', 'data'),
+     State('session-store', 'data')]
 )
-def update_user_data(name, weight, height, age, sex, activity, goal, diet, allergy, conditions, current):
-    updated = current.copy() if current else {}
+@timed_callback
+def update_user_data(name, weight, height, age, sex, activity, goal, diet, allergy, conditions, current_ref, session_id):
+    current = session_store.get(current_ref, 'user_inputs') or {}
+    updated = dict(current)
     if name is not None: updated['name'] = name
     if weight is not None: updated['weight'] = weight
     if height is not None: updated['height'] = height
@@ -398,22 +552,50 @@ def update_user_data(name, weight, height, age, sex, activity, goal, diet, aller
     if diet is not None: updated['diet_type'] = diet or "عادي"
     if allergy is not None: updated['allergy'] = allergy or "لا يوجد"
     if conditions is not None: updated['conditions'] = conditions or "لا يوجد"
-    return updated
+    if updated == current: return dash.no_update
+    return session_store.put(session_id, 'user_inputs', updated)
+
+def run_meal_plan_job(job, prepared_inputs):
+    buffer = stream_registry.get_or_create(job.id) if job.streaming else None
+
+    def on_chunk(text):
+        job.check_cancelled()
+        buffer.append(text)
+
+    job.set_progress("جاري توليد خطة الوجبات...")
+    try:
+        with llm_limiter.cancellable(job.check_cancelled):
+            meal_plan_text = generate_meal_plan_text(prepared_inputs, on_chunk=on_chunk if job.streaming else None)
+    except Exception as e:
+        if buffer is not None: buffer.finish(error=str(e))
+        raise
+    if buffer is not None: buffer.finish()
+    return meal_plan_text
+
+def run_week_plan_job(job, prepared_inputs, days):
+    def on_day(done):
+        job.check_cancelled()
+        job.set_progress(f"تم توليد {done} من {days} أيام...")
+
+    job.set_progress(f"جاري توليد خطة {days} أيام...")
+    return generate_week_plan_texts(prepared_inputs, days, on_day=on_day)
 
 @app.callback(
-    [Output("meal-plan-output", "children"),
-     Output("meal-plan-data-store", "data"),
+    [Output("meal-plan-job-store", "data"),
+     Output("meal-plan-job-interval", "disabled"),
+     Output("meal-plan-output", "children"),
      Output("meal-plan-error-output", "children")],
     [Input("generate-meal-plan-button", "n_clicks")],
     [State(f"{field}-input", "value") for field in [
         "name", "weight", "height", "age", "sex",
         "activity-level", "goal", "diet-type",
         "allergy", "conditions"
-    ]],
+    ]] + [State("plan-days-input", "value")],
     prevent_initial_call=True
 )
-def generate_meal_plan(n_clicks, name, weight, height, age, sex, activity_level, goal, diet_type, allergy, conditions):
-    if not n_clicks: return dash.no_update, dash.no_update, dash.no_update
+@timed_callback
+def generate_meal_plan(n_clicks, name, weight, height, age, sex, activity_level, goal, diet_type, allergy, conditions, days=1):
+    if not n_clicks: return dash.no_update, dash.no_update, dash.no_update, dash.no_update
     required_fields = ["weight", "height", "age", "sex", "activity_level", "goal"]
     user_inputs = {
         "name": name if name else "الزائر", "weight": weight, "height": height, "age": age, "sex": sex,
@@ -421,231 +603,391 @@ def generate_meal_plan(n_clicks, name, weight, height, age, sex, activity_level,
         "allergy": allergy if allergy else "لا يوجد", "conditions": conditions if conditions else "لا يوجد"
     }
     if not all(user_inputs.get(field) for field in required_fields):
-        return "", {}, "الرجاء ملء جميع البيانات الأساسية (الوزن، الطول، العمر، الجنس، مستوى النشاط، الهدف)"
+        return None, True, "", "الرجاء ملء جميع البيانات الأساسية (الوزن، الطول، العمر، الجنس، مستوى النشاط، الهدف)"
     try:
         prepared_inputs = prepare_inputs(user_inputs)
-        meal_planner_crew = Crew(
-            agents=[meal_planner_agent], tasks=[generate_meal_plan_task], process=Process.sequential, verbose=False
-        )
-        meal_plan_result = meal_planner_crew.kickoff(inputs=prepared_inputs)
-        meal_plan_data = {
-            'meal_plan_text': meal_plan_result.raw, 'user_inputs': user_inputs, 'timestamp': datetime.now().isoformat()
-        }
-        return meal_plan_result.raw, meal_plan_data, ""
-    except Exception as e:
-        error_msg = f"حدث خطأ أثناء توليد خطة الوجبات: {str(e)}"
-        traceback.print_exc()
-        return "", {}, error_msg
+    except ValueError:
+        return None, True, "", "الرجاء إدخال قيم صحيحة للوزن والطول والعمر."
+    days = int(days or 1)
+    if days > 1:
+        job_id = job_manager.submit("meal_plan", run_week_plan_job, prepared_inputs, days)
+        return {'job_id': job_id, 'streaming': False}, False, f"جاري توليد خطة {days} أيام...", ""
+    job_id = job_manager.submit("meal_plan", run_meal_plan_job, prepared_inputs, streaming=MEAL_PLAN_STREAMING)
+    job_data = {'job_id': job_id, 'streaming': MEAL_PLAN_STREAMING}
+    return job_data, False, "جاري توليد خطة الوجبات...", ""
+
+app.clientside_callback(
+    ClientsideFunction(namespace="stream", function_name="openMealPlanStream"),
+    Output("meal-plan-stream-store", "data"),
+    [Input("meal-plan-job-store", "data")],
+    prevent_initial_call=True
+)
+
+@app.callback(
+    [Output("meal-plan-output", "children", allow_duplicate=True),
+     Output("meal-plan-data-store", "data"),
+     Output("meal-plan-error-output", "children", allow_duplicate=True),
+     Output("meal-plan-job-interval", "disabled", allow_duplicate=True)],
+    [Input("meal-plan-job-interval", "n_intervals")],
+    [State("meal-plan-job-store", "data"),
+     State("session-store", "data")],
+    prevent_initial_call=True
+)
+@timed_callback
+def poll_meal_plan_job(n_intervals, job_data, session_id):
+    if not job_data: return dash.no_update, dash.no_update, "", True
+    job = job_manager.status(job_data['job_id'])
+    if job is None: return "", dash.no_update, JOB_LOST, True
+    if job['status'] not in FINISHED_STATES:
+        # While streaming, the browser renders partial text itself; don't overwrite it.
+        if job_data.get('streaming'): return dash.no_update, dash.no_update, "", False
+        return job['progress'] or "جاري توليد خطة الوجبات...", dash.no_update, "", False
+    if job['status'] == DONE and isinstance(job['result'], list):
+        day_plans = [parse_meal_plan(text) for text in job['result']]
+        plan = combine_day_plans(day_plans)
+        # The estimate stays per day (averaged), like a single-day plan's.
+        day_totals = [get_nutrition_index().estimate_meal_plan(day)['totals'] for day in day_plans]
+        estimate = {field: round(sum(totals[field] for totals in day_totals) / len(day_totals), 1) for field in day_totals[0]}
+        meal_plan_data = {'plan': plan.to_dict(), 'days': [day.to_dict() for day in day_plans], 'estimate': estimate,
+                          'timestamp': datetime.now().isoformat()}
+        return plan.to_text(), session_store.put(session_id, 'meal_plan', meal_plan_data), "", True
+    if job['status'] == DONE:
+        plan = parse_meal_plan(job['result'])
+        estimate = get_nutrition_index().estimate_meal_plan(plan)
+        meal_plan_data = {'plan': plan.to_dict(), 'estimate': estimate['totals'], 'timestamp': datetime.now().isoformat()}
+        return plan.to_text(), session_store.put(session_id, 'meal_plan', meal_plan_data), "", True
+    if job['status'] == CANCELLED:
+        return "", dash.no_update, "تم إلغاء توليد خطة الوجبات.", True
+    return "", None, f"حدث خطأ أثناء توليد خطة الوجبات: {job['error']}", True
+
+@app.callback(
+    Output("meal-plan-job-interval", "disabled", allow_duplicate=True),
+    [Input("cancel-meal-plan-button", "n_clicks")],
+    [State("meal-plan-job-store", "data")],
+    prevent_initial_call=True
+)
+@timed_callback
+def cancel_meal_plan(n_clicks, job_data):
+    if n_clicks and job_data: job_manager.cancel(job_data['job_id'])
+    return dash.no_update
 
 @app.callback(
     Output("meal-plan-output", "children", allow_duplicate=True),
     [Input("meal-plan-data-store", "data")],
     prevent_initial_call=True
 )
-def update_meal_plan_display(stored_data):
-    if stored_data and 'meal_plan_text' in stored_data: return stored_data['meal_plan_text']
+@timed_callback
+def update_meal_plan_display(meal_ref):
+    plan = load_meal_plan(session_store.get(meal_ref, 'meal_plan'))
+    if plan: return plan.to_text()
     return ""
 
 @app.callback(
     Output("planned-meal-input", "value"),
     [Input("url", "pathname")],
-    [State("meal-plan-data-store", "data")],
+    [State("meal-plan-data-store", "data"),
+     State("user-key-store", "data")],
     prevent_initial_call=False
 )
-def update_planned_meal(pathname, stored_data):
-    if pathname == '/tracker' and stored_data and 'meal_plan_text' in stored_data: return stored_data['meal_plan_text']
+@timed_callback
+def update_planned_meal(pathname, meal_ref, user_key):
+    if pathname != '/tracker': return ""
+    # Returning users track against their last saved plan until they generate a new one.
+    meal_data = session_store.get(meal_ref, 'meal_plan')
+    history_key = history_user_key(user_key)
+    if meal_data is None and history_key: meal_data = history_store.latest_meal_plan(history_key)
+    plan = load_day_plan(meal_data)
+    if plan: return plan.to_text()
     return ""
 
+def run_commitment_job(job, tracker_inputs):
+    job.set_progress("جاري تقييم الالتزام...")
+    return tracker_flight.do(make_cache_key(tracker_inputs), lambda: tracker_pool.kickoff(tracker_inputs).raw)
+
+def build_commitment_figure(percentage):
+    import plotly.graph_objects as go
+
+    # Set chart color based on percentage
+    if percentage >= 85: chart_color = '#28a745'
+    elif percentage >= 70: chart_color = '#ffc107'
+    elif percentage >= 50: chart_color = '#fd7e14'
+    else: chart_color = '#dc3545'
+
+    # Create pie chart
+    fig = go.Figure(
+        data=[go.Pie(
+            labels=['الالتزام', 'المتبقي'], values=[percentage, 100 - percentage],
+            hole=.7, marker_colors=[chart_color, 'lightgray'], textinfo='none', hoverinfo='label+percent'
+        )]
+    )
+    fig.update_layout(
+         margin=dict(t=0, b=0, l=0, r=0), showlegend=False, height=200,
+         xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+         yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+         annotations=[dict(
+             text=f'{percentage}%', x=0.5, y=0.5, font_size=30, showarrow=False, font_color='black'
+         )]
+    )
+    return fig
+
+def build_trend_figure(points):
+    import plotly.graph_objects as go
+
+    if not points:
+        return {"data": [], "layout": {
+            "height": 250, "xaxis": {"visible": False}, "yaxis": {"visible": False},
+            "annotations": [{"text": "لا توجد تقييمات سابقة بعد", "showarrow": False, "font": {"size": 16}}]
+        }}
+    days = [point['day'] for point in points]
+    fig = go.Figure()
+    if any(point['days'] > 1 for point in points):
+        # Each point averages several days; shade the range of their daily values.
+        fig.add_trace(go.Scatter(x=days, y=[point['high'] for point in points], mode='lines', line_width=0,
+                                 hoverinfo='skip', showlegend=False))
+        fig.add_trace(go.Scatter(x=days, y=[point['low'] for point in points], mode='lines', line_width=0,
+                                 fill='tonexty', fillcolor='rgba(40,167,69,0.15)', hoverinfo='skip', showlegend=False))
+    fig.add_trace(go.Scatter(
+        x=days, y=[point['percentage'] for point in points], mode='lines+markers',
+        line_color='#28a745', hovertemplate='%{x}: %{y}%<extra></extra>', showlegend=False
+    ))
+    fig.update_layout(
+        margin=dict(t=10, b=30, l=30, r=10), height=250,
+        yaxis=dict(range=[0, 100], ticksuffix='%'), xaxis=dict(type='date')
+    )
+    return fig
+
+def parse_commitment_percentage(raw_output):
+    percentage_match = re.search(r'(\d+)%', raw_output)
+    if percentage_match: return int(percentage_match.group(1))
+    num_match = re.match(r'^\s*(\d+)', raw_output)
+    if num_match: return int(num_match.group(1))
+    return 0
+
+def commitment_outputs(percentage, raw_output):
+    display_output = f"نسبة الالتزام: {percentage}%\n\n" + raw_output
+    return display_output, {'summary': display_output, 'commitment_percentage': percentage}, build_commitment_figure(percentage)
+
 @app.callback(
-    [Output("tracker-output", "children"),
-     Output("tracker-summary-store", "data"),
-     Output("commitment-pie-chart", "figure"),
+    [Output("tracker-job-store", "data"),
+     Output("tracker-job-interval", "disabled"),
+     Output("tracker-output", "children"),
+     Output("tracker-summary-store", "data", allow_duplicate=True),
+     Output("commitment-pie-chart", "figure", allow_duplicate=True),
      Output("tracker-error-output", "children")],
     [Input("evaluate-commitment-button", "n_clicks")],
     [State("planned-meal-input", "value"),
      State("eaten-meal-input", "value"),
      State("external-factors-input", "value"),
-     State("user-inputs-store", "data")],
+     State("user-inputs-store", "data"),
+     State("meal-plan-data-store", "data"),
+     State("session-store", "data")],
     prevent_initial_call=True
 )
-def evaluate_commitment(n_clicks, planned_meal, eaten_meal, external_factors, user_inputs):
-    if not n_clicks: return "", dash.no_update, go.Figure(), ""
+@timed_callback
+def evaluate_commitment(n_clicks, planned_meal, eaten_meal, external_factors, user_ref, meal_ref, session_id):
+    if not n_clicks: return dash.no_update, dash.no_update, "", dash.no_update, dash.no_update, ""
+    user_inputs = session_store.get(user_ref, 'user_inputs')
+    meal_data = session_store.get(meal_ref, 'meal_plan')
     if not planned_meal or not eaten_meal:
-        return "الرجاء إدخال الخطة الغذائية وما تم تناوله فعليًا.", dash.no_update, go.Figure(), "خطأ: الرجاء ملء حقول الخطة الغذائية وما تم تناوله فعليًا."
-    try:
-        tracker_crew = Crew(
-            agents=[tracker_agent], tasks=[track_progress_task], process=Process.sequential, verbose=False
-        )
-        tracker_inputs = {
-            "username": user_inputs.get("name", "الزائر"), "planned_meal": planned_meal,
-            "eaten_meal": eaten_meal, "external_factors": external_factors if external_factors else "لا توجد عوامل خارجية"
-        }
-        tracker_result = tracker_crew.kickoff(inputs=tracker_inputs)
-        raw_output = tracker_result.raw
-        percentage = 0
-        percentage_match = re.search(r'(\d+)%', raw_output)
-        if percentage_match: percentage = int(percentage_match.group(1))
-        else:
-            num_match = re.match(r'^\s*(\d+)', raw_output)
-            if num_match: percentage = int(num_match.group(1))
-        display_output = f"نسبة الالتزام: {percentage}%\n\n" + raw_output
-
-        # Set chart color based on percentage
-        if percentage >= 85: chart_color = '#28a745'
-        elif percentage >= 70: chart_color = '#ffc107'
-        elif percentage >= 50: chart_color = '#fd7e14'
-        else: chart_color = '#dc3545'
-
-        # Create pie chart
-        fig = go.Figure(
-            data=[go.Pie(
-                labels=['الالتزام', 'المتبقي'], values=[percentage, 100 - percentage],
-                hole=.7, marker_colors=[chart_color, 'lightgray'], textinfo='none', hoverinfo='label+percent'
-            )]
-        )
-        fig.update_layout(
-             margin=dict(t=0, b=0, l=0, r=0), showlegend=False, height=200,
-             xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-             yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-             annotations=[dict(
-                 text=f'{percentage}%', x=0.5, y=0.5, font_size=30, showarrow=False, font_color='black'
-             )]
-        )
-        return display_output, {'summary': display_output, 'commitment_percentage': percentage}, fig, ""
-    except Exception as e:
-        error_msg = f"حدث خطأ أثناء تقييم الالتزام: {str(e)}"
-        traceback.print_exc()
-        return "", {'summary': 'خطأ في التقييم', 'commitment_percentage': 0}, go.Figure(), error_msg
+        return None, True, "الرجاء إدخال الخطة الغذائية وما تم تناوله فعليًا.", dash.no_update, EMPTY_FIGURE, "خطأ: الرجاء ملء حقول الخطة الغذائية وما تم تناوله فعليًا."
+    # Reuse the stored structured plan unless the user edited the text on this page.
+    plan = load_day_plan(meal_data)
+    if plan is None or plan.to_text() != planned_meal.strip(): plan = parse_meal_plan(planned_meal)
+    local_score = score_commitment(plan, eaten_meal)
+    if not TRACKER_LLM_FALLBACK or local_score['confidence'] >= TRACKER_MIN_CONFIDENCE:
+        percentage = local_score['percentage']
+        raw_output = f"{percentage}% {local_score['emoji']}"
+        eaten_kcal = get_nutrition_index().estimate_eaten(eaten_meal)['totals']['kcal']
+        if eaten_kcal:
+            planned_kcal = (meal_data or {}).get('estimate', {}).get('kcal') or get_nutrition_index().estimate_meal_plan(plan)['totals']['kcal']
+            raw_output += f"\nالسعرات المقدرة لما تم تناوله: ~{round(eaten_kcal)} سعرة (الخطة: ~{round(planned_kcal)} سعرة)"
+        display_output, summary, fig = commitment_outputs(percentage, raw_output)
+        return None, True, display_output, session_store.put(session_id, 'tracker', summary), fig, ""
+    tracker_inputs = {
+        "username": (user_inputs or {}).get("name", "الزائر"), "planned_meal": planned_meal,
+        "eaten_meal": eaten_meal, "external_factors": external_factors if external_factors else "لا توجد عوامل خارجية"
+    }
+    job_id = job_manager.submit("commitment", run_commitment_job, tracker_inputs)
+    return {'job_id': job_id}, False, "جاري تقييم الالتزام...", dash.no_update, dash.no_update, ""
 
 @app.callback(
-    [Output("motivation-output", "children"),
-     Output("motivation-error-output", "children")],
+    [Output("tracker-output", "children", allow_duplicate=True),
+     Output("tracker-summary-store", "data"),
+     Output("commitment-pie-chart", "figure"),
+     Output("tracker-error-output", "children", allow_duplicate=True),
+     Output("tracker-job-interval", "disabled", allow_duplicate=True)],
+    [Input("tracker-job-interval", "n_intervals")],
+    [State("tracker-job-store", "data"),
+     State("session-store", "data")],
+    prevent_initial_call=True
+)
+@timed_callback
+def poll_commitment_job(n_intervals, job_data, session_id):
+    if not job_data: return dash.no_update, dash.no_update, dash.no_update, "", True
+    job = job_manager.status(job_data['job_id'])
+    if job is None: return "", dash.no_update, dash.no_update, JOB_LOST, True
+    if job['status'] not in FINISHED_STATES:
+        return job['progress'] or "جاري تقييم الالتزام...", dash.no_update, dash.no_update, "", False
+    if job['status'] == CANCELLED:
+        return "", dash.no_update, EMPTY_FIGURE, "تم إلغاء تقييم الالتزام.", True
+    if job['status'] == FAILED:
+        error_msg = f"حدث خطأ أثناء تقييم الالتزام: {job['error']}"
+        summary = {'summary': 'خطأ في التقييم', 'commitment_percentage': 0, 'error': True}
+        return "", session_store.put(session_id, 'tracker', summary), EMPTY_FIGURE, error_msg, True
+    raw_output = job['result']
+    display_output, summary, fig = commitment_outputs(parse_commitment_percentage(raw_output), raw_output)
+    return display_output, session_store.put(session_id, 'tracker', summary), fig, "", True
+
+@app.callback(
+    Output("tracker-job-interval", "disabled", allow_duplicate=True),
+    [Input("cancel-commitment-button", "n_clicks")],
+    [State("tracker-job-store", "data")],
+    prevent_initial_call=True
+)
+@timed_callback
+def cancel_commitment(n_clicks, job_data):
+    if n_clicks and job_data: job_manager.cancel(job_data['job_id'])
+    return dash.no_update
+
+def run_motivation_job(job, motivation_inputs):
+    job.set_progress("جاري تجهيز رسالتك التحفيزية...")
+    return motivation_flight.do(make_cache_key(motivation_inputs), lambda: motivation_pool.kickoff(motivation_inputs).raw)
+
+@app.callback(
+    [Output("motivation-job-store", "data"),
+     Output("motivation-job-interval", "disabled"),
+     Output("motivation-output", "children"),
+     Output("motivation-error-output", "children"),
+     Output("motivation-data-store", "data", allow_duplicate=True)],
     [Input("get-motivation-button", "n_clicks")],
     [State("tracker-summary-store", "data"),
-     State("user-inputs-store", "data")],
+     State("user-inputs-store", "data"),
+     State("fresh-motivation-input", "value"),
+     State("session-store", "data")],
     prevent_initial_call=True
 )
-def get_motivation(n_clicks, tracker_data, user_data):
-    if not n_clicks: return "", ""
+@timed_callback
+def get_motivation(n_clicks, tracker_ref, user_ref, fresh, session_id):
+    if not n_clicks: return dash.no_update, dash.no_update, "", "", dash.no_update
+    tracker_data = session_store.get(tracker_ref, 'tracker')
+    user_data = session_store.get(user_ref, 'user_inputs')
     tracker_summary = tracker_data.get('summary') if tracker_data else None
     commitment_percentage = tracker_data.get('commitment_percentage', 0) if tracker_data else 0
     username = user_data.get("name") if user_data and user_data.get("name") else "الزائر"
-    if not tracker_summary: return "الرجاء تقييم التزامك أولاً للحصول على تحفيز مخصص.", "خطأ: الرجاء تقييم الالتزام أولاً."
-    try:
-        motivation_crew = Crew(
-            agents=[motivation_agent], tasks=[motivate_user_task], process=Process.sequential, verbose=False
-        )
-        motivation_inputs = {
-            "tracker_summary": tracker_summary, "username": username, "commitment_percentage": commitment_percentage
-        }
-        motivation_result = motivation_crew.kickoff(inputs=motivation_inputs)
-        return dcc.Markdown(motivation_result.raw), ""
-    except Exception as e:
-        error_msg = f"حدث خطأ أثناء الحصول على التحفيز: {str(e)}"
-        traceback.print_exc()
-        return "", error_msg
+    if not tracker_summary: return None, True, "الرجاء تقييم التزامك أولاً للحصول على تحفيز مخصص.", "خطأ: الرجاء تقييم الالتزام أولاً.", dash.no_update
+    if not fresh:
+        # Served from the local library; an LLM-written message is opt-in.
+        motivation_text = motivation_library.pick(username, commitment_percentage, (user_data or {}).get("goal"))
+        metrics.motivation_messages.inc("library")
+        motivation_data = {'motivation_text': motivation_text, 'timestamp': datetime.now().isoformat()}
+        return None, True, dcc.Markdown(motivation_text), "", session_store.put(session_id, 'motivation', motivation_data)
+    motivation_inputs = {
+        "tracker_summary": tracker_summary, "username": username, "commitment_percentage": commitment_percentage
+    }
+    job_id = job_manager.submit("motivation", run_motivation_job, motivation_inputs)
+    return {'job_id': job_id}, False, "جاري تجهيز رسالتك التحفيزية...", "", dash.no_update
 
 @app.callback(
-    Output("motivation-data-store", "data"),
-    [Input("motivation-output", "children")],
-    [State("motivation-data-store", "data")],
+    [Output("motivation-output", "children", allow_duplicate=True),
+     Output("motivation-data-store", "data"),
+     Output("motivation-error-output", "children", allow_duplicate=True),
+     Output("motivation-job-interval", "disabled", allow_duplicate=True)],
+    [Input("motivation-job-interval", "n_intervals")],
+    [State("motivation-job-store", "data"),
+     State("session-store", "data")],
     prevent_initial_call=True
 )
-def store_motivation_data(motivation_text_component, current_data):
-    if motivation_text_component:
-        if isinstance(motivation_text_component, dcc.Markdown):
-            motivation_text = motivation_text_component.children
-        else:
-            motivation_text = motivation_text_component
-        return {
-            'motivation_text': motivation_text, 'timestamp': datetime.now().isoformat()
-        }
-    return current_data
-
-def generate_html_report_content(report_data):
-    try:
-        username = report_data.get("username")
-        username_display = username if username and username != "الزائر" else "العميل"
-            
-        meal_plan = report_data.get("meal_plan", "لا توجد خطة وجبات متاحة.").replace('\n', '<br>')
-        tracker_summary = report_data.get("tracker_summary", "لا يوجد تقييم التزام متاح.").replace('\n', '<br>')
-        motivation = report_data.get("motivation", "لا يوجد تحفيز متاح.").replace('\n', '<br>')
-        user_profile = report_data.get("user_profile", {})
-        report_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="ar" dir="rtl">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>تقرير النظام الغذائي - {username_display}</title>
-            <style>
-                body {{
-                    font-family: 'Arial', sans-serif; line-height: 1.6; color: #333;
-                    max-width: 800px; margin: 0 auto; padding: 20px;
-                    background-color: #f4f4f4; border: 1px solid #ddd;
-                    box-shadow: 0 0 10px rgba(0,0,0,0.1);
-                    direction: rtl; text-align: right;
-                }}
-                h1, h2, h3 {{ color: #2c3e50; text-align: center; }}
-                .container {{
-                    background-color: #fff; padding: 30px; border-radius: 8px; margin-top: 20px;
-                }}
-                .section-title {{
-                    font-size: 24px; color: #34495e; border-bottom: 2px solid #34495e;
-                    padding-bottom: 10px; margin-bottom: 20px; text-align: right;
-                }}
-                .content-box {{
-                    background-color: #f9f9f9; border: 1px solid #eee; border-radius: 5px;
-                    padding: 15px; margin-bottom: 15px; white-space: pre-wrap;
-                    text-align: right; word-wrap: break-word;
-                }}
-                .user-profile-table {{ width: 100%; border-collapse: collapse; margin-bottom: 20px; }}
-                .user-profile-table th, .user-profile-table td {{ border: 1px solid #ddd; padding: 8px; text-align: right; }}
-                .user-profile-table th {{ background-color: #e9ecef; width: 30%; }}
-                .footer {{ text-align: center; margin-top: 40px; font-size: 0.9em; color: #777; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>تقرير النظام الغذائي الشامل</h1>
-                <h3>تاريخ التقرير: {report_date}</h3>
-                <hr>
-
-                <h2 class="section-title">بيانات المستخدم</h2>
-                <table class="user-profile-table">
-                    <tr><th>الاسم</th><td>{user_profile.get("name", "غير متوفر")}</td></tr>
-                    <tr><th>الوزن</th><td>{user_profile.get("weight", "غير متوفر")} كجم</td></tr>
-                    <tr><th>الطول</th><td>{user_profile.get("height", "غير متوفر")} سم</td></tr>
-                    <tr><th>العمر</th><td>{user_profile.get("age", "غير متوفر")} سنة</td></tr>
-                    <tr><th>الجنس</th><td>{user_profile.get("sex", "غير متوفر")}</td></tr>
-                    <tr><th>مستوى النشاط</th><td>{user_profile.get("activity_level", "غير متوفر")}</td></tr>
-                    <tr><th>الهدف</th><td>{user_profile.get("goal", "غير متوفر")}</td></tr>
-                    <tr><th>نوع النظام الغذائي</th><td>{user_profile.get("diet_type", "غير متوفر")}</td></tr>
-                    <tr><th>الحساسيات الغذائية</th><td>{user_profile.get("allergy", "لا يوجد")}</td></tr>
-                    <tr><th>الحالات الطبية</th><td>{user_profile.get("conditions", "لا يوجد")}</td></tr>
-                </table>
-
-                <h2 class="section-title">خطة الوجبات</h2>
-                <div class="content-box">{meal_plan}</div>
-
-                <h2 class="section-title">ملخص تقييم الالتزام</h2>
-                <div class="content-box">{tracker_summary}</div>
-
-                <h2 class="section-title">التحفيز والنصائح</h2>
-                <div class="content-box">{motivation}</div>
-
-                <div class="footer">تم إنشاء هذا التقرير بواسطة مساعد النظام الغذائي الذكي الخاص بك.</div>
-            </div>
-        </body>
-        </html>
-        """
-        return html_content
-    except Exception as e:
-        traceback.print_exc()
-        return "خطأ في توليد التقرير."
+@timed_callback
+def poll_motivation_job(n_intervals, job_data, session_id):
+    if not job_data: return dash.no_update, dash.no_update, "", True
+    job = job_manager.status(job_data['job_id'])
+    if job is None: return "", dash.no_update, JOB_LOST, True
+    if job['status'] not in FINISHED_STATES:
+        return job['progress'] or "جاري تجهيز رسالتك التحفيزية...", dash.no_update, "", False
+    if job['status'] == DONE:
+        metrics.motivation_messages.inc("llm")
+        motivation_data = {'motivation_text': job['result'], 'timestamp': datetime.now().isoformat()}
+        return dcc.Markdown(job['result']), session_store.put(session_id, 'motivation', motivation_data), "", True
+    if job['status'] == CANCELLED: return "", dash.no_update, "تم إلغاء طلب التحفيز.", True
+    return "", dash.no_update, f"حدث خطأ أثناء الحصول على التحفيز: {job['error']}", True
+
+@app.callback(
+    Output("motivation-job-interval", "disabled", allow_duplicate=True),
+    [Input("cancel-motivation-button", "n_clicks")],
+    [State("motivation-job-store", "data")],
+    prevent_initial_call=True
+)
+@timed_callback
+def cancel_motivation(n_clicks, job_data):
+    if n_clicks and job_data: job_manager.cancel(job_data['job_id'])
+    return dash.no_update
+
+def history_user_key(user_key):
+    """
+    The signed-in account's history key, else the browser's `user-key-store` id (None if invalid).
+    """
+    user = auth.current_user()
+    if user: return f"user:{user['uid']}"
+    return user_key if valid_id(user_key) else None
+
+@app.callback(
+    Output("history-store", "data"),
+    [Input("meal-plan-data-store", "data"),
+     Input("tracker-summary-store", "data"),
+     Input("motivation-data-store", "data")],
+    [State("user-key-store", "data")],
+    prevent_initial_call=True
+)
+@timed_callback
+def record_history(meal_ref, tracker_ref, motivation_ref, user_key):
+    user_key = history_user_key(user_key)
+    if not user_key: return dash.no_update
+    for store_id in dash.callback_context.triggered_prop_ids.values():
+        if store_id == "meal-plan-data-store":
+            meal_data = session_store.get(meal_ref, 'meal_plan')
+            if meal_data and meal_data.get('plan'): history_store.add_meal_plan(user_key, meal_data)
+        elif store_id == "tracker-summary-store":
+            tracker_data = session_store.get(tracker_ref, 'tracker')
+            if tracker_data and tracker_data.get('summary') and not tracker_data.get('error'):
+                history_store.add_tracker_result(user_key, tracker_data['commitment_percentage'], tracker_data['summary'])
+        elif store_id == "motivation-data-store":
+            motivation_data = session_store.get(motivation_ref, 'motivation')
+            if motivation_data and motivation_data.get('motivation_text'):
+                history_store.add_motivation(user_key, motivation_data['motivation_text'])
+    return {'rev': time.time_ns()}
 
+@app.callback(
+    Output("commitment-trend-chart", "figure"),
+    [Input("trend-range-input", "value"),
+     Input("history-store", "data")],
+    [State("user-key-store", "data")]
+)
+@timed_callback
+def update_trend_chart(days, history_rev, user_key):
+    user_key = history_user_key(user_key)
+    if not user_key: return build_trend_figure([])
+    return build_trend_figure(history_store.commitment_trend(user_key, days=int(days or 90)))
+
+def build_report_data(meal_ref, tracker_ref, motivation_ref, user_ref):
+    """
+    (report_data, None) from the session's results, or (None, message) naming the step still missing.
+    """
+    meal_data = session_store.get(meal_ref, 'meal_plan')
+    tracker_data = session_store.get(tracker_ref, 'tracker')
+    motivation_data = session_store.get(motivation_ref, 'motivation')
+    user_inputs = session_store.get(user_ref, 'user_inputs')
+    plan = load_meal_plan(meal_data)
+    if plan is None: return None, "الرجاء توليد خطة الوجبات أولاً."
+    if not tracker_data or not tracker_data.get('summary'): return None, "الرجاء تقييم الالتزام أولاً."
+    if not motivation_data or not motivation_data.get('motivation_text'): return None, "الرجاء الحصول على التحفيز أولاً."
+    if not user_inputs or not user_inputs.get('name'): return None, "الرجاء إدخال بيانات المستخدم (خاصة الاسم) أولاً."
+    return {
+        "username": str(user_inputs.get("name", "الزائر")),
+        "meal_plan": plan,
+        "tracker_summary": str(tracker_data.get("summary", "لا يوجد تقييم التزام متاح.")),
+        "motivation": str(motivation_data.get("motivation_text", "لا يوجد تحفيز متاح.")),
+        "user_profile": user_inputs
+    }, None
 
 @app.callback(
     Output("download-html-report", "data"),
@@ -657,27 +999,66 @@ def generate_html_report_content(report_data):
      State("user-inputs-store", "data")],
     prevent_initial_call=True
 )
-def download_report(n_clicks, meal_data, tracker_data, motivation_data, user_inputs):
+@timed_callback
+def download_report(n_clicks, meal_ref, tracker_ref, motivation_ref, user_ref):
     if not n_clicks: return dash.no_update, ""
-    if not meal_data or not meal_data.get('meal_plan_text'): return None, "الرجاء توليد خطة الوجبات أولاً."
-    if not tracker_data or not tracker_data.get('summary'): return None, "الرجاء تقييم الالتزام أولاً."
-    if not motivation_data or not motivation_data.get('motivation_text'): return None, "الرجاء الحصول على التحفيز أولاً."
-    if not user_inputs or not user_inputs.get('name'): return None, "الرجاء إدخال بيانات المستخدم (خاصة الاسم) أولاً."
-    report_data = {
-        "username": str(user_inputs.get("name", "الزائر")),
-        "meal_plan": str(meal_data.get("meal_plan_text", "لا توجد خطة وجبات متاحة.")),
-        "tracker_summary": str(tracker_data.get("summary", "لا يوجد تقييم التزام متاح.")),
-        "motivation": str(motivation_data.get("motivation_text", "لا يوجد تحفيز متاح.")),
-        "user_profile": user_inputs
-    }
+    report_data, error = build_report_data(meal_ref, tracker_ref, motivation_ref, user_ref)
+    if error: return None, error
     try:
-        html_content = generate_html_report_content(report_data)
+        html_bytes = render_report(report_data).encode('utf-8')
+        metrics.report_bytes.observe(len(html_bytes), "html")
         output_filename = f"تقرير_النظام_الغذائي_{report_data['username']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-        return dcc.send_bytes(html_content.encode('utf-8'), output_filename, type='text/html'), "تم إنشاء التقرير بنجاح!"
+        return dcc.send_bytes(html_bytes, output_filename, type='text/html'), "تم إنشاء التقرير بنجاح!"
     except Exception as e:
         error_msg = f"حدث خطأ أثناء توليد ملف HTML: {str(e)}"
         traceback.print_exc()
         return None, error_msg
 
+@app.callback(
+    Output("download-pdf-report", "data"),
+    Output("download-report-status", "children", allow_duplicate=True),
+    [Input("download-pdf-button", "n_clicks")],
+    [State("meal-plan-data-store", "data"),
+     State("tracker-summary-store", "data"),
+     State("motivation-data-store", "data"),
+     State("user-inputs-store", "data")],
+    prevent_initial_call=True
+)
+@timed_callback
+def download_pdf_report(n_clicks, meal_ref, tracker_ref, motivation_ref, user_ref):
+    if not n_clicks: return dash.no_update, ""
+    report_data, error = build_report_data(meal_ref, tracker_ref, motivation_ref, user_ref)
+    if error: return None, error
+    try:
+        pdf_bytes = render_pdf_report(report_data)
+        metrics.report_bytes.observe(len(pdf_bytes), "pdf")
+        output_filename = f"تقرير_النظام_الغذائي_{report_data['username']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        return dcc.send_bytes(pdf_bytes, output_filename, type='application/pdf'), "تم إنشاء التقرير بنجاح!"
+    except Exception as e:
+        error_msg = f"حدث خطأ أثناء توليد ملف PDF: {str(e)}"
+        traceback.print_exc()
+        return None, error_msg
+
+def warm_up():
+    """
+    Builds every agent, task and pooled crew so the first request doesn't pay for it.
+    """
+    registry.warm_up()
+    warm_pools()
+
+mark("layout_and_callbacks")
+
+# AGENT_WARMUP: "background" (default) builds agents after boot, "sync" before serving, "off" on first use.
+AGENT_WARMUP = os.getenv("AGENT_WARMUP", "background")
+if AGENT_WARMUP == "sync":
+    warm_up()
+    mark("warm_up")
+elif AGENT_WARMUP == "background":
+    import threading
+    threading.Thread(target=warm_up, name="agent-warm-up", daemon=True).start()
+
+# MOTIVATION_REFRESH_SECONDS: add an agent-written message per commitment band to the library on this interval.
+motivation_library.start_refresher(int(os.getenv("MOTIVATION_REFRESH_SECONDS", "0")))
+
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=7860)
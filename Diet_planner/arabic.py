@@ -0,0 +1,44 @@
+import re
+
+_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]")
+_TATWEEL = "\u0640"
+_CHAR_MAP = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه",
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4",
+    "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+    "،": ",", "؛": ";",
+})
+_WORD = re.compile(r"[^\W_]+")
+_PREFIXES = ("وال", "بال", "فال", "كال", "لل", "ال")
+
+
+def normalize_arabic(text):
+    """
+    Folds spelling variants so equivalent Arabic strings compare equal:
+    strips diacritics and tatweel, unifies alef/hamza forms, ya/alef maqsura,
+    ta marbuta, Arabic-Indic digits, and lowercases Latin text.
+    """
+    if not text:
+        return ""
+    text = _DIACRITICS.sub("", str(text)).replace(_TATWEEL, "")
+    return text.translate(_CHAR_MAP).lower()
+
+
+def strip_prefix(token):
+    """
+    Removes the definite article and common attached conjunctions/prepositions.
+    """
+    for prefix in _PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+            return token[len(prefix):]
+    if token.startswith("و") and len(token) > 3:
+        return token[1:]
+    return token
+
+
+def tokenize(text):
+    """
+    Normalized word tokens with the article/conjunction prefixes removed.
+    """
+    return [strip_prefix(token) for token in _WORD.findall(normalize_arabic(text))]
@@ -0,0 +1,26 @@
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    stream: {
+        // Follows /stream/meal-plan/<job_id> and writes the partial plan into #meal-plan-output.
+        openMealPlanStream: function (jobData) {
+            if (!jobData || !jobData.job_id || !jobData.streaming || !window.EventSource) {
+                return window.dash_clientside.no_update;
+            }
+            if (window._mealPlanSource) {
+                window._mealPlanSource.close();
+            }
+            var text = '';
+            var source = new EventSource('/stream/meal-plan/' + jobData.job_id);
+            window._mealPlanSource = source;
+            source.addEventListener('chunk', function (event) {
+                text += JSON.parse(event.data).text;
+                var output = document.getElementById('meal-plan-output');
+                if (output) {
+                    output.innerText = text;
+                }
+            });
+            source.addEventListener('done', function () { source.close(); });
+            source.addEventListener('error', function () { source.close(); });
+            return jobData.job_id;
+        }
+    }
+});
@@ -0,0 +1,294 @@
+"""
+Login and registration pages for the Dash server.
+
+Password hashing (werkzeug pbkdf2:sha256, about 0.3 s of CPU per call) runs
+on a small dedicated pool of AUTH_HASH_WORKERS threads. hashlib.pbkdf2_hmac
+releases the GIL while it works, so a login never stalls the Dash callbacks
+running next to it, and the pool caps how many hashes burn CPU at once. A
+successful login sets a signed, timestamped token cookie; each request is
+authenticated by checking its HMAC (constant-time) and age, without a
+database query. Failed logins are rate limited per client address and per
+email from that address, so a stranger cannot lock an account out for
+everyone; registrations are rate limited per address.
+
+    AUTH_SECRET_KEY      signs the tokens; without it a random key is created
+                         once in AUTH_SECRET_PATH (default auth_secret.key)
+                         and shared by every worker and restart
+    AUTH_REQUIRED=1      send signed-out visitors to /login
+    AUTH_TOKEN_TTL       token lifetime in seconds (default 7 days)
+"""
+import functools
+import os
+import tempfile
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import database
+
+AUTH_COOKIE = "diet_auth"
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "templates")
+MIN_PASSWORD_LENGTH = 8
+# Paths a signed-out visitor may reach when AUTH_REQUIRED is on.
+PUBLIC_PATHS = ("/login", "/register", "/logout", "/assets/")
+
+
+def _hash_password(password):
+    return generate_password_hash(password, method=database.PASSWORD_METHOD)
+
+
+def _verify_password(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+class AttemptLimiter:
+    """
+    Counts failures per key over a sliding `window` of seconds.
+    """
+
+    def __init__(self, max_attempts=5, window=300):
+        self.max_attempts = max_attempts
+        self.window = window
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def retry_after(self, key):
+        """
+        Seconds until `key` may try again, or 0 when it isn't blocked.
+        """
+        now = time.time()
+        with self._lock:
+            failures = self._prune(key, now)
+            if failures is None or len(failures) < self.max_attempts:
+                return 0
+            return max(1, int(failures[0] + self.window - now))
+
+    def fail(self, key):
+        now = time.time()
+        with self._lock:
+            self._prune(key, now)
+            self._failures.setdefault(key, deque()).append(now)
+            if len(self._failures) > 10000:
+                for stale in [k for k, f in self._failures.items() if f[-1] <= now - self.window]:
+                    del self._failures[stale]
+
+    def reset(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+
+    def _prune(self, key, now):
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+
+class Authenticator:
+    def __init__(self, secret_key, token_ttl, hash_workers=2, hash_timeout=30, limiter=None):
+        self.token_ttl = token_ttl
+        self.hash_workers = hash_workers
+        self.hash_timeout = hash_timeout
+        self.limiter = limiter or AttemptLimiter()
+        self._serializer = URLSafeTimedSerializer(secret_key, salt="diet-planner-auth")
+        self._executor = None
+        self._dummy_hash = None
+        self._lock = threading.Lock()
+        self.decode_token = functools.lru_cache(maxsize=4096)(self._decode_token)
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.hash_workers, thread_name_prefix="auth-hash")
+        return self._executor.submit(fn, *args).result(timeout=self.hash_timeout)
+
+    def register(self, email, password):
+        """
+        (token, None) for a new account, or (None, error message).
+        """
+        if not email or "@" not in email:
+            return None, "الرجاء إدخال بريد إلكتروني صحيح."
+        if len(password or "") < MIN_PASSWORD_LENGTH:
+            return None, f"يجب أن تتكون كلمة المرور من {MIN_PASSWORD_LENGTH} أحرف على الأقل."
+        if database.find_user(email):
+            return None, "هذا البريد الإلكتروني مسجل بالفعل."
+        user_id = database.create_user(email, self._run(_hash_password, password))
+        if user_id is None:
+            return None, "هذا البريد الإلكتروني مسجل بالفعل."
+        return self.issue_token(user_id, email), None
+
+    def login(self, email, password):
+        """
+        (token, None) when the credentials match, or (None, error message).
+        """
+        user = database.find_user(email) if email else None
+        if user is None:
+            # Hash anyway so an unknown email takes as long as a wrong password.
+            if self._dummy_hash is None:
+                self._dummy_hash = self._run(_hash_password, secrets.token_urlsafe(16))
+            self._run(_verify_password, self._dummy_hash, password or "")
+            return None, "البريد الإلكتروني أو كلمة المرور غير صحيحة."
+        user_id, password_hash = user
+        if not self._run(_verify_password, password_hash, password or ""):
+            return None, "البريد الإلكتروني أو كلمة المرور غير صحيحة."
+        return self.issue_token(user_id, email), None
+
+    def issue_token(self, user_id, email):
+        return self._serializer.dumps({"uid": user_id, "email": email})
+
+    def _decode_token(self, token):
+        try:
+            payload, signed_at = self._serializer.loads(token, return_timestamp=True)
+        except BadSignature:
+            return None
+        return payload["uid"], payload["email"], signed_at.timestamp()
+
+    def verify_token(self, token):
+        """
+        {"uid", "email"} for a valid, unexpired token, else None.
+        """
+        if not token or len(token) > 512:
+            return None
+        decoded = self.decode_token(token)
+        if decoded is None or time.time() - decoded[2] > self.token_ttl:
+            return None
+        return {"uid": decoded[0], "email": decoded[1]}
+
+
+def load_secret_key(path):
+    """
+    The signing key stored in `path`, generated on first use so every worker process agrees on it.
+    """
+    try:
+        with open(path) as f:
+            key = f.read().strip()
+        if key:
+            return key
+    except FileNotFoundError:
+        pass
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".auth_secret-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        # link() fails if another worker got there first; then its key wins.
+        os.link(tmp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink(tmp_path)
+    with open(path) as f:
+        return f.read().strip()
+
+
+authenticator = Authenticator(
+    os.getenv("AUTH_SECRET_KEY") or load_secret_key(os.getenv("AUTH_SECRET_PATH", "auth_secret.key")),
+    token_ttl=int(os.getenv("AUTH_TOKEN_TTL", str(7 * 24 * 3600))),
+    hash_workers=int(os.getenv("AUTH_HASH_WORKERS", "2")),
+    limiter=AttemptLimiter(int(os.getenv("AUTH_MAX_ATTEMPTS", "5")), int(os.getenv("AUTH_ATTEMPT_WINDOW", "300")))
+)
+
+
+def current_user():
+    """
+    The signed-in user of the current Flask request ({"uid", "email"}), or None.
+    """
+    from flask import has_request_context, request
+
+    if not has_request_context():
+        return None
+    return authenticator.verify_token(request.cookies.get(AUTH_COOKIE))
+
+
+@functools.lru_cache(maxsize=None)
+def _template(name):
+    from jinja2 import Environment, FileSystemLoader
+
+    return Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=True).get_template(name)
+
+
+def init_app(server, required=None):
+    """
+    Adds /login, /register and /logout to the Flask `server`; with `required`, every other page needs a login.
+    """
+    from flask import redirect, request
+
+    required = os.getenv("AUTH_REQUIRED", "0") == "1" if required is None else required
+
+    def page(name, error=None, email="", status=200):
+        return _template(name).render(error=error, email=email), status
+
+    def signed_in(token):
+        response = redirect("/")
+        response.set_cookie(AUTH_COOKIE, token, max_age=authenticator.token_ttl, httponly=True, samesite="Lax",
+                            secure=request.is_secure)
+        return response
+
+    def form_email():
+        return (request.form.get("email") or "").strip().lower()
+
+    def throttled(keys, name, email):
+        retry_after = max(authenticator.limiter.retry_after(key) for key in keys)
+        if retry_after:
+            error = f"محاولات كثيرة. حاول مرة أخرى بعد {retry_after} ثانية."
+            body, status = page(name, error, email, 429)
+            return body, status, {"Retry-After": str(retry_after)}
+        return None
+
+    @server.route("/login", methods=["GET", "POST"])
+    def login():
+        if request.method == "GET":
+            return page("login.html")
+        email = form_email()
+        # The email bucket is per address too: failures from elsewhere must not lock the owner out.
+        keys = (("ip", request.remote_addr), ("email", email, request.remote_addr))
+        blocked = throttled(keys, "login.html", email)
+        if blocked:
+            return blocked
+        token, error = authenticator.login(email, request.form.get("password"))
+        if error:
+            for key in keys:
+                authenticator.limiter.fail(key)
+            return page("login.html", error, email, 401)
+        authenticator.limiter.reset(keys[1])
+        return signed_in(token)
+
+    @server.route("/register", methods=["GET", "POST"])
+    def register():
+        if request.method == "GET":
+            return page("register.html")
+        email = form_email()
+        keys = (("register", request.remote_addr),)
+        blocked = throttled(keys, "register.html", email)
+        if blocked:
+            return blocked
+        # Every registration costs a hash, so each attempt counts, not only failures.
+        authenticator.limiter.fail(keys[0])
+        token, error = authenticator.register(email, request.form.get("password"))
+        if error:
+            return page("register.html", error, email, 400)
+        return signed_in(token)
+
+    @server.route("/logout")
+    def logout():
+        response = redirect("/login")
+        response.delete_cookie(AUTH_COOKIE)
+        return response
+
+    if required:
+        @server.before_request
+        def require_login():
+            if request.path.startswith(PUBLIC_PATHS) or current_user() is not None:
+                return None
+            if request.path.startswith("/_dash-"):
+                return "", 401
+            return redirect("/login")
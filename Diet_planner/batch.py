@@ -0,0 +1,144 @@
+"""
+Batch meal-plan generation for a cohort of users.
+
+    python batch.py profiles.jsonl plans.jsonl --concurrency 4
+    python batch.py profiles.csv plans.jsonl --fake-llm --fake-latency 0.2
+
+Input rows use the prepare_inputs() field names (name, weight, height, age,
+sex, activity_level, goal, diet_type, allergy, conditions) plus an optional
+`id`. Results are appended to the output JSONL as each row finishes; rerunning
+with the same output file skips rows that already succeeded.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.meal_planner_agent import prepare_inputs
+from agents.llm_backends import FakeStreamingLLM
+from planner import generate_meal_plan_text
+from ratelimit import BATCH, llm_limiter
+
+REQUIRED_FIELDS = ["weight", "height", "age", "sex", "activity_level", "goal"]
+DEFAULTS = {"name": "الزائر", "diet_type": "عادي", "allergy": "لا يوجد", "conditions": "لا يوجد"}
+
+
+def read_profiles(path):
+    """
+    Yields (row_id, profile) from a JSONL or CSV file; row ids default to the 1-based line number.
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for position, row in enumerate(rows, start=1):
+            row_id = str(row.get("id") or position)
+            profile = {key: value for key, value in row.items() if key != "id" and value not in (None, "")}
+            for key, value in DEFAULTS.items():
+                profile.setdefault(key, value)
+            yield row_id, profile
+
+
+def read_checkpoint(path):
+    """
+    Row ids already written successfully to the output file. A torn last line from a crash is ignored.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "ok":
+                done.add(str(record["id"]))
+    return done
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_batch(input_path, output_path, concurrency=4, llm=None, use_cache=True, log=sys.stderr):
+    done = read_checkpoint(output_path)
+    write_lock = threading.Lock()
+    slots = threading.BoundedSemaphore(concurrency * 2)
+    latencies = []
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+
+    def process(row_id, profile, out):
+        started = time.perf_counter()
+        record = {"id": row_id, "name": profile.get("name")}
+        try:
+            missing = [field for field in REQUIRED_FIELDS if not profile.get(field)]
+            if missing:
+                raise ValueError(f"missing fields: {', '.join(missing)}")
+            with llm_limiter.lane(BATCH):
+                record["meal_plan_text"] = generate_meal_plan_text(prepare_inputs(profile), llm=llm, use_cache=use_cache)
+            record["status"] = "ok"
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = str(e)
+        finally:
+            slots.release()
+        record["latency_s"] = round(time.perf_counter() - started, 4)
+        with write_lock:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            counts[record["status"]] += 1
+            latencies.append(record["latency_s"])
+            total = counts["ok"] + counts["error"]
+            if total % 10 == 0:
+                print(f"[batch] {total} rows written ({counts['error']} errors)", file=log)
+
+    started = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for row_id, profile in read_profiles(input_path):
+            if row_id in done:
+                counts["skipped"] += 1
+                continue
+            slots.acquire()
+            executor.submit(process, row_id, profile, out)
+    elapsed = time.perf_counter() - started
+
+    processed = counts["ok"] + counts["error"]
+    return {
+        **counts,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(processed / elapsed, 3) if elapsed else 0.0,
+        "latency_p50_s": percentile(latencies, 0.5),
+        "latency_p95_s": percentile(latencies, 0.95),
+        "latency_max_s": max(latencies) if latencies else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate meal plans for many user profiles.")
+    parser.add_argument("input", help="profiles as .jsonl or .csv")
+    parser.add_argument("output", help="results .jsonl (appended to; also the resume checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=4, help="maximum simultaneous LLM calls")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the plan cache")
+    parser.add_argument("--fake-llm", action="store_true", help="use the deterministic offline LLM (implies --no-cache)")
+    parser.add_argument("--fake-latency", type=float, default=0.5, help="fake LLM seconds before first chunk")
+    args = parser.parse_args(argv)
+
+    llm = FakeStreamingLLM(first_token_delay=args.fake_latency, chunk_delay=0) if args.fake_llm else None
+    # Fake plans must never land in the shared plan cache under real profiles' keys.
+    use_cache = not (args.no_cache or args.fake_llm)
+    summary = run_batch(args.input, args.output, concurrency=args.concurrency, llm=llm, use_cache=use_cache)
+    print(json.dumps(summary, ensure_ascii=False))
+    return 1 if summary["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""
+End-to-end load test of the Dash app against the offline fake LLM.
+
+Each simulated user walks PAGE_ORDER the way the browser does: fill the form,
+generate a plan and poll it, evaluate commitment, get motivation, then
+download the report. Callbacks are driven through /_dash-update-component,
+in-process via app.server's test client or over HTTP with --url.
+
+    python bench.py --users 8 --walks 3
+    python bench.py --users 32 --first-token-delay 0.8 --tokens-per-second 120
+    python bench.py --url http://localhost:7860 --users 16
+
+Every run appends one JSON line (commit, config, latency percentiles,
+throughput, memory) to bench_results/results.jsonl and prints the change
+against the previous run with the same config.
+"""
+import argparse
+import json
+import os
+import resource
+import secrets
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_PROFILE = {
+    "name-input.value": "مستخدم", "weight-input.value": 80, "height-input.value": 175, "age-input.value": 30,
+    "sex-input.value": "ذكر", "activity-level-input.value": "متوسط", "goal-input.value": "فقدان الوزن",
+    "diet-type-input.value": "عادي", "allergy-input.value": "لا يوجد", "conditions-input.value": "لا يوجد",
+}
+EATEN_MEAL = "بيضتان وشريحة خبز أسمر، صدر دجاج مشوي مع سلطة وأرز بني، سمك مشوي مع خضار، حفنة مكسرات"
+
+
+class TestClientTransport:
+    def __init__(self, server):
+        self.client = server.test_client()
+
+    def post_json(self, path, payload):
+        response = self.client.post(path, json=payload)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HTTPTransport:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def post_json(self, path, payload):
+        request = urllib.request.Request(
+            self.base_url + path, data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                body = response.read()
+                return response.status, json.loads(body) if body else None
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+def callbacks_by_name(app):
+    """
+    {callback function name: (output spec, [(input id, prop)], [(state id, prop)])} from the app's callback map.
+    """
+    callbacks = {}
+    for output, spec in app.callback_map.items():
+        name = getattr(spec.get("callback"), "__name__", None)
+        if name is None:
+            continue
+        inputs = [(item["id"], item["property"]) for item in spec["inputs"]]
+        state = [(item["id"], item["property"]) for item in spec.get("state", [])]
+        callbacks[name] = (output, inputs, state)
+    return callbacks
+
+
+def _split_outputs(output):
+    if output.startswith(".."):
+        parts = output[2:-2].split("...")
+        return [dict(zip(("id", "property"), part.rsplit(".", 1))) for part in parts]
+    return dict(zip(("id", "property"), output.rsplit(".", 1)))
+
+
+class SimulatedUser:
+    """
+    Holds the component props a browser tab would have and fires callbacks against them.
+    """
+
+    def __init__(self, transport, callbacks, recorder, poll_interval, profile):
+        self.transport = transport
+        self.callbacks = callbacks
+        self.recorder = recorder
+        self.poll_interval = poll_interval
+        self.props = dict(profile)
+
+    def fire(self, name, **changed):
+        output, inputs, state = self.callbacks[name]
+        changed = {key.replace("__", "."): value for key, value in changed.items()}
+        self.props.update(changed)
+        payload = {
+            "output": output,
+            "outputs": _split_outputs(output),
+            "inputs": [{"id": i, "property": p, "value": self.props.get(f"{i}.{p}")} for i, p in inputs],
+            "state": [{"id": i, "property": p, "value": self.props.get(f"{i}.{p}")} for i, p in state],
+            "changedPropIds": list(changed) or [f"{inputs[0][0]}.{inputs[0][1]}"],
+        }
+        started = time.perf_counter()
+        status, body = self.transport.post_json("/_dash-update-component", payload)
+        self.recorder.record("callback", name, time.perf_counter() - started, ok=status in (200, 204))
+        for component_id, props in ((body or {}).get("response") or {}).items():
+            for prop, value in props.items():
+                self.props[f"{component_id}.{prop.split('@')[0]}"] = value
+
+    def wait_for_job(self, poll_name, interval_id):
+        ticks = 0
+        while not self.props.get(f"{interval_id}.disabled", True):
+            time.sleep(self.poll_interval)
+            ticks += 1
+            self.fire(poll_name, **{f"{interval_id}__n_intervals": ticks})
+
+    def step(self, name, fn):
+        started = time.perf_counter()
+        fn()
+        self.recorder.record("step", name, time.perf_counter() - started)
+
+    def walk(self):
+        started = time.perf_counter()
+        self.step("form", lambda: (
+            self.fire("display_page", url__pathname="/"),
+            self.fire("update_user_data", **{"name-input__value": self.props["name-input.value"]}),
+            self.fire("navigate_next", **{"next-page-button__n_clicks": 1}),
+        ))
+        self.step("meal_plan", lambda: (
+            self.fire("display_page", url__pathname="/meal-planner"),
+            self.fire("generate_meal_plan", **{"generate-meal-plan-button__n_clicks": 1}),
+            self.wait_for_job("poll_meal_plan_job", "meal-plan-job-interval"),
+            self.fire("record_history", **{"meal-plan-data-store__data": self.props.get("meal-plan-data-store.data")}),
+        ))
+        self.step("tracker", lambda: (
+            self.fire("navigate_next", **{"next-page-button__n_clicks": 2}),
+            self.fire("display_page", url__pathname="/tracker"),
+            self.fire("update_planned_meal", url__pathname="/tracker"),
+            self.fire("evaluate_commitment", **{"eaten-meal-input__value": EATEN_MEAL,
+                                                "evaluate-commitment-button__n_clicks": 1}),
+            self.wait_for_job("poll_commitment_job", "tracker-job-interval"),
+            self.fire("record_history", **{"tracker-summary-store__data": self.props.get("tracker-summary-store.data")}),
+            self.fire("update_trend_chart", **{"history-store__data": self.props.get("history-store.data")}),
+        ))
+        self.step("motivation", lambda: (
+            self.fire("navigate_next", **{"next-page-button__n_clicks": 3}),
+            self.fire("display_page", url__pathname="/motivation"),
+            self.fire("get_motivation", **{"get-motivation-button__n_clicks": 1}),
+            self.wait_for_job("poll_motivation_job", "motivation-job-interval"),
+            self.fire("record_history", **{"motivation-data-store__data": self.props.get("motivation-data-store.data")}),
+        ))
+        self.step("report", lambda: self.fire("download_report", **{"download-report-button__n_clicks": 1}))
+        self.recorder.record("step", "walk", time.perf_counter() - started,
+                             ok=bool(self.props.get("download-html-report.data")))
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, kind, name, seconds, ok=True):
+        with self._lock:
+            self.samples.setdefault((kind, name), []).append(seconds)
+            if not ok:
+                self.errors[f"{kind}:{name}"] = self.errors.get(f"{kind}:{name}", 0) + 1
+
+    def summary(self, kind):
+        # Imported here: batch imports the plan cache, which main() configures through the environment first.
+        from batch import percentile
+
+        result = {}
+        for (sample_kind, name), values in sorted(self.samples.items()):
+            if sample_kind == kind:
+                result[name] = {"count": len(values),
+                                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                                "p99_ms": round(percentile(values, 0.99) * 1000, 2)}
+        return result
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+
+
+def git_revision():
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                  cwd=here).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, cwd=here).stdout.strip()
+    except OSError:
+        return None
+    return f"{revision}-dirty" if revision and dirty else revision or None
+
+
+def run(users, walks, poll_interval, url=None):
+    import app
+
+    transport = HTTPTransport(url) if url else TestClientTransport(app.server)
+    callbacks = callbacks_by_name(app.app)
+    recorder = Recorder()
+    rss_before = rss_mb() if not url else None
+
+    def simulate(user_index):
+        for walk_index in range(walks):
+            profile = dict(BASE_PROFILE)
+            # Distinct bodies per walk; they share calorie bands, so main() also turns the plan cache off.
+            profile["weight-input.value"] = 50 + (user_index * walks + walk_index) % 100
+            profile["age-input.value"] = 18 + (user_index * walks + walk_index) // 100 % 60
+            profile["name-input.value"] = f"مستخدم {user_index}"
+            # What serve_layout() hands every new tab.
+            profile["session-store.data"] = secrets.token_urlsafe(16)
+            profile["user-key-store.data"] = secrets.token_urlsafe(16)
+            SimulatedUser(transport, callbacks, recorder, poll_interval, profile).walk()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        list(executor.map(simulate, range(users)))
+    elapsed = time.perf_counter() - started
+
+    callback_count = sum(item["count"] for item in recorder.summary("callback").values())
+    result = {
+        "elapsed_s": round(elapsed, 3),
+        "walks": users * walks,
+        "walks_per_s": round(users * walks / elapsed, 3),
+        "callbacks_per_s": round(callback_count / elapsed, 2),
+        "steps": recorder.summary("step"),
+        "callbacks": recorder.summary("callback"),
+        "errors": recorder.errors,
+    }
+    if not url:
+        # In-process the benchmark itself is the single app worker.
+        result["memory"] = {"rss_before_mb": rss_before, "rss_after_mb": rss_mb(),
+                            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+    return result
+
+
+def previous_run(path, config):
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("config") == config:
+                previous = record
+    return previous
+
+
+def print_report(record, previous):
+    result = record["result"]
+    print(f"{record['revision']}: {result['walks']} walks in {result['elapsed_s']} s "
+          f"({result['walks_per_s']} walks/s, {result['callbacks_per_s']} callbacks/s)")
+    if "memory" in result:
+        memory = result["memory"]
+        print(f"memory: rss {memory['rss_before_mb']} -> {memory['rss_after_mb']} MB, peak {memory['peak_rss_mb']} MB")
+    if result["errors"]:
+        print(f"errors: {result['errors']}")
+    for section in ("steps", "callbacks"):
+        print(f"\n{section:<28}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'Δp95':>9}")
+        before = previous["result"][section] if previous else {}
+        for name, stats in result[section].items():
+            delta = ""
+            if name in before and before[name]["p95_ms"]:
+                delta = f"{100 * (stats['p95_ms'] / before[name]['p95_ms'] - 1):+.0f}%"
+            print(f"{name:<28}{stats['count']:>6}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+                  f"{stats['p99_ms']:>10.1f}{delta:>9}")
+    if previous:
+        print(f"\nΔ against {previous['revision']} ({previous['timestamp']})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Dash callbacks with simulated users.")
+    parser.add_argument("--users", type=int, default=8, help="concurrent simulated users")
+    parser.add_argument("--walks", type=int, default=2, help="full page walks per user")
+    parser.add_argument("--url", help="benchmark a running server over HTTP instead of in-process")
+    parser.add_argument("--poll-interval", type=float, default=0.2,
+                        help="seconds between job polls (the browser uses JOB_POLL_INTERVAL_MS)")
+    parser.add_argument("--first-token-delay", type=float, default=0.3, help="fake LLM seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="fake LLM output rate")
+    parser.add_argument("--output", default="bench_results/results.jsonl")
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        # Module-level settings are read at import, so they must be in place before `import app`.
+        os.environ["LLM_BACKEND"] = "fake"
+        os.environ["FAKE_LLM_FIRST_TOKEN_DELAY"] = str(args.first_token_delay)
+        os.environ["FAKE_LLM_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+        os.environ.setdefault("AGENT_WARMUP", "sync")
+        os.environ.setdefault("PLAN_CACHE_PATH", "")
+        # Profiles in one calorie band share a plan (energy.py); keep every walk's plan generated.
+        os.environ.setdefault("PLAN_CACHE_MAX_ITEMS", "0")
+    else:
+        os.environ.setdefault("AGENT_WARMUP", "off")
+
+    config = {"users": args.users, "walks": args.walks, "poll_interval": args.poll_interval,
+              "transport": "http" if args.url else "test_client",
+              "first_token_delay": args.first_token_delay, "tokens_per_second": args.tokens_per_second,
+              "workers": int(os.getenv("AGENT_JOB_WORKERS", "4"))}
+    result = run(args.users, args.walks, args.poll_interval, url=args.url)
+    record = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "revision": git_revision(),
+              "python": sys.version.split()[0], "config": config, "result": result}
+
+    previous = previous_run(args.output, config)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print_report(record, previous)
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(inputs, version=""):
+    """
+    Stable hash of a prepared-inputs dict plus the prompt version it will be rendered with.
+    """
+    payload = json.dumps({"v": version, "inputs": inputs}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_instances = []
+
+
+class TTLCache:
+    """
+    Bounded in-memory LRU in front of an on-disk SQLite table.
+
+    Values must be JSON-serializable. Entries expire `ttl` seconds after they
+    were written; the memory tier keeps at most `max_items` entries and the
+    disk tier at most `max_disk_items` rows (least recently used go first).
+    Memory hits refresh the disk row's accessed_at too, in one batched UPDATE
+    at most every `touch_interval` seconds, so the disk LRU keeps hot keys.
+    """
+
+    def __init__(self, path, table="cache", max_items=256, max_disk_items=10000, ttl=7 * 24 * 3600,
+                 touch_interval=30):
+        self.path = path
+        self.table = table
+        self.max_items = max_items
+        self.max_disk_items = max_disk_items
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self._memory = OrderedDict()
+        self._touched = {}
+        self._touched_flushed = time.time()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0,
+                          "evictions": 0, "expirations": 0, "writes": 0}
+        self._conn = None
+        _instances.append(self)
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+            self._conn.commit()
+
+    def get(self, key, default=None, memory=True):
+        """
+        The cached value, or `default`. With memory=False the disk row is read
+        even when the key is in memory (another process may have rewritten it).
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key) if memory else None
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    if self._conn is not None:
+                        self._touched[key] = now
+                        if now - self._touched_flushed >= self.touch_interval:
+                            self._flush_touched(now)
+                            self._conn.commit()
+                    return value
+                del self._memory[key]
+                self._touched.pop(key, None)
+                self._counters["expirations"] += 1
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    raw, created_at = row
+                    if now - created_at <= self.ttl:
+                        self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._conn.commit()
+                        value = json.loads(raw)
+                        self._remember(key, created_at, value)
+                        self._counters["hits"] += 1
+                        self._counters["disk_hits"] += 1
+                        return value
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._counters["expirations"] += 1
+
+            self._counters["misses"] += 1
+            return default
+
+    def set(self, key, value):
+        now = time.time()
+        raw = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, now, value)
+            self._counters["writes"] += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, raw, now, now)
+                )
+                self._trim_disk(now)
+                self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._memory.pop(key, None)
+            self._touched.pop(key, None)
+            if self._conn is not None:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            if self._conn is not None:
+                self._conn.execute(f"DELETE FROM {self.table}")
+                self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_items"] = len(self._memory)
+            if self._conn is not None:
+                stats["disk_items"] = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _remember(self, key, created_at, value):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _flush_touched(self, now):
+        """
+        Writes the accessed_at of keys served from memory since the last flush.
+        """
+        if self._touched:
+            self._conn.executemany(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                                   [(accessed_at, key) for key, accessed_at in self._touched.items()])
+            self._touched.clear()
+        self._touched_flushed = now
+
+    def _trim_disk(self, now):
+        self._flush_touched(now)
+        cur = self._conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl,))
+        self._counters["expirations"] += max(cur.rowcount, 0)
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        overflow = count - self.max_disk_items
+        if overflow > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._counters["evictions"] += overflow
+
+
+def cache_stats():
+    """
+    stats() of every TTLCache created in this process, keyed by table name.
+    """
+    return {cache.table: cache.stats() for cache in _instances}
+
+
+plan_cache = TTLCache(
+    os.getenv("PLAN_CACHE_PATH", "plan_cache.db"),
+    table="meal_plans",
+    max_items=int(os.getenv("PLAN_CACHE_MAX_ITEMS", "256")),
+    max_disk_items=int(os.getenv("PLAN_CACHE_MAX_DISK_ITEMS", "10000")),
+    ttl=int(os.getenv("PLAN_CACHE_TTL", str(7 * 24 * 3600)))
+)
@@ -0,0 +1,158 @@
+"""
+Canonical forms of the free-text diet type, allergy and medical-condition fields.
+
+"كيتو", "كيتو دايت" and "keto" are the same diet, and "جلوتين، لاكتوز",
+"لاكتوز و الجلوتين" and "gluten, lactose" the same allergies.
+
+Each field is split on commas, semicolons, slashes, new lines and "و"/"and".
+Every part is normalized (arabic.tokenize: hamza/alef, ya, ta marbuta,
+tatweel, diacritics and the article) and matched to the longest known
+synonym. The result is a sorted tuple of canonical labels. Words that match
+nothing follow the labels as typed, so no constraint is lost: "بيض كيوي" is
+بيض, then كيوي. Results are memoized; a repeated value costs a dict lookup.
+
+The canonical text replaces the raw field in the meal-planner inputs, so it
+is what the plan-cache key and the prompt see.
+"""
+import functools
+import re
+
+from arabic import normalize_arabic, tokenize
+
+# {canonical label: synonyms}; the label itself always matches.
+DIET_TYPES = {
+    "عادي": ("طبيعي", "متوازن", "normal", "regular", "balanced"),
+    "كيتو": ("كيتو دايت", "كيتوني", "كيتوجينك", "كيتوجينيك", "keto", "keto diet", "ketogenic"),
+    "قليل الكربوهيدرات": ("لو كارب", "قليل الكارب", "low carb", "low-carb"),
+    "قليل الدهون": ("low fat", "low-fat"),
+    "عالي البروتين": ("بروتين عالي", "high protein", "high-protein"),
+    "نباتي": ("vegetarian", "veggie"),
+    "نباتي صرف": ("فيجن", "فيغن", "vegan"),
+    "متوسطي": ("حمية البحر المتوسط", "البحر المتوسط", "mediterranean"),
+    "صيام متقطع": ("الصيام المتقطع", "intermittent fasting"),
+    "باليو": ("paleo",),
+    "خالي من الجلوتين": ("بدون جلوتين", "gluten free", "gluten-free"),
+}
+ALLERGENS = {
+    "جلوتين": ("غلوتين", "الجلوتين", "gluten"),
+    "لاكتوز": ("lactose",),
+    "ألبان": ("حليب", "منتجات الألبان", "dairy", "milk"),
+    "بيض": ("egg", "eggs"),
+    "مكسرات": ("المكسرات", "nuts", "tree nuts"),
+    "فول سوداني": ("فستق سوداني", "peanut", "peanuts"),
+    "أسماك": ("سمك", "fish"),
+    "مأكولات بحرية": ("روبيان", "جمبري", "قشريات", "seafood", "shellfish", "shrimp"),
+    "صويا": ("soy", "soya"),
+    "سمسم": ("طحينة", "sesame"),
+    "قمح": ("wheat",),
+}
+CONDITIONS = {
+    "سكري": ("السكر", "داء السكري", "diabetes", "diabetic"),
+    "ضغط الدم المرتفع": ("ضغط", "ضغط مرتفع", "ارتفاع ضغط الدم", "ضغط الدم", "hypertension", "high blood pressure"),
+    "كوليسترول مرتفع": ("كوليسترول", "كولسترول", "ارتفاع الكوليسترول", "cholesterol", "high cholesterol"),
+    "أمراض القلب": ("القلب", "مرض القلب", "heart disease"),
+    "أمراض الكلى": ("الكلى", "مرض الكلى", "الفشل الكلوي", "kidney disease"),
+    "نقرس": ("gout",),
+    "القولون العصبي": ("قولون", "القولون", "ibs"),
+    "حمل": ("حامل", "pregnancy", "pregnant"),
+    "قصور الغدة الدرقية": ("الغدة الدرقية", "hypothyroidism"),
+    "تكيس المبايض": ("pcos",),
+    "فقر الدم": ("أنيميا", "انيميا", "anemia", "anaemia"),
+}
+VOCABULARIES = {"diet_type": DIET_TYPES, "allergy": ALLERGENS, "conditions": CONDITIONS}
+# What an empty field means, and the text it is rendered as.
+EMPTY_TEXT = {"diet_type": "عادي", "allergy": "لا يوجد", "conditions": "لا يوجد"}
+
+_NOTHING = {normalize_arabic(word) for word in ("لا يوجد", "لايوجد", "لا", "لا شيء", "بدون", "none", "no", "nothing", "-")}
+# Words around a value that don't change it ("حساسية من الجلوتين", "عندي سكري").
+_FILLER = {token for word in ("حساسية", "حساسيه", "من", "عندي", "لدي", "مرض", "داء", "عدم", "تحمل", "allergy",
+                              "allergic", "to", "intolerance", "i", "have", "diet", "دايت", "حمية", "نظام")
+           for token in tokenize(word)}
+_SEPARATORS = re.compile(r"[,،;؛/|+\n]|\s+و\s+|\s+and\s+", re.IGNORECASE)
+
+
+def _key_tokens(text):
+    return tuple(token for token in tokenize(text) if token not in _FILLER)
+
+
+def _typed_tokens(text):
+    """
+    [(token, index of the typed word it came from)] for the non-filler tokens of `text`.
+    """
+    return [(token, index) for index, word in enumerate(text.split())
+            for token in tokenize(word) if token not in _FILLER]
+
+
+def _phrase_table(vocabulary):
+    """
+    {token tuple: canonical label} for every label and synonym, and the longest phrase length.
+    """
+    table = {}
+    for label, synonyms in vocabulary.items():
+        for phrase in (label,) + synonyms:
+            table.setdefault(_key_tokens(phrase), label)
+    return table, max(len(phrase) for phrase in table)
+
+
+_TABLES = {field: _phrase_table(vocabulary) for field, vocabulary in VOCABULARIES.items()}
+
+
+def _match_part(part, table, longest):
+    """
+    (canonical labels, unmatched words as typed or None) for one separated
+    part, by greedy longest match over its tokens.
+    """
+    typed = _typed_tokens(part)
+    tokens = [token for token, _ in typed]
+    labels = []
+    unmatched = set()
+    position = 0
+    while position < len(tokens):
+        for size in range(min(longest, len(tokens) - position), 0, -1):
+            label = table.get(tuple(tokens[position:position + size]))
+            if label is not None:
+                labels.append(label)
+                position += size
+                break
+        else:
+            unmatched.add(typed[position][1])
+            position += 1
+    # Words we can't name are still a constraint: keep them as typed.
+    words = part.split()
+    return labels, " ".join(words[index] for index in sorted(unmatched)) or None
+
+
+@functools.lru_cache(maxsize=4096)
+def canonical_terms(field, text):
+    """
+    Canonical labels for a diet_type, allergy or conditions value, sorted, then any
+    unrecognized words as typed; () when empty or "لا يوجد".
+    """
+    table, longest = _TABLES[field]
+    labels = set()
+    typed = set()
+    for part in _SEPARATORS.split(str(text or "")):
+        part = part.strip(" .-")
+        if not part or normalize_arabic(part) in _NOTHING:
+            continue
+        part_labels, rest = _match_part(part, table, longest)
+        labels.update(part_labels)
+        if rest:
+            typed.add(rest)
+    if field == "diet_type" and len(labels) + len(typed) > 1:
+        labels.discard("عادي")
+    return tuple(sorted(labels)) + tuple(sorted(typed - labels))
+
+
+def canonical_text(field, text):
+    """
+    The canonical labels joined with an Arabic comma, or the field's empty value ("عادي" / "لا يوجد").
+    """
+    return "، ".join(canonical_terms(field, text)) or EMPTY_TEXT[field]
+
+
+def canonicalize(user_data):
+    """
+    Copy of a profile with diet_type, allergy and conditions in canonical form.
+    """
+    return dict(user_data, **{field: canonical_text(field, user_data.get(field)) for field in VOCABULARIES})
@@ -0,0 +1,105 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DATABASE = os.getenv("USERS_DB_PATH", "users.db")
+PASSWORD_METHOD = "pbkdf2:sha256"
+
+USERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL
+);
+"""
+
+
+class ConnectionPool:
+    """
+    At most `size` idle WAL-mode connections to one SQLite file.
+
+    `schema` is run on the first connection, so creating a pool never
+    touches the disk. connection() commits on success and rolls back on error.
+    """
+
+    def __init__(self, path, schema="", size=4):
+        self.path = path
+        self.schema = schema
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            if not self._ready:
+                conn.executescript(self.schema)
+                self._ready = True
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            if self._idle.qsize() < self.size:
+                self._idle.put(conn)
+            else:
+                conn.close()
+
+
+users_pool = ConnectionPool(DATABASE, USERS_SCHEMA, size=int(os.getenv("USERS_POOL_SIZE", "4")))
+
+
+def init_db():
+    with users_pool.connection():
+        pass
+
+
+def create_user(email, password_hash):
+    """
+    Stores an already hashed password; returns the new user id, or None if the email is taken.
+    """
+    try:
+        with users_pool.connection() as conn:
+            return conn.execute("INSERT INTO users (email, password) VALUES (?, ?)", (email, password_hash)).lastrowid
+    except sqlite3.IntegrityError:
+        return None
+
+
+def find_user(email):
+    """
+    (user id, password hash) for `email`, or None.
+    """
+    with users_pool.connection() as conn:
+        return conn.execute("SELECT id, password FROM users WHERE email = ?", (email,)).fetchone()
+
+
+def add_user(email, password):
+    return create_user(email, generate_password_hash(password, method=PASSWORD_METHOD)) is not None
+
+
+def check_user(email, password):
+    user = find_user(email)
+    if user:
+        return check_password_hash(user[1], password)
+    return False
+
+
+if __name__ == "__main__":
+    init_db()
+    print("Database initialized.")
@@ -0,0 +1,111 @@
+"""
+Deterministic daily energy and macro targets from a user profile.
+
+BMR is Mifflin-St Jeor, TDEE is BMR times the activity factor, and the goal
+adds a fixed deficit or surplus. The target is snapped to a band of
+CALORIE_BAND_WIDTH kcal (default 200) and the macros are split from the
+band's midpoint by goal, so every profile that lands in the same band with
+the same goal gets identical meal-planner inputs, and shares its cached plans.
+
+    python energy.py 82 176 34 ذكر متوسط "فقدان الوزن"
+"""
+import os
+import sys
+
+from arabic import normalize_arabic
+
+CALORIE_BAND_WIDTH = int(os.getenv("CALORIE_BAND_WIDTH", "200"))
+
+ACTIVITY_FACTORS = {
+    "كسول": 1.2,
+    "خفيف": 1.375,
+    "متوسط": 1.55,
+    "نشط": 1.725,
+    "نشط جدًا": 1.9,
+}
+# Keyed by the goal-input dropdown values in app.py.
+GOAL_ADJUSTMENTS = {
+    "فقدان الوزن": -500,
+    "الحفاظ على الوزن": 0,
+    "زيادة الوزن": 300,
+}
+# Share of calories from (protein, carbs, fat) per goal.
+MACRO_SPLITS = {
+    "فقدان الوزن": (0.30, 0.40, 0.30),
+    "الحفاظ على الوزن": (0.25, 0.45, 0.30),
+    "زيادة الوزن": (0.25, 0.50, 0.25),
+}
+# Other ways a goal is written (older sessions, batch files).
+GOAL_ALIASES = {
+    "خسارة الوزن": "فقدان الوزن",
+    "إنقاص الوزن": "فقدان الوزن",
+    "تخفيف الوزن": "فقدان الوزن",
+    "تثبيت الوزن": "الحفاظ على الوزن",
+}
+DEFAULT_ACTIVITY_FACTOR = ACTIVITY_FACTORS["متوسط"]
+DEFAULT_GOAL = "الحفاظ على الوزن"
+# Floors below which a plan is not offered without medical supervision.
+MIN_CALORIES = {"ذكر": 1500, "أنثى": 1200}
+
+_ACTIVITY = {normalize_arabic(name): factor for name, factor in ACTIVITY_FACTORS.items()}
+_GOALS = {normalize_arabic(name): name for name in GOAL_ADJUSTMENTS}
+_GOALS.update({normalize_arabic(alias): name for alias, name in GOAL_ALIASES.items()})
+_MALE = normalize_arabic("ذكر")
+
+
+def canonical_goal(goal):
+    """
+    The GOAL_ADJUSTMENTS key for a goal as entered or one of its GOAL_ALIASES, or DEFAULT_GOAL.
+    """
+    return _GOALS.get(normalize_arabic(goal or ""), DEFAULT_GOAL)
+
+
+def bmr(weight, height, age, sex):
+    """
+    Mifflin-St Jeor basal metabolic rate in kcal/day.
+    """
+    base = 10 * weight + 6.25 * height - 5 * age
+    return base + 5 if normalize_arabic(sex or "") == _MALE else base - 161
+
+
+def energy_targets(profile):
+    """
+    {bmr, tdee, target_kcal, calorie_min, calorie_max, protein_g, carbs_g, fat_g}
+    for a prepare_inputs()-style profile.
+
+    Raises ValueError when weight, height or age is missing or not a positive number.
+    """
+    try:
+        weight, height, age = (float(profile.get(field)) for field in ("weight", "height", "age"))
+    except (TypeError, ValueError):
+        raise ValueError("weight, height and age must be numbers")
+    if min(weight, height, age) <= 0:
+        raise ValueError("weight, height and age must be positive")
+    sex = profile.get("sex")
+    goal = canonical_goal(profile.get("goal"))
+    basal = bmr(weight, height, age, sex)
+    tdee = basal * _ACTIVITY.get(normalize_arabic(profile.get("activity_level") or ""), DEFAULT_ACTIVITY_FACTOR)
+    floor = MIN_CALORIES["ذكر" if normalize_arabic(sex or "") == _MALE else "أنثى"]
+    target = max(floor, tdee + GOAL_ADJUSTMENTS[goal])
+    calorie_min = int(target // CALORIE_BAND_WIDTH) * CALORIE_BAND_WIDTH
+    calorie_max = calorie_min + CALORIE_BAND_WIDTH
+    midpoint = (calorie_min + calorie_max) / 2
+    protein, carbs, fat = MACRO_SPLITS[goal]
+    return {
+        "bmr": round(basal),
+        "tdee": round(tdee),
+        "target_kcal": round(target),
+        "calorie_min": calorie_min,
+        "calorie_max": calorie_max,
+        "protein_g": round(midpoint * protein / 4),
+        "carbs_g": round(midpoint * carbs / 4),
+        "fat_g": round(midpoint * fat / 9),
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 7:
+        sys.exit("usage: python energy.py WEIGHT HEIGHT AGE SEX ACTIVITY_LEVEL GOAL")
+    fields = ("weight", "height", "age", "sex", "activity_level", "goal")
+    for key, value in energy_targets(dict(zip(fields, sys.argv[1:]))).items():
+        print(f"{key:<12}{value}")
@@ -0,0 +1,116 @@
+"""
+Per-user history of meal plans, daily commitment results and motivation messages.
+
+Rows live in a WAL-mode SQLite file (HISTORY_DB_PATH, default `history.db`)
+with an index on (user_key, day) for every table, and are read through a
+small pool of connections (database.ConnectionPool) so callbacks don't
+open one per query. Nothing touches the disk until the first query. The user
+key is the browser's persistent `user-key-store` id.
+
+commitment_trend() aggregates in SQL: results are averaged per day, then
+per bucket of days, so a year of data comes back as at most `max_points`
+rows however often the user tracked.
+"""
+import json
+import math
+import os
+import time
+from datetime import date, timedelta
+
+from database import ConnectionPool
+
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "history.db")
+TREND_MAX_POINTS = int(os.getenv("TREND_MAX_POINTS", "120"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meal_plans (
+    id INTEGER PRIMARY KEY, user_key TEXT NOT NULL, day TEXT NOT NULL, created_at REAL NOT NULL,
+    meal_data TEXT NOT NULL, kcal REAL
+);
+CREATE INDEX IF NOT EXISTS meal_plans_user_day ON meal_plans (user_key, day);
+CREATE TABLE IF NOT EXISTS tracker_results (
+    id INTEGER PRIMARY KEY, user_key TEXT NOT NULL, day TEXT NOT NULL, created_at REAL NOT NULL,
+    percentage INTEGER NOT NULL, summary TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tracker_results_user_day ON tracker_results (user_key, day);
+CREATE TABLE IF NOT EXISTS motivations (
+    id INTEGER PRIMARY KEY, user_key TEXT NOT NULL, day TEXT NOT NULL, created_at REAL NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS motivations_user_day ON motivations (user_key, day);
+"""
+
+
+class HistoryStore:
+    """
+    History tables behind a pool of at most `pool_size` idle SQLite connections.
+    """
+
+    def __init__(self, path, pool_size=4):
+        self.path = path
+        self._pool = ConnectionPool(path, SCHEMA, size=pool_size)
+
+    def connection(self):
+        return self._pool.connection()
+
+    def add_meal_plan(self, user_key, meal_data, day=None):
+        kcal = (meal_data.get("estimate") or {}).get("kcal")
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT INTO meal_plans (user_key, day, created_at, meal_data, kcal) VALUES (?, ?, ?, ?, ?)",
+                (user_key, _day(day), time.time(), json.dumps(meal_data, ensure_ascii=False), kcal)
+            )
+
+    def add_tracker_result(self, user_key, percentage, summary, day=None):
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT INTO tracker_results (user_key, day, created_at, percentage, summary) VALUES (?, ?, ?, ?, ?)",
+                (user_key, _day(day), time.time(), int(percentage), summary)
+            )
+
+    def add_motivation(self, user_key, message, day=None):
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT INTO motivations (user_key, day, created_at, message) VALUES (?, ?, ?, ?)",
+                (user_key, _day(day), time.time(), message)
+            )
+
+    def latest_meal_plan(self, user_key):
+        """
+        The user's most recent meal-plan-data payload, or None.
+        """
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT meal_data FROM meal_plans WHERE user_key = ? ORDER BY day DESC, id DESC LIMIT 1",
+                (user_key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def commitment_trend(self, user_key, days=90, max_points=TREND_MAX_POINTS, today=None):
+        """
+        [{day, percentage, low, high, days}] for the last `days` days, oldest first.
+
+        Each point covers `ceil(days / max_points)` calendar days: `percentage`
+        is the mean of the daily averages in it, `low`/`high` their range and
+        `days` how many of them had a result.
+        """
+        end = today or date.today()
+        start = end - timedelta(days=days - 1)
+        bucket_days = max(1, math.ceil(days / max_points))
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT MIN(day), AVG(pct), MIN(pct), MAX(pct), COUNT(*) FROM ("
+                "  SELECT day, AVG(percentage) AS pct FROM tracker_results"
+                "  WHERE user_key = ? AND day BETWEEN ? AND ? GROUP BY day"
+                ") GROUP BY CAST((julianday(day) - julianday(?)) / ? AS INTEGER) ORDER BY 1",
+                (user_key, start.isoformat(), end.isoformat(), start.isoformat(), bucket_days)
+            ).fetchall()
+        return [{"day": day, "percentage": round(mean, 1), "low": low, "high": high, "days": count}
+                for day, mean, low, high, count in rows]
+
+
+def _day(day):
+    return (day or date.today()).isoformat()
+
+
+history_store = HistoryStore(HISTORY_DB_PATH, pool_size=int(os.getenv("HISTORY_POOL_SIZE", "4")))
@@ -0,0 +1,261 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from database import ConnectionPool
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+JOB_LOST = "توقفت العملية التي كانت تنفذ هذا الطلب. الرجاء المحاولة مرة أخرى."
+# How often a running job looks for a cancel request made through another worker.
+CANCEL_POLL_SECONDS = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY, name TEXT NOT NULL, streaming INTEGER NOT NULL, status TEXT NOT NULL,
+    progress TEXT NOT NULL, result TEXT, error TEXT, owner INTEGER NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL, started_at REAL, finished_at REAL
+);
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """
+    Handle passed to a job function so it can publish progress and notice cancellation.
+    """
+
+    def __init__(self, job_id, name, streaming=False):
+        self.id = job_id
+        self.name = name
+        self.streaming = streaming
+        self.status = QUEUED
+        self.progress = ""
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._cancel_checked = 0.0
+        self._manager = None
+        self.future = None
+
+    @property
+    def cancelled(self):
+        if not self._cancel_event.is_set() and self._manager is not None:
+            now = time.time()
+            if now - self._cancel_checked >= CANCEL_POLL_SECONDS:
+                self._cancel_checked = now
+                if self._manager._cancel_requested(self.id):
+                    self._cancel_event.set()
+        return self._cancel_event.is_set()
+
+    def set_progress(self, message):
+        self.progress = message
+        if self._manager is not None:
+            self._manager._save(self)
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(self.id)
+
+    def snapshot(self):
+        return {
+            "id": self.id, "name": self.name, "streaming": self.streaming, "status": self.status,
+            "progress": self.progress,
+            "result": self.result, "error": self.error, "created_at": self.created_at,
+            "started_at": self.started_at, "finished_at": self.finished_at
+        }
+
+
+class JobManager:
+    """
+    Job queue on a bounded thread pool, with status shared through SQLite.
+
+    Job functions are called as fn(job, *args, **kwargs); jobs submitted with
+    streaming=True publish text chunks to a stream buffer. Cancellation is
+    cooperative: queued jobs never start, running jobs are marked cancelled and
+    their result is discarded (long steps may call job.check_cancelled()).
+    Finished jobs are forgotten `retention` seconds after they finish.
+
+    A job runs in the process that submitted it, but with a `path` its
+    status, progress and result are written to a table there, so under
+    several gunicorn workers a poll or cancel landing on another worker
+    still finds it. A job whose process has died is reported as failed.
+    """
+
+    def __init__(self, max_workers=4, retention=600, path=None):
+        self.max_workers = max_workers
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._store = ConnectionPool(path, SCHEMA) if path else None
+
+    def submit(self, name, fn, *args, streaming=False, **kwargs):
+        self._purge()
+        job = Job(uuid.uuid4().hex, name, streaming=streaming)
+        job._manager = self
+        with self._lock:
+            self._jobs[job.id] = job
+        self._save(job)
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def get(self, job_id):
+        """
+        The Job if it runs in this process, else None.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        job = self.get(job_id)
+        return job.snapshot() if job else self._load(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return self._request_cancel(job_id)
+        if job.status in FINISHED_STATES:
+            return False
+        job._cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)
+        return True
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {state: 0 for state in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+        for job in jobs:
+            counts[job.status] += 1
+        counts["max_workers"] = self.max_workers
+        return counts
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled:
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        self._save(job)
+        try:
+            result = fn(job, *args, **kwargs)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            self._finish(job, FAILED)
+        else:
+            if job.cancelled:
+                self._finish(job, CANCELLED)
+            else:
+                job.result = result
+                self._finish(job, DONE)
+
+    def _finish(self, job, status):
+        job.finished_at = time.time()
+        job.status = status
+        self._save(job)
+
+    def _save(self, job):
+        if self._store is None:
+            return
+        result = json.dumps(job.result, ensure_ascii=False) if job.result is not None else None
+        with self._store.connection() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, name, streaming, status, progress, result, error, owner, created_at, "
+                "started_at, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET status = excluded.status, progress = excluded.progress, "
+                "result = excluded.result, error = excluded.error, started_at = excluded.started_at, "
+                "finished_at = excluded.finished_at",
+                (job.id, job.name, int(job.streaming), job.status, job.progress, result, job.error, os.getpid(),
+                 job.created_at, job.started_at, job.finished_at)
+            )
+
+    def _load(self, job_id):
+        """
+        snapshot() of a job started by another process, or None.
+        """
+        if self._store is None:
+            return None
+        with self._store.connection() as conn:
+            row = conn.execute(
+                "SELECT id, name, streaming, status, progress, result, error, owner, created_at, started_at, "
+                "finished_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        (job_id, name, streaming, status, progress, result, error, owner,
+         created_at, started_at, finished_at) = row
+        if status not in FINISHED_STATES and not _process_alive(owner):
+            status, error = FAILED, JOB_LOST
+        return {
+            "id": job_id, "name": name, "streaming": bool(streaming), "status": status, "progress": progress,
+            "result": json.loads(result) if result is not None else None, "error": error,
+            "created_at": created_at, "started_at": started_at, "finished_at": finished_at
+        }
+
+    def _request_cancel(self, job_id):
+        if self._store is None:
+            return False
+        with self._store.connection() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status NOT IN (?, ?, ?)", (job_id, *FINISHED_STATES)
+            )
+        return cursor.rowcount > 0
+
+    def _cancel_requested(self, job_id):
+        if self._store is None:
+            return False
+        with self._store.connection() as conn:
+            row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def _purge(self):
+        cutoff = time.time() - self.retention
+        with self._lock:
+            stale = [job_id for job_id, job in self._jobs.items()
+                     if job.status in FINISHED_STATES and job.finished_at and job.finished_at < cutoff]
+            for job_id in stale:
+                del self._jobs[job_id]
+        if self._store is not None:
+            with self._store.connection() as conn:
+                # Unfinished rows this old belong to a process that died mid-job.
+                conn.execute("DELETE FROM jobs WHERE finished_at < ? OR created_at < ?", (cutoff, cutoff - 24 * 3600))
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+job_manager = JobManager(
+    max_workers=int(os.getenv("AGENT_JOB_WORKERS", "4")),
+    retention=int(os.getenv("AGENT_JOB_RETENTION", "600")),
+    path=os.getenv("AGENT_JOB_DB_PATH", "jobs.db")
+)
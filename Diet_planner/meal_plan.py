@@ -0,0 +1,226 @@
+import re
+from datetime import date, datetime
+
+from arabic import normalize_arabic
+
+TOTAL_CALORIES_MARKER = normalize_arabic("إجمالي السعرات")
+_ITEM_BULLET = re.compile(r"^\s*(?:[-•]|\*(?!\*)|\d+[.)](?!\d))\s*")
+# "🍳 الفطور:", also wrapped in Markdown bold or after a heading mark ("**الفطور:**", "### الغداء:").
+_SECTION_HEADER = re.compile(
+    r"^(?:#+\s*)?(?:\*\*|__)?\s*(?P<emoji>[^\w\s(*#]+(?:\s*[^\w\s(*#]+)*)?\s*(?P<title>[^:*]+?)\s*"
+    r"(?:\*\*|__)?\s*:\s*(?:\*\*|__)?$"
+)
+_GRAMS = re.compile(r"\(\s*(\d+(?:\.\d+)?)\s*(جم|جرام|غرام|g|مل|ml)\s*\)", re.IGNORECASE)
+_LEADING_QUANTITY = re.compile(
+    r"^(?P<qty>(?:\d+(?:\.\d+)?|نصف|ربع|ثلث)\s+"
+    r"(?:ملاعق|ملعقة|ملعقتان|كوب|أكواب|شريحة|شرائح|حبة|حبات|قطعة|قطع|حفنة|طبق|ثمرة))\s+"
+)
+_CALORIES = re.compile(r"(\d+)(?:\s*[-–]\s*(\d+))?")
+DAY_LABELS = ("اليوم الأول", "اليوم الثاني", "اليوم الثالث", "اليوم الرابع",
+              "اليوم الخامس", "اليوم السادس", "اليوم السابع")
+
+
+class MealItem:
+    __slots__ = ("text", "quantity", "grams", "_name")
+
+    def __init__(self, text, quantity=None, grams=None, name=None):
+        self.text = text
+        self.quantity = quantity
+        self.grams = grams
+        self._name = name
+
+    @property
+    def name(self):
+        """
+        Item text without its quantity, e.g. "أرز بني" for "4 ملاعق أرز بني".
+        """
+        if self._name is None:
+            self._name = _strip_quantity(self.text)
+        return self._name
+
+    def to_list(self):
+        data = [self.text, self.quantity, self.grams]
+        while len(data) > 1 and data[-1] is None:
+            data.pop()
+        return data
+
+    @classmethod
+    def from_list(cls, data):
+        return cls(*data)
+
+
+class MealSection:
+    __slots__ = ("emoji", "title", "items")
+
+    def __init__(self, emoji, title, items=None):
+        self.emoji = emoji
+        self.title = title
+        self.items = items if items is not None else []
+
+    @property
+    def heading(self):
+        return f"{self.emoji} {self.title}".strip()
+
+
+class MealPlan:
+    """
+    Parsed meal plan: sections of items plus the total-calorie line and any
+    lines that fit neither (kept as notes so nothing the model wrote is lost).
+    """
+
+    __slots__ = ("sections", "total_line", "calories_min", "calories_max", "notes")
+
+    def __init__(self, sections=None, total_line=None, calories_min=None, calories_max=None, notes=None):
+        self.sections = sections if sections is not None else []
+        self.total_line = total_line
+        self.calories_min = calories_min
+        self.calories_max = calories_max
+        self.notes = notes if notes is not None else []
+
+    @property
+    def items(self):
+        return [item for section in self.sections for item in section.items]
+
+    def to_text(self):
+        blocks = []
+        if self.notes:
+            blocks.append("\n".join(self.notes))
+        for section in self.sections:
+            lines = ([f"{section.heading}:"] if section.heading else []) + [f"- {item.text}" for item in section.items]
+            blocks.append("\n".join(lines))
+        if self.total_line:
+            blocks.append(self.total_line)
+        return "\n\n".join(blocks)
+
+    def to_dict(self):
+        data = {"sections": [[s.emoji, s.title, [item.to_list() for item in s.items]] for s in self.sections]}
+        if self.total_line:
+            data["total"] = self.total_line
+            data["calories"] = [self.calories_min, self.calories_max]
+        if self.notes:
+            data["notes"] = self.notes
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        sections = [MealSection(emoji, title, [MealItem.from_list(item) for item in items])
+                    for emoji, title, items in data.get("sections", [])]
+        calories_min, calories_max = data.get("calories") or [None, None]
+        return cls(sections, data.get("total"), calories_min, calories_max, data.get("notes") or [])
+
+
+def _strip_quantity(text):
+    name = _GRAMS.sub("", text).strip()
+    leading = _LEADING_QUANTITY.match(name)
+    if leading:
+        name = name[leading.end():]
+    return re.sub(r"\s{2,}", " ", name).strip()
+
+
+def parse_item(text):
+    grams = None
+    quantity = None
+    match = _GRAMS.search(text)
+    if match:
+        grams = float(match.group(1))
+        quantity = f"{match.group(1)} {match.group(2)}"
+    else:
+        leading = _LEADING_QUANTITY.match(text)
+        if leading:
+            quantity = leading.group("qty")
+    return MealItem(text, quantity, grams)
+
+
+def parse_meal_plan(text):
+    """
+    Parses the planner's emoji-delimited plain-text format ("🍳 الفطور:" followed by
+    "- item" lines, ending with the total-calorie line) into a MealPlan.
+
+    Items that come before any section header go into an untitled section.
+    """
+    plan = MealPlan()
+    current = None
+    for line in (text or "").splitlines():
+        stripped = line.strip()
+        if not stripped or set(stripped) <= {"-", "—", "_"}:
+            continue
+        normalized = normalize_arabic(stripped)
+        if TOTAL_CALORIES_MARKER in normalized:
+            plan.total_line = stripped
+            match = _CALORIES.search(normalized.split(":", 1)[-1])
+            if match:
+                plan.calories_min = int(match.group(1))
+                plan.calories_max = int(match.group(2) or match.group(1))
+            continue
+        if not _ITEM_BULLET.match(line):
+            header = _SECTION_HEADER.match(stripped)
+            if header:
+                current = MealSection((header.group("emoji") or "").strip(), header.group("title"))
+                plan.sections.append(current)
+                continue
+            if current is None:
+                plan.notes.append(stripped)
+                continue
+        item = _ITEM_BULLET.sub("", line).strip()
+        if item:
+            if current is None:
+                current = MealSection("", "")
+                plan.sections.append(current)
+            current.items.append(parse_item(item))
+    plan.sections = [section for section in plan.sections if section.items]
+    return plan
+
+
+def load_meal_plan(meal_data):
+    """
+    MealPlan from a meal-plan-data-store payload, or None when no plan was generated.
+    """
+    if not meal_data or not meal_data.get("plan"):
+        return None
+    return MealPlan.from_dict(meal_data["plan"])
+
+
+def day_label(day_index):
+    return DAY_LABELS[day_index] if day_index < len(DAY_LABELS) else f"اليوم {day_index + 1}"
+
+
+def combine_day_plans(plans):
+    """
+    One MealPlan showing every day of a multi-day plan: each section is
+    prefixed with its day, and the total line gives the daily average.
+    """
+    combined = MealPlan()
+    daily_calories = []
+    for day_index, plan in enumerate(plans):
+        label = day_label(day_index)
+        for section in plan.sections:
+            title = f"{label} - {section.title}" if section.title else label
+            combined.sections.append(MealSection(section.emoji, title, section.items))
+        if plan.calories_min is not None:
+            daily_calories.append((label, plan.calories_min, plan.calories_max))
+    if daily_calories:
+        combined.sections.append(MealSection("📊", "السعرات اليومية", [
+            MealItem(f"{label}: {low}-{high} سعرة حرارية") for label, low, high in daily_calories
+        ]))
+        combined.calories_min = round(sum(low for _, low, _ in daily_calories) / len(daily_calories))
+        combined.calories_max = round(sum(high for _, _, high in daily_calories) / len(daily_calories))
+        combined.total_line = (f"إجمالي السعرات الحرارية التقريبي لليوم (متوسط {len(daily_calories)} أيام): "
+                               f"{combined.calories_min}-{combined.calories_max} سعرة حرارية")
+    return combined
+
+
+def load_day_plan(meal_data, today=None):
+    """
+    Today's MealPlan from a meal-plan-data-store payload: for a multi-day plan
+    the day matching how long ago it was generated (wrapping around), else
+    the whole plan.
+    """
+    days = (meal_data or {}).get("days")
+    if not days:
+        return load_meal_plan(meal_data)
+    try:
+        start = datetime.fromisoformat(meal_data["timestamp"]).date()
+    except (KeyError, TypeError, ValueError):
+        start = today or date.today()
+    offset = ((today or date.today()) - start).days
+    return MealPlan.from_dict(days[offset % len(days)])
@@ -0,0 +1,258 @@
+"""
+Motivation messages from a local library instead of an LLM call per click.
+
+The library holds curated titles, messages and tips for each commitment
+band (the tracker's 85/70/50/0 thresholds) plus goal-specific tips and a
+list of articles. pick() draws one variant of each and fills in the
+username: no I/O beyond a cache lookup, well under a millisecond.
+
+Messages written by the motivation agent can join the library: refresh()
+asks the agent for a message for one band, with a placeholder instead of a
+name, and keeps the newest MOTIVATION_VARIANTS per band in
+`motivation_library.db` (MOTIVATION_LIBRARY_PATH). With
+MOTIVATION_REFRESH_SECONDS set, a background thread does that for every
+band on that interval, in one process only: workers sharing the library
+file take turns through a lease row in it. A fresh message written for the
+user is opt-in on the motivation page.
+"""
+import os
+import random
+import threading
+import time
+import traceback
+
+import agents.motivation_agent
+from agents.crew_pool import register_pool
+from cache import TTLCache
+from database import ConnectionPool
+from energy import DEFAULT_GOAL, canonical_goal
+from ratelimit import BATCH, llm_limiter
+from scoring import COMMITMENT_BANDS, commitment_emoji
+
+MOTIVATION_VARIANTS = int(os.getenv("MOTIVATION_VARIANTS", "5"))
+USERNAME_PLACEHOLDER = "{username}"
+REFRESH_LEASE = "motivation-refresh"
+
+LEASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, holder TEXT NOT NULL, expires REAL NOT NULL);
+"""
+
+CURATED = {
+    85: {
+        "titles": ["💪 استمر يا بطل!", "🌟 أداء رائع!", "🔥 أنت على الطريق الصحيح!"],
+        "messages": [
+            "يا {username}، التزامك اليوم ممتاز. هذا الثبات هو ما يصنع الفرق على المدى الطويل، فكن فخورًا بما أنجزته.",
+            "أحسنت يا {username}! يومك كان قريبًا جدًا من خطتك، وهذه العادة الصغيرة المتكررة هي سر الوصول إلى هدفك.",
+            "يا {username}، أنت تثبت لنفسك يومًا بعد يوم أنك قادر. حافظ على هذا الإيقاع ولا تنسَ أن تكافئ نفسك.",
+        ],
+        "tips": [
+            "دوّن ما ساعدك على الالتزام اليوم لتكرره غدًا.",
+            "كافئ نفسك بطرق غير غذائية، مثل نزهة أو كتاب جديد.",
+            "جرّب وصفة صحية جديدة هذا الأسبوع حتى لا تشعر بالملل.",
+            "حافظ على مواعيد نومك، فالنوم الجيد يدعم الالتزام.",
+            "شارك إنجازك مع صديق يشجعك على الاستمرار.",
+        ],
+    },
+    70: {
+        "titles": ["👍 خطوات ثابتة!", "🌱 تقدم ملحوظ!", "💪 قريب جدًا من هدفك!"],
+        "messages": [
+            "يا {username}، أنت قريب من خطتك وهذا إنجاز حقيقي. بعض التعديلات البسيطة ستوصلك إلى مستوى أعلى.",
+            "عمل جيد يا {username}! التزمت بمعظم خطتك اليوم، وكل يوم يشبهه يقربك أكثر من هدفك.",
+            "يا {username}، التحسن لا يحتاج إلى الكمال. أنت في الاتجاه الصحيح، فركّز على وجبة واحدة تريد ضبطها غدًا.",
+        ],
+        "tips": [
+            "جهّز وجباتك مسبقًا في الأيام المزدحمة.",
+            "احمل معك وجبة خفيفة صحية لتتجنب الجوع المفاجئ.",
+            "اشرب كوب ماء قبل كل وجبة.",
+            "حدد الوجبة التي تخرج فيها عن الخطة غالبًا وخطط لها بديلًا.",
+            "تناول طعامك ببطء وبدون شاشات.",
+        ],
+    },
+    50: {
+        "titles": ["🌤️ كل يوم فرصة جديدة!", "🧭 لنعد إلى المسار!", "💡 خطوة صغيرة تكفي!"],
+        "messages": [
+            "يا {username}، التزمت بجزء من خطتك وهذه بداية يمكن البناء عليها. اختر هدفًا واحدًا بسيطًا لغدٍ وحققه.",
+            "لا بأس يا {username}، الأيام غير المثالية جزء من الطريق. المهم أن تعرف ما الذي أبعدك عن الخطة اليوم.",
+            "يا {username}، التقدم يأتي من خطوات صغيرة متكررة. ابدأ غدًا بفطور من خطتك وستجد أن الباقي أسهل.",
+        ],
+        "tips": [
+            "ابدأ يومك بفطور من خطتك، فهو يضبط بقية اليوم.",
+            "أبعد الوجبات السريعة عن متناول يدك في المنزل والعمل.",
+            "خطط لوجبات الغد مساء اليوم.",
+            "استبدل وجبة خفيفة غير صحية واحدة ببديل من خطتك.",
+            "ضع تذكيرًا على هاتفك لمواعيد الوجبات.",
+        ],
+    },
+    0: {
+        "titles": ["🤝 نحن معك!", "🌱 البداية دائمًا ممكنة!", "💙 لا تستسلم!"],
+        "messages": [
+            "يا {username}، يوم صعب لا يعني الفشل. كل رحلة ناجحة مرت بأيام كهذه، والمهم أن تبدأ من جديد غدًا.",
+            "يا {username}، لا تقسُ على نفسك. اختر تغييرًا واحدًا صغيرًا لغدٍ، فالنجاح يُبنى خطوة بخطوة.",
+            "نحن هنا لدعمك يا {username}. ابدأ بوجبة واحدة فقط من خطتك غدًا، وستشعر بالفرق.",
+        ],
+        "tips": [
+            "لا تحاول تغيير كل شيء مرة واحدة؛ ابدأ بوجبة واحدة.",
+            "تذكر سبب بدئك واكتبه في مكان تراه يوميًا.",
+            "اطلب دعم شخص قريب منك.",
+            "احتفل بكل تحسن صغير مهما بدا بسيطًا.",
+            "إذا كانت الخطة صعبة التطبيق، عدّلها لتناسب يومك بدل التخلي عنها.",
+        ],
+    },
+}
+GOAL_TIPS = {
+    "فقدان الوزن": [
+        "املأ نصف طبقك بالخضار لتشعر بالشبع بسعرات أقل.",
+        "قلل المشروبات المحلاة واستبدلها بالماء.",
+        "أضف مشيًا لمدة 20 دقيقة إلى يومك.",
+    ],
+    "زيادة الوزن": [
+        "أضف وجبة خفيفة غنية بالسعرات الصحية مثل المكسرات أو زبدة الفول السوداني.",
+        "لا تفوّت أي وجبة، فكل وجبة تقربك من هدفك.",
+        "اجمع بين التغذية الجيدة وتمارين المقاومة لبناء العضلات.",
+    ],
+    "الحفاظ على الوزن": [
+        "راقب وزنك مرة أسبوعيًا لتكتشف أي تغيير مبكرًا.",
+        "وازن بين الوجبات الثقيلة والخفيفة خلال الأسبوع.",
+        "حافظ على نشاط بدني منتظم تستمتع به.",
+    ],
+}
+# (title, url, bands it suits)
+ARTICLES = [
+    ("10 خطوات لحياة أكثر صحة",
+     "https://www.mayoclinic.org/healthy-lifestyle/adult-health/in-depth/10-steps-to-a-healthier-life/art-20047764",
+     (85, 70, 50, 0)),
+    ("كيف تجعل الأكل الصحي ممتعًا؟", "https://www.eatingwell.com/article/290634/how-to-make-healthy-eating-fun/",
+     (85, 70, 50)),
+    ("فوائد ممارسة الرياضة للصحة النفسية",
+     "https://www.helpguide.org/articles/healthy-living/the-mental-health-benefits-of-exercise.htm",
+     (85, 70, 50, 0)),
+    ("كيفية التغلب على التسويف في تحقيق الأهداف", "https://www.mindtools.com/a5444x0/overcoming-procrastination",
+     (50, 0)),
+    ("النظام الغذائي الصحي (منظمة الصحة العالمية)", "https://www.who.int/news-room/fact-sheets/detail/healthy-diet",
+     (85, 70, 50, 0)),
+    ("دليل الأكل الصحي (NHS)", "https://www.nhs.uk/live-well/eat-well/", (70, 50, 0)),
+]
+BANDS = tuple(threshold for threshold, _ in COMMITMENT_BANDS)
+# Commitment percentages to describe each band with when asking the agent for a message.
+_SAMPLE_PERCENTAGES = {85: (85, 100), 70: (70, 84), 50: (50, 69), 0: (20, 49)}
+
+
+def band_for(percentage):
+    for threshold in BANDS:
+        if (percentage or 0) >= threshold:
+            return threshold
+    return BANDS[-1]
+
+
+def _agent_message(band):
+    low, high = _SAMPLE_PERCENTAGES[band]
+    percentage = random.randint(low, high)
+    inputs = {"username": USERNAME_PLACEHOLDER, "commitment_percentage": percentage,
+              "tracker_summary": f"{percentage}% {commitment_emoji(percentage)}"}
+    return register_pool("motivation", "motivation_agent", "motivate_user_task").kickoff(inputs).raw
+
+
+class MotivationLibrary:
+    """
+    Curated content plus up to `max_variants` agent-written messages per band, stored in a TTLCache.
+    """
+
+    def __init__(self, cache, max_variants=MOTIVATION_VARIANTS, generate=_agent_message):
+        self.cache = cache
+        self.max_variants = max_variants
+        self.generate = generate
+        self._refresher = None
+        self._leases = ConnectionPool(cache.path, LEASE_SCHEMA, size=1) if cache.path else None
+
+    def variants(self, band):
+        return self.cache.get(str(band)) or []
+
+    def compose(self, band, username, goal=None, rng=random):
+        content = CURATED[band]
+        tips = rng.sample(content["tips"], 2) + rng.sample(GOAL_TIPS[canonical_goal(goal or DEFAULT_GOAL)], 1)
+        articles = rng.sample([article for article in ARTICLES if band in article[2]], 3)
+        return "\n".join([
+            f"**{rng.choice(content['titles'])}**",
+            "",
+            rng.choice(content["messages"]).format(username=username),
+            "",
+            "**💡 نصائح سريعة:**",
+            *[f"* {tip}" for tip in tips],
+            "",
+            "**📚 مقالات مقترحة:**",
+            *[f"* [{title}]({url})" for title, url, _ in articles],
+        ])
+
+    def pick(self, username, percentage, goal=None, rng=random):
+        """
+        A Markdown motivation message for `username` at this commitment percentage.
+        """
+        band = band_for(percentage)
+        generated = self.variants(band)
+        if generated and rng.random() < len(generated) / (len(generated) + len(CURATED[band]["messages"])):
+            return rng.choice(generated).replace(USERNAME_PLACEHOLDER, username)
+        return self.compose(band, username, goal, rng)
+
+    def refresh(self, band):
+        """
+        Adds a newly generated message to `band`, dropping the oldest past max_variants.
+        """
+        text = (self.generate(band) or "").strip()
+        if not text:
+            return
+        variants = [text] + [variant for variant in self.variants(band) if variant != text]
+        self.cache.set(str(band), variants[:self.max_variants])
+
+    def refresh_all(self):
+        for band in BANDS:
+            try:
+                self.refresh(band)
+            except Exception:
+                traceback.print_exc()
+
+    def hold_lease(self, seconds, holder=None):
+        """
+        Takes or renews the refresher lease for `seconds`; False while another live process holds it.
+        """
+        if self._leases is None:
+            return True
+        holder = holder or str(os.getpid())
+        now = time.time()
+        with self._leases.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT holder, expires FROM leases WHERE name = ?", (REFRESH_LEASE,)).fetchone()
+            if row is not None and row[0] != holder and row[1] > now:
+                return False
+            conn.execute("INSERT OR REPLACE INTO leases (name, holder, expires) VALUES (?, ?, ?)",
+                         (REFRESH_LEASE, holder, now + seconds))
+        return True
+
+    def start_refresher(self, interval):
+        """
+        Refreshes every band now and then every `interval` seconds on a daemon
+        thread, while this process holds the refresher lease.
+        """
+        if self._refresher is not None or interval <= 0:
+            return
+
+        def loop():
+            while True:
+                # Renewed every round; lapses two intervals after the holder stops.
+                try:
+                    if self.hold_lease(2 * interval):
+                        with llm_limiter.lane(BATCH):
+                            self.refresh_all()
+                except Exception:
+                    traceback.print_exc()
+                time.sleep(interval)
+
+        self._refresher = threading.Thread(target=loop, name="motivation-refresh", daemon=True)
+        self._refresher.start()
+
+
+motivation_library = MotivationLibrary(TTLCache(
+    os.getenv("MOTIVATION_LIBRARY_PATH", "motivation_library.db"),
+    table="motivation_library",
+    max_items=len(BANDS),
+    ttl=int(os.getenv("MOTIVATION_LIBRARY_TTL", str(30 * 24 * 3600)))
+))
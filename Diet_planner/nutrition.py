@@ -0,0 +1,250 @@
+import bisect
+import csv
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from difflib import get_close_matches
+
+from arabic import normalize_arabic, tokenize, strip_prefix
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+NUTRITION_CSV_PATH = os.path.join(_HERE, "data", "nutrition.csv")
+# Relative paths are taken from this directory, so every worker finds the same file whatever its CWD.
+NUTRITION_DB_PATH = os.path.join(_HERE, os.getenv("NUTRITION_DB_PATH", "nutrition.db"))
+MACRO_FIELDS = ("kcal", "protein", "carbs", "fat")
+MAX_NGRAM = 3
+FUZZY_CUTOFF = 0.8
+FUZZY_CACHE_SIZE = 10000
+
+_NUMBER_WORDS = {"نصف": 0.5, "ربع": 0.25, "ثلث": 1 / 3, "واحد": 1, "واحده": 1, "اثنين": 2, "اثنان": 2, "ثلاث": 3, "ثلاثه": 3}
+# Grams per household unit; units not listed here mean "one default portion".
+_UNIT_GRAMS = {"ملعقه": 15, "ملاعق": 15, "ملعقتان": 15, "ملعقتين": 15, "كوب": 200, "اكواب": 200, "حفنه": 28}
+_MEAL_WORDS = {"فطور", "افطار", "فطار", "غداء", "عشاء", "سناك", "سناكس", "وجبه", "تحليه"}
+_DUAL_SUFFIXES = ("تان", "تين", "ان", "ين")
+_GRAMS = re.compile(r"(\d+(?:\.\d+)?)\s*(?:جم|جرام|غرام|g|مل|ml)\b")
+
+
+class Food:
+    __slots__ = ("id", "name_ar", "name_en", "portion_g", "kcal", "protein", "carbs", "fat")
+
+    def __init__(self, id, name_ar, name_en, portion_g, kcal, protein, carbs, fat):
+        self.id = id
+        self.name_ar = name_ar
+        self.name_en = name_en
+        self.portion_g = portion_g
+        self.kcal = kcal
+        self.protein = protein
+        self.carbs = carbs
+        self.fat = fat
+
+    def macros(self, grams):
+        factor = grams / 100.0
+        return {field: round(getattr(self, field) * factor, 1) for field in MACRO_FIELDS}
+
+
+def index_key(name):
+    return " ".join(tokenize(name))
+
+
+def build_database(csv_path=NUTRITION_CSV_PATH, db_path=NUTRITION_DB_PATH):
+    """
+    (Re)builds the SQLite nutrition table from the bundled CSV (values per 100 g).
+
+    The table is written to a temporary file that then replaces `db_path`, so
+    a process reading the database never sees it missing or half filled.
+    """
+    with open(csv_path, encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    directory = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".nutrition-", suffix=".db", dir=directory)
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute(
+                "CREATE TABLE foods (id INTEGER PRIMARY KEY, name_ar TEXT NOT NULL, name_en TEXT, aliases TEXT, "
+                "portion_g REAL, kcal REAL, protein REAL, carbs REAL, fat REAL)"
+            )
+            conn.executemany(
+                "INSERT INTO foods (name_ar, name_en, aliases, portion_g, kcal, protein, carbs, fat) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(r["name_ar"], r["name_en"], r["aliases"], float(r["portion_g"]), float(r["kcal"]),
+                  float(r["protein"]), float(r["carbs"]), float(r["fat"])) for r in rows]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class NutritionIndex:
+    """
+    In-memory name index over the SQLite nutrition table.
+
+    Every Arabic/English name and alias is normalized (arabic.tokenize) into a
+    key. Lookups try exact keys, then the longest known prefix of a word
+    (so "بيضتان" finds "بيض"), then difflib fuzzy matching.
+    """
+
+    def __init__(self, db_path=NUTRITION_DB_PATH, csv_path=NUTRITION_CSV_PATH):
+        if not os.path.exists(db_path) or (
+                os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(db_path)):
+            build_database(csv_path, db_path)
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT id, name_ar, name_en, aliases, portion_g, kcal, protein, carbs, fat FROM foods"
+            ).fetchall()
+        finally:
+            conn.close()
+        self.foods = {}
+        self._by_key = {}
+        for food_id, name_ar, name_en, aliases, portion_g, kcal, protein, carbs, fat in rows:
+            food = Food(food_id, name_ar, name_en, portion_g, kcal, protein, carbs, fat)
+            self.foods[food_id] = food
+            for name in [name_ar, name_en] + (aliases.split("|") if aliases else []):
+                key = index_key(name)
+                if key:
+                    self._by_key.setdefault(key, food)
+        self._sorted_keys = sorted(self._by_key)
+        self._single_keys = [key for key in self._sorted_keys if " " not in key]
+        self._fuzzy_cache = {}
+
+    def __len__(self):
+        return len(self.foods)
+
+    def get(self, name):
+        return self._by_key.get(index_key(name))
+
+    def prefix_search(self, prefix, limit=10):
+        key = index_key(prefix)
+        start = bisect.bisect_left(self._sorted_keys, key)
+        results = []
+        for candidate in self._sorted_keys[start:]:
+            if not candidate.startswith(key) or len(results) >= limit:
+                break
+            food = self._by_key[candidate]
+            if food not in results:
+                results.append(food)
+        return results
+
+    def fuzzy_search(self, name, limit=5, cutoff=FUZZY_CUTOFF):
+        results = []
+        for key in get_close_matches(index_key(name), self._sorted_keys, n=limit * 2, cutoff=cutoff):
+            food = self._by_key[key]
+            if food not in results:
+                results.append(food)
+        return results[:limit]
+
+    def match(self, text):
+        """
+        Best food for free text such as a plan item; returns (food, token_span) or (None, None).
+        The earliest mention wins (the main food usually comes first), and at
+        the same position the longer name wins, so "صدر دجاج" beats "دجاج".
+        """
+        tokens = tokenize(text)
+        for start in range(len(tokens)):
+            for size in range(min(MAX_NGRAM, len(tokens) - start), 0, -1):
+                food = self._by_key.get(" ".join(tokens[start:start + size]))
+                if food:
+                    return food, (start, start + size)
+        for position, token in enumerate(tokens):
+            food = self._match_word(token)
+            if food:
+                return food, (position, position + 1)
+        return None, None
+
+    def _match_word(self, token):
+        if len(token) < 3:
+            return None
+        for end in range(len(token) - 1, 2, -1):
+            food = self._by_key.get(token[:end])
+            if food:
+                return food
+        if token not in self._fuzzy_cache:
+            if len(self._fuzzy_cache) > FUZZY_CACHE_SIZE:
+                self._fuzzy_cache.clear()
+            close = get_close_matches(token, self._single_keys, n=1, cutoff=FUZZY_CUTOFF)
+            self._fuzzy_cache[token] = self._by_key[close[0]] if close else None
+        return self._fuzzy_cache[token]
+
+    def estimate(self, text, grams=None):
+        """
+        Estimated macros for one food mention; grams come from the text, household units or the default portion.
+        """
+        food, span = self.match(text)
+        if food is None:
+            return None
+        if grams is None:
+            grams = _grams_from_text(text, food, span)
+        result = food.macros(grams)
+        result.update({"food": food.name_ar, "grams": round(grams, 1)})
+        return result
+
+    def estimate_items(self, texts):
+        totals = dict.fromkeys(MACRO_FIELDS, 0.0)
+        matched = []
+        unmatched = []
+        for text, grams in texts:
+            estimate = self.estimate(text, grams)
+            if estimate is None:
+                unmatched.append(text)
+                continue
+            matched.append(estimate)
+            for field in MACRO_FIELDS:
+                totals[field] += estimate[field]
+        totals = {field: round(value, 1) for field, value in totals.items()}
+        return {"totals": totals, "items": matched, "unmatched": unmatched}
+
+    def estimate_meal_plan(self, plan):
+        return self.estimate_items((item.text, item.grams) for item in plan.items)
+
+    def estimate_eaten(self, text):
+        """
+        Costs free eaten-meal text, split on commas, "و" and line breaks.
+        """
+        parts = re.split(r"[,\n;،؛:]|\s+و(?=\S)", normalize_arabic(text))
+        parts = [part for part in parts if set(tokenize(part)) - _MEAL_WORDS]
+        return self.estimate_items((part, None) for part in parts)
+
+
+def _grams_from_text(text, food, span):
+    normalized = normalize_arabic(text)
+    grams_match = _GRAMS.search(normalized)
+    if grams_match:
+        return float(grams_match.group(1))
+    tokens = tokenize(text)
+    count = 1.0
+    unit_grams = None
+    for token in tokens[:span[0]]:
+        if token.replace(".", "", 1).isdigit():
+            count = float(token)
+        elif token in _NUMBER_WORDS:
+            count = _NUMBER_WORDS[token]
+        elif token in _UNIT_GRAMS:
+            unit_grams = _UNIT_GRAMS[token]
+            if token.endswith(("تان", "تين")):
+                count = 2.0
+    matched_word = tokens[span[0]] if span[0] < len(tokens) else ""
+    if span[1] - span[0] == 1 and matched_word.endswith(_DUAL_SUFFIXES) and strip_prefix(matched_word) not in (
+            index_key(food.name_ar), index_key(food.name_en)):
+        count = 2.0
+    return count * (unit_grams or food.portion_g)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_nutrition_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NutritionIndex()
+    return _index
@@ -0,0 +1,198 @@
+"""
+Arabic PDF version of the diet report.
+
+Built on fpdf2, which embeds only the glyphs a document uses. The Noto Sans
+Arabic fonts are parsed once per process; every document gets a clone that
+shares the parsed metrics and character widths and only carries its own
+glyph subset. Arabic text is joined (arabic-reshaper) and wrapped in logical
+order, then each line is reordered for display (python-bidi).
+"""
+import copy
+import functools
+import io
+import os
+import re
+import threading
+from datetime import datetime
+
+from meal_plan import MealPlan
+from reports import PROFILE_ROWS
+
+FONT_DIR = os.path.dirname(os.path.abspath(__file__))
+FONT_FAMILY = "NotoSansArabic"
+FONT_FILES = {"": "NotoSansArabic-Regular.ttf", "B": "NotoSansArabic-Bold.ttf"}
+
+LINE_HEIGHT = 7
+_MARKDOWN_LINK = re.compile(r"\[([^\]]+)\]\(([^)]+)\)")
+
+
+class _FontCache:
+    """
+    Parsed TTF fonts shared by every PDF rendered in this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fonts = None
+
+    def _load(self):
+        from fpdf import FPDF
+
+        with self._lock:
+            if self._fonts is None:
+                loader = FPDF()
+                fonts = {}
+                for style, filename in FONT_FILES.items():
+                    path = os.path.join(FONT_DIR, filename)
+                    loader.add_font(FONT_FAMILY, style, path)
+                    with open(path, "rb") as f:
+                        fonts[style] = (loader.fonts[f"{FONT_FAMILY.lower()}{style}"], f.read())
+                self._fonts = fonts
+        return self._fonts
+
+    def attach(self, pdf):
+        """
+        Registers per-document copies of the cached fonts on `pdf` instead of calling add_font().
+        """
+        from fontTools import ttLib
+        from fpdf.fonts import SubsetMap
+
+        for style, (font, data) in (self._fonts or self._load()).items():
+            clone = copy.copy(font)
+            clone.i = len(pdf.fonts) + 1
+            # Subsetting at output() rewrites the TTFont in place, so each document reads its own
+            # (lazily parsed) copy from the cached bytes; widths, cmap and descriptor stay shared.
+            clone.ttfont = ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False, lazy=True)
+            clone.missing_glyphs = []
+            clone.biggest_size_pt = 0
+            clone._hbfont = None
+            clone.subset = SubsetMap(clone)
+            pdf.fonts[font.fontkey] = clone
+
+    def font(self, style):
+        return (self._fonts or self._load())[style][0]
+
+
+font_cache = _FontCache()
+
+
+@functools.lru_cache(maxsize=16384)
+def _fit_word(style, word):
+    """
+    `word` without the characters the font has no glyph for (emoji), and its width in
+    thousandths of the font size, from the shared character widths.
+    """
+    font = font_cache.font(style)
+    word = "".join(char for char in word if ord(char) in font.cmap)
+    return word, sum(font.cw[ord(char)] for char in word)
+
+
+@functools.lru_cache(maxsize=1)
+def _shaping():
+    import arabic_reshaper
+    try:
+        from bidi import get_display
+    except ImportError:
+        from bidi.algorithm import get_display
+    return arabic_reshaper.ArabicReshaper().reshape, get_display
+
+
+def visual_lines(text, width, size, style=""):
+    """
+    Wraps `text` to `width` mm at `size` pt and returns the lines in display order.
+    """
+    reshape, get_display = _shaping()
+    scale = size * 25.4 / 72 / 1000
+    space = _fit_word(style, " ")[1] * scale
+    lines = []
+    for paragraph in str(text).split("\n"):
+        line, line_width = [], 0.0
+        for word in reshape(paragraph).split():
+            word, word_width = _fit_word(style, word)
+            if not word:
+                continue
+            word_width *= scale
+            if line and line_width + space + word_width > width:
+                lines.append(get_display(" ".join(line)))
+                line, line_width = [], 0.0
+            line_width += word_width + (space if line else 0)
+            line.append(word)
+        lines.append(get_display(" ".join(line)))
+    return lines
+
+
+def _plain_text(markdown):
+    return _MARKDOWN_LINK.sub(r"\1: \2", markdown).replace("**", "")
+
+
+@functools.lru_cache(maxsize=1)
+def _pdf_class():
+    from fpdf import FPDF
+
+    class ReportPDF(FPDF):
+        def header(self):
+            self.set_font(FONT_FAMILY, "B", 15)
+            for line in visual_lines("تقرير النظام الغذائي الشامل", self.epw, 15, "B"):
+                self.cell(0, 10, line, align="C", new_x="LMARGIN", new_y="NEXT")
+            self.ln(2)
+
+        def footer(self):
+            self.set_y(-15)
+            self.set_font(FONT_FAMILY, "", 9)
+            self.cell(0, 10, f"{self.page_no()}/{{nb}}", align="C")
+
+        def write_lines(self, text, size=11, style=""):
+            self.set_font(FONT_FAMILY, style, size)
+            for line in visual_lines(text, self.epw, size, style):
+                self.cell(0, LINE_HEIGHT, line, align="R", new_x="LMARGIN", new_y="NEXT")
+
+        def section_title(self, title):
+            self.ln(3)
+            self.write_lines(title, size=13, style="B")
+            self.line(self.l_margin, self.get_y(), self.w - self.r_margin, self.get_y())
+            self.ln(2)
+
+    return ReportPDF
+
+
+def render_pdf_report(report_data, report_date=None):
+    """
+    PDF bytes for the same `report_data` render_report() takes.
+    """
+    pdf = _pdf_class()(format="A4")
+    font_cache.attach(pdf)
+    pdf.set_auto_page_break(auto=True, margin=18)
+    pdf.add_page()
+
+    username = report_data.get("username")
+    user_profile = report_data.get("user_profile") or {}
+    report_date = report_date or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    pdf.write_lines(f"تاريخ التقرير: {report_date}", size=10)
+
+    pdf.section_title("بيانات المستخدم")
+    for label, key, unit, fallback in PROFILE_ROWS:
+        value = user_profile.get(key, username if key == "name" and username else fallback)
+        pdf.write_lines(f"{label}: {value}{unit if key in user_profile else ''}")
+
+    pdf.section_title("خطة الوجبات")
+    meal_plan = report_data.get("meal_plan", "لا توجد خطة وجبات متاحة.")
+    if isinstance(meal_plan, MealPlan):
+        for note in meal_plan.notes:
+            pdf.write_lines(note)
+        for section in meal_plan.sections:
+            if section.heading:
+                pdf.write_lines(section.heading, style="B")
+            for item in section.items:
+                pdf.write_lines(f"• {item.text}")
+        if meal_plan.total_line:
+            pdf.write_lines(meal_plan.total_line, style="B")
+    else:
+        pdf.write_lines(meal_plan)
+
+    pdf.section_title("ملخص تقييم الالتزام")
+    pdf.write_lines(report_data.get("tracker_summary", "لا يوجد تقييم التزام متاح."))
+
+    pdf.section_title("التحفيز والنصائح")
+    pdf.write_lines(_plain_text(report_data.get("motivation", "لا يوجد تحفيز متاح.")))
+
+    return bytes(pdf.output())
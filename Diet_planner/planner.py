@@ -0,0 +1,190 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import metrics
+from agents import registry
+from agents.meal_planner_agent import MEAL_PLAN_PROMPT_VERSION
+from agents.crew_pool import register_pool
+from agents.llm_backends import FakeStreamingLLM, get_streaming_llm, render_task_messages, use_fake_llm
+from arabic import normalize_arabic
+from cache import plan_cache, make_cache_key
+from jobs import JobCancelled
+from meal_plan import parse_meal_plan
+from prompts import token_ledger
+from ratelimit import llm_limiter
+from singleflight import get_flight
+
+# Day plans generated at once across every multi-day request in this process.
+WEEK_PLAN_CONCURRENCY = int(os.getenv("WEEK_PLAN_CONCURRENCY", "4"))
+# Protein focus per day of a multi-day plan, so parallel days don't all come back alike.
+DAY_FOCUS = (
+    "الدجاج", "الأسماك", "البقوليات", "البيض ومنتجات الألبان",
+    "اللحوم الحمراء قليلة الدهن", "الديك الرومي", "المأكولات البحرية",
+)
+# Two same-named meals on different days count as a repeat at this share of common items.
+REPEAT_OVERLAP = 0.6
+
+meal_planner_pool = register_pool("meal_planner", "meal_planner_agent", "generate_meal_plan_task")
+week_day_pool = register_pool("week_day_planner", "meal_planner_agent", "generate_week_day_task",
+                              size=WEEK_PLAN_CONCURRENCY)
+meal_plan_flight = get_flight("meal_planner", private_errors=(JobCancelled,))
+_task_pools = {"generate_meal_plan_task": meal_planner_pool, "generate_week_day_task": week_day_pool}
+_day_executor = None
+_day_executor_lock = threading.Lock()
+
+
+def default_llm():
+    """
+    Direct LLM client to use instead of the crew, or None to go through the crew pool.
+    """
+    if use_fake_llm():
+        return get_streaming_llm(registry.get("meal_planner_agent"))
+    return None
+
+
+def generate_meal_plan_text(prepared_inputs, llm=None, on_chunk=None, use_cache=True,
+                            task_name="generate_meal_plan_task"):
+    """
+    Meal-plan text for prepare_inputs() output, served from the plan cache when possible.
+
+    With `llm` (or `on_chunk`, which implies the streaming client) the task
+    prompt is sent straight to the model and each chunk is passed to
+    on_chunk as it arrives; otherwise the meal-planner crew is kicked off.
+    Concurrent calls for the same inputs share one generation; only the
+    first caller's on_chunk sees the chunks, the others get the full text
+    once it is done. If the first caller's job is cancelled, the others
+    start the generation again instead of being cancelled too.
+
+    The fake LLM (LLM_BACKEND=fake, batch.py --fake-llm) never reads or
+    writes the plan cache, so its canned plan can't reach real users.
+    """
+    llm = llm or default_llm()
+    if isinstance(llm, FakeStreamingLLM):
+        use_cache = False
+    version = MEAL_PLAN_PROMPT_VERSION if task_name == "generate_meal_plan_task" else f"{MEAL_PLAN_PROMPT_VERSION}/{task_name}"
+    cache_key = make_cache_key(prepared_inputs, version)
+    meal_plan_text = plan_cache.get(cache_key) if use_cache else None
+    if meal_plan_text is None:
+        streamed = []
+
+        def forward(text):
+            streamed.append(text)
+            on_chunk(text)
+
+        meal_plan_text = meal_plan_flight.do(
+            cache_key, _generate, prepared_inputs, cache_key, llm, forward if on_chunk else None, use_cache, task_name
+        )
+        if on_chunk is None or streamed:
+            return meal_plan_text
+    if on_chunk is not None:
+        on_chunk(meal_plan_text)
+    return meal_plan_text
+
+
+def _generate(prepared_inputs, cache_key, llm, on_chunk, use_cache, task_name="generate_meal_plan_task"):
+    llm = llm or default_llm()
+    if llm is None and on_chunk is not None:
+        llm = get_streaming_llm(registry.get("meal_planner_agent"))
+    if llm is not None:
+        messages = render_task_messages(
+            registry.get("meal_planner_agent"), registry.get(task_name), prepared_inputs
+        )
+        chunks = []
+        try:
+            with metrics.stream_seconds.time("meal_planner_agent"):
+                for text in llm_limiter.stream("meal_planner_agent", lambda: llm.stream(messages)):
+                    chunks.append(text)
+                    if on_chunk is not None:
+                        on_chunk(text)
+        except JobCancelled:
+            raise
+        except Exception:
+            metrics.llm_errors.inc("meal_planner_agent")
+            raise
+        meal_plan_text = "".join(chunks).strip()
+        token_ledger.record_call("meal_planner_agent", messages, meal_plan_text)
+    else:
+        meal_plan_text = _task_pools[task_name].kickoff(prepared_inputs).raw
+    if use_cache:
+        plan_cache.set(cache_key, meal_plan_text)
+    return meal_plan_text
+
+
+def day_inputs(prepared_inputs, day_index, avoid=()):
+    """
+    (task name, inputs) for one day of a multi-day plan.
+
+    The first day, unless it has meals to avoid, is exactly a single-day
+    request, so it reuses (and fills) the single-day plan cache.
+    """
+    if day_index == 0 and not avoid:
+        return "generate_meal_plan_task", prepared_inputs
+    return "generate_week_day_task", dict(
+        prepared_inputs,
+        day_number=day_index + 1,
+        day_focus=DAY_FOCUS[day_index % len(DAY_FOCUS)],
+        avoid_items="، ".join(avoid) if avoid else "لا يوجد",
+    )
+
+
+def repeated_meals(plans):
+    """
+    {day index: item names to avoid} for each day whose meal repeats a same-named meal of an earlier day.
+    """
+    seen = {}
+    repeats = {}
+    for day_index, plan in enumerate(plans):
+        for section in plan.sections:
+            title = normalize_arabic(section.title)
+            names = {normalize_arabic(item.name) for item in section.items}
+            for earlier in seen.get(title, ()):
+                if names and len(names & earlier) / len(names | earlier) >= REPEAT_OVERLAP:
+                    repeats.setdefault(day_index, []).extend(item.name for item in section.items)
+                    break
+            seen.setdefault(title, []).append(names)
+    return repeats
+
+
+def _executor():
+    global _day_executor
+    with _day_executor_lock:
+        if _day_executor is None:
+            _day_executor = ThreadPoolExecutor(max_workers=WEEK_PLAN_CONCURRENCY, thread_name_prefix="week-day")
+        return _day_executor
+
+
+def _generate_days(prepared_inputs, avoid_by_day, on_day):
+    futures = {}
+    for day_index, avoid in avoid_by_day.items():
+        task_name, inputs = day_inputs(prepared_inputs, day_index, avoid)
+        futures[_executor().submit(generate_meal_plan_text, inputs, task_name=task_name)] = day_index
+    texts = {}
+    try:
+        for future in as_completed(futures):
+            texts[futures[future]] = future.result()
+            if on_day is not None:
+                on_day(len(texts))
+    finally:
+        for future in futures:
+            future.cancel()
+    return texts
+
+
+def generate_week_plan_texts(prepared_inputs, days=7, on_day=None):
+    """
+    One meal-plan text per day for `days` days, oldest first.
+
+    Days are generated concurrently on a process-wide pool of
+    WEEK_PLAN_CONCURRENCY threads, so a week takes about as long as
+    ceil(days / WEEK_PLAN_CONCURRENCY) single plans however many users ask
+    at once. Each day is cached like a single-day plan. Days whose meals
+    repeat an earlier day's are regenerated once, in parallel, with those
+    items to avoid. on_day(days_done) is called from the calling thread
+    after each day and may raise to abandon the rest.
+    """
+    texts = _generate_days(prepared_inputs, {day_index: () for day_index in range(days)}, on_day)
+    repeats = repeated_meals([parse_meal_plan(texts[day_index]) for day_index in range(days)])
+    if repeats:
+        texts.update(_generate_days(prepared_inputs, repeats, None))
+    return [texts[day_index] for day_index in range(days)]
@@ -0,0 +1,119 @@
+"""
+On-demand cProfile capture for Dash callbacks and crew kickoffs.
+
+Off unless one of these is set (wrap() then returns functions untouched):
+
+    PROFILE_NEXT_CALLS=20       profile the next 20 instrumented calls
+    PROFILE_SLOW_MS=2000        keep the profile of any call slower than 2 s
+    PROFILE_ADMIN_TOKEN=secret  profile callbacks whose request carries
+                                `X-Profile-Token: secret`
+
+Profiles go to PROFILE_DIR (default `profiles/`) as `<time>_<name>_<inputs
+hash>_<ms>ms.prof` (load with pstats or snakeviz) plus a `.txt` summary;
+only the newest PROFILE_MAX_FILES profiles are kept.
+"""
+import cProfile
+import functools
+import hashlib
+import io
+import json
+import os
+import pstats
+import threading
+import time
+
+PROFILE_HEADER = "X-Profile-Token"
+
+
+class Profiler:
+    """
+    Profiles one call at a time (cProfile can't nest); calls arriving while
+    another is being profiled simply run unprofiled.
+    """
+
+    def __init__(self, directory="profiles", next_calls=0, slow_ms=None, admin_token=None, max_files=100):
+        self.directory = directory
+        self.remaining = next_calls
+        self.slow_ms = slow_ms
+        self.admin_token = admin_token
+        self.max_files = max_files
+        self._busy = threading.Lock()
+        self._count_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.remaining or self.slow_ms or self.admin_token)
+
+    def wrap(self, name, fn):
+        if not self.enabled:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return self.call(name, fn, *args, **kwargs)
+        return wrapper
+
+    def call(self, name, fn, *args, **kwargs):
+        requested = self._requested_by_header()
+        if not (requested or self.remaining > 0 or self.slow_ms):
+            return fn(*args, **kwargs)
+        if not self._busy.acquire(blocking=False):
+            return fn(*args, **kwargs)
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            return profile.runcall(fn, *args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._busy.release()
+            if requested or self._take_next() or (self.slow_ms and elapsed_ms >= self.slow_ms):
+                self._save(profile, name, args, kwargs, elapsed_ms)
+
+    def _requested_by_header(self):
+        if not self.admin_token:
+            return False
+        from flask import has_request_context, request
+
+        return has_request_context() and request.headers.get(PROFILE_HEADER) == self.admin_token
+
+    def _take_next(self):
+        with self._count_lock:
+            if self.remaining > 0:
+                self.remaining -= 1
+                return True
+        return False
+
+    def _save(self, profile, name, args, kwargs, elapsed_ms):
+        os.makedirs(self.directory, exist_ok=True)
+        payload = json.dumps([args, kwargs], sort_keys=True, ensure_ascii=False, default=str)
+        inputs_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+        now = time.time()
+        stamp = f"{time.strftime('%Y%m%d_%H%M%S', time.localtime(now))}_{int(now * 1000) % 1000:03d}"
+        stem = os.path.join(self.directory, f"{stamp}_{name}_{inputs_hash}_{int(elapsed_ms)}ms")
+        profile.dump_stats(stem + ".prof")
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(40)
+        with open(stem + ".txt", "w", encoding="utf-8") as f:
+            f.write(f"{name} took {elapsed_ms:.1f} ms\n\n{summary.getvalue()}")
+        self._rotate()
+
+    def _rotate(self):
+        profiles = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".prof")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in profiles[:max(0, len(profiles) - self.max_files)]:
+            for path in (entry.path, entry.path[:-len(".prof")] + ".txt"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+profiler = Profiler(
+    directory=os.getenv("PROFILE_DIR", "profiles"),
+    next_calls=int(os.getenv("PROFILE_NEXT_CALLS", "0")),
+    slow_ms=float(os.getenv("PROFILE_SLOW_MS", "0")) or None,
+    admin_token=os.getenv("PROFILE_ADMIN_TOKEN") or None,
+    max_files=int(os.getenv("PROFILE_MAX_FILES", "100"))
+)
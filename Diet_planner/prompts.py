@@ -0,0 +1,220 @@
+"""
+Prompt sizes and token usage.
+
+Each task prompt is versioned in its agent module (`*_PROMPTS`, the served
+version picked by the matching `*_PROMPT_VERSION` env var). This module
+counts tokens offline, keeps a per-agent ledger of the tokens sent and
+received, and from the command line compares the prompt versions:
+
+    python prompts.py                  # tokens, cost and latency per version
+    python prompts.py --json           # machine-readable, to track across commits
+"""
+import argparse
+import json
+import math
+import os
+import re
+import sys
+import threading
+
+from agents.llm_backends import SAMPLE_MEAL_PLAN, SAMPLE_MOTIVATION, interpolate_inputs
+
+# Gemini 2.0 Flash list prices, USD per million tokens.
+PRICE_INPUT_PER_M = float(os.getenv("LLM_PRICE_INPUT_PER_M", "0.10"))
+PRICE_OUTPUT_PER_M = float(os.getenv("LLM_PRICE_OUTPUT_PER_M", "0.40"))
+
+# Average characters per token for the tokenizer-free estimate; Arabic splits
+# into noticeably shorter tokens than English in BPE vocabularies.
+ARABIC_CHARS_PER_TOKEN = 2.5
+LATIN_CHARS_PER_TOKEN = 4.0
+DIGITS_PER_TOKEN = 3.0
+
+_PIECES = re.compile(r"[\u0600-\u06FF\u0750-\u077F]+|[A-Za-z]+|\d+|\s+|.", re.S)
+
+SAMPLE_INPUTS = {
+    "generate_meal_plan_task": {
+        "name": "أحمد", "weight": 82, "height": 176, "age": 34, "sex": "ذكر",
+        "activity_level": "متوسط", "goal": "فقدان الوزن", "diet_type": "متوازن",
+        "allergy": "لا يوجد", "conditions": "لا يوجد",
+        # energy.energy_targets() of the profile above, for the bucketed versions.
+        "calorie_min": 2200, "calorie_max": 2400, "protein_g": 172, "carbs_g": 230, "fat_g": 77,
+    },
+    "track_progress_task": {
+        "planned_meal": SAMPLE_MEAL_PLAN,
+        "eaten_meal": "بيضتان وخبز أسمر، دجاج مشوي مع أرز وسلطة، وفي العشاء ساندويتش جبن",
+        "external_factors": "يوم عمل طويل",
+    },
+    "motivate_user_task": {
+        "username": "أحمد", "commitment_percentage": 72, "tracker_summary": "72% 🟡👍",
+    },
+}
+
+SAMPLE_OUTPUTS = {
+    "generate_meal_plan_task": SAMPLE_MEAL_PLAN,
+    "track_progress_task": "72% 🟡👍",
+    "motivate_user_task": SAMPLE_MOTIVATION,
+}
+
+_encoder = None
+
+
+def _tiktoken_encoder():
+    global _encoder
+    if _encoder is None:
+        import tiktoken
+        _encoder = tiktoken.get_encoding("cl100k_base")
+    return _encoder
+
+
+def count_tokens(text):
+    """
+    Token count of `text`, estimated without any model or network access.
+
+    Words are costed by script (Arabic, Latin, digits), every other symbol
+    (punctuation, emoji) as one token, and whitespace that breaks a line as
+    one token. With PROMPT_TOKENIZER=tiktoken a locally cached tiktoken
+    encoding is used instead.
+    """
+    if os.getenv("PROMPT_TOKENIZER", "").lower() == "tiktoken":
+        return len(_tiktoken_encoder().encode(text))
+    total = 0
+    for piece in _PIECES.findall(text):
+        first = piece[0]
+        if first.isspace():
+            total += "\n" in piece
+        elif "\u0600" <= first <= "\u077f":
+            total += math.ceil(len(piece) / ARABIC_CHARS_PER_TOKEN)
+        elif first.isdigit():
+            total += math.ceil(len(piece) / DIGITS_PER_TOKEN)
+        elif first.isascii() and first.isalpha():
+            total += math.ceil(len(piece) / LATIN_CHARS_PER_TOKEN)
+        else:
+            total += 1
+    return total
+
+
+def messages_tokens(messages):
+    return sum(count_tokens(message["content"]) for message in messages)
+
+
+def cost_usd(prompt_tokens, completion_tokens):
+    return (prompt_tokens * PRICE_INPUT_PER_M + completion_tokens * PRICE_OUTPUT_PER_M) / 1_000_000
+
+
+class TokenLedger:
+    """
+    Running per-agent totals of prompt and completion tokens.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._usage = {}
+
+    def record(self, name, prompt_tokens, completion_tokens):
+        with self._lock:
+            usage = self._usage.setdefault(name, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            usage["calls"] += 1
+            usage["prompt_tokens"] += prompt_tokens
+            usage["completion_tokens"] += completion_tokens
+
+    def record_call(self, name, messages, output_text):
+        self.record(name, messages_tokens(messages), count_tokens(output_text or ""))
+
+    def stats(self):
+        with self._lock:
+            usage = {name: dict(values) for name, values in self._usage.items()}
+        for values in usage.values():
+            values["avg_prompt_tokens"] = round(values["prompt_tokens"] / values["calls"], 1)
+            values["avg_completion_tokens"] = round(values["completion_tokens"] / values["calls"], 1)
+            values["cost_usd"] = round(cost_usd(values["prompt_tokens"], values["completion_tokens"]), 6)
+        return usage
+
+
+token_ledger = TokenLedger()
+
+
+def prompt_versions():
+    """
+    {task name: (versioned templates, served version, agent max output tokens)}.
+    """
+    from agents import meal_planner_agent, motivation_agent, tracker_agent
+
+    return {
+        "generate_meal_plan_task": (meal_planner_agent.GENERATE_MEAL_PLAN_PROMPTS,
+                                    meal_planner_agent.MEAL_PLAN_PROMPT_VERSION,
+                                    meal_planner_agent.MEAL_PLANNER_MAX_TOKENS),
+        "track_progress_task": (tracker_agent.TRACK_PROGRESS_PROMPTS,
+                                tracker_agent.TRACK_PROGRESS_PROMPT_VERSION,
+                                tracker_agent.TRACKER_MAX_TOKENS),
+        "motivate_user_task": (motivation_agent.MOTIVATE_USER_PROMPTS,
+                               motivation_agent.MOTIVATE_USER_PROMPT_VERSION,
+                               motivation_agent.MOTIVATION_MAX_TOKENS),
+    }
+
+
+def template_stats():
+    """
+    Token count of every template version, raw and rendered with the sample inputs.
+    """
+    stats = {}
+    for task, (templates, served, max_tokens) in prompt_versions().items():
+        stats[task] = {
+            "served_version": served,
+            "max_output_tokens": max_tokens,
+            "versions": {version: {"template_tokens": count_tokens(template),
+                                   "rendered_tokens": count_tokens(interpolate_inputs(template, SAMPLE_INPUTS[task]))}
+                         for version, template in templates.items()},
+        }
+    return stats
+
+
+def compare_versions(base_latency=0.35, prefill_tps=4000.0, decode_tps=150.0):
+    """
+    Estimated latency and cost of one call per task and prompt version.
+
+    Latency is modelled as a fixed round trip plus prefill and decode time;
+    output length is the sample output for the task, capped at the agent's
+    max output tokens. The agent persona is the same for every version and is
+    left out.
+    """
+    rows = []
+    for task, (templates, served, max_tokens) in prompt_versions().items():
+        completion_tokens = min(count_tokens(SAMPLE_OUTPUTS[task]), max_tokens)
+        for version, template in templates.items():
+            prompt_tokens = count_tokens(interpolate_inputs(template, SAMPLE_INPUTS[task]))
+            rows.append({
+                "task": task,
+                "version": version,
+                "served": version == served,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "latency_s": round(base_latency + prompt_tokens / prefill_tps + completion_tokens / decode_tps, 3),
+                "cost_per_1k_calls_usd": round(1000 * cost_usd(prompt_tokens, completion_tokens), 4),
+            })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare prompt versions by tokens, latency and cost.")
+    parser.add_argument("--base-latency", type=float, default=0.35, help="fixed seconds per call")
+    parser.add_argument("--prefill-tps", type=float, default=4000.0, help="prompt tokens processed per second")
+    parser.add_argument("--decode-tps", type=float, default=150.0, help="output tokens generated per second")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    rows = compare_versions(args.base_latency, args.prefill_tps, args.decode_tps)
+    if args.json:
+        print(json.dumps({"templates": template_stats(), "comparison": rows}, ensure_ascii=False))
+        return 0
+    print(f"{'task':<26}{'version':>8}{'prompt':>9}{'output':>9}{'latency s':>11}{'$/1k calls':>12}")
+    for row in rows:
+        version = row["version"] + ("*" if row["served"] else "")
+        print(f"{row['task']:<26}{version:>8}{row['prompt_tokens']:>9}{row['completion_tokens']:>9}"
+              f"{row['latency_s']:>11.3f}{row['cost_per_1k_calls_usd']:>12.4f}")
+    print("\n* served version; select another with MEAL_PLAN_PROMPT_VERSION, "
+          "TRACK_PROGRESS_PROMPT_VERSION or MOTIVATE_USER_PROMPT_VERSION.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""
+Rate limiting and 429 retries for the Gemini calls, shared by every worker process.
+
+All agents use one API key, so gunicorn workers (and batch.py) take tokens
+from one bucket kept in a small SQLite file (LLM_RATE_LIMIT_PATH, default
+`llm_ratelimit.db`), refilled at LLM_RATE_LIMIT_RPM calls per minute with up
+to LLM_RATE_LIMIT_BURST saved up. An RPM of 0 (the default) leaves calls
+uncapped but keeps the rest.
+
+Callers wait in one of two lanes: interactive (the default) and batch
+(batch.py, background refreshes). A batch call never takes a token while an
+interactive call anywhere is waiting. A 429 pauses the whole bucket for a
+jittered, exponentially growing delay (or the server's Retry-After), then
+the call is retried, up to LLM_MAX_RETRIES times; after that the user gets a
+short "busy" message instead of the raw API error.
+"""
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+from database import ConnectionPool
+
+INTERACTIVE = 0
+BATCH = 1
+LANE_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+# Waiter rows not refreshed for this long belong to a dead process.
+STALE_WAITER_SECONDS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (
+    name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, paused_until REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS waiters (id TEXT PRIMARY KEY, lane INTEGER NOT NULL, seen REAL NOT NULL);
+"""
+
+
+class LLMRateLimited(Exception):
+    """
+    Raised when an LLM call is still rate limited after every retry.
+    """
+
+    def __init__(self, agent):
+        super().__init__("الخدمة مشغولة حاليًا بسبب كثرة الطلبات. الرجاء المحاولة مرة أخرى بعد قليل.")
+        self.agent = agent
+
+
+def is_rate_limit_error(error):
+    """
+    Whether an exception from litellm/crewai means HTTP 429 (quota or rate exceeded).
+    """
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429:
+        return True
+    # litellm.RateLimitError and subclasses, matched by name so litellm isn't imported here.
+    return any(cls.__name__ == "RateLimitError" for cls in type(error).__mro__)
+
+
+def retry_after_seconds(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class SharedRateLimiter:
+    """
+    Token bucket plus priority lanes in a SQLite file, safe across threads and processes.
+
+    Every acquire runs one short BEGIN IMMEDIATE transaction, so processes
+    take turns on the file instead of racing on the token count.
+    """
+
+    def __init__(self, path, rate_per_minute=0, burst=5, max_retries=4, backoff_base=1.0, backoff_cap=30.0,
+                 name="gemini"):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1.0, float(burst))
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.name = name
+        self._pool = ConnectionPool(path, SCHEMA, size=4)
+        self._local = threading.local()
+        self._ids = itertools.count()
+        self._waiting = {lane: 0 for lane in LANE_NAMES}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lane(self, lane):
+        """
+        Runs the calls made by this thread inside the block in `lane`.
+        """
+        previous = getattr(self._local, "lane", INTERACTIVE)
+        self._local.lane = lane
+        try:
+            yield
+        finally:
+            self._local.lane = previous
+
+    def current_lane(self):
+        return getattr(self._local, "lane", INTERACTIVE)
+
+    @contextmanager
+    def cancellable(self, check):
+        """
+        Calls `check()` between the waits of this thread's calls inside the block;
+        whatever it raises (e.g. JobCancelled) abandons the wait.
+        """
+        previous = getattr(self._local, "check", None)
+        self._local.check = check
+        try:
+            yield
+        finally:
+            self._local.check = previous
+
+    def _try_acquire(self, waiter_id, lane):
+        """
+        Takes a token and returns 0, or returns how long to wait before trying again.
+        """
+        now = time.time()
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tokens, updated, paused_until FROM bucket WHERE name = ?", (self.name,)).fetchone()
+            tokens, updated, paused_until = row or (self.burst, now, 0.0)
+            if self.rate:
+                tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            conn.execute("DELETE FROM waiters WHERE seen < ?", (now - STALE_WAITER_SECONDS,))
+            ahead = conn.execute("SELECT COUNT(*) FROM waiters WHERE lane < ?", (lane,)).fetchone()[0]
+            if paused_until > now:
+                wait = paused_until - now
+            elif ahead:
+                wait = 0.1
+            elif not self.rate:
+                wait = 0.0
+            elif tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            conn.execute("INSERT OR REPLACE INTO bucket (name, tokens, updated, paused_until) VALUES (?, ?, ?, ?)",
+                         (self.name, tokens, now, paused_until))
+            if wait:
+                conn.execute("INSERT OR REPLACE INTO waiters (id, lane, seen) VALUES (?, ?, ?)", (waiter_id, lane, now))
+            else:
+                conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+        return wait
+
+    def acquire(self, lane=None):
+        """
+        Blocks until this process may make one LLM call.
+        """
+        lane = self.current_lane() if lane is None else lane
+        check = getattr(self._local, "check", None)
+        waiter_id = f"{os.getpid()}-{next(self._ids)}"
+        started = time.perf_counter()
+        with self._lock:
+            self._waiting[lane] += 1
+        try:
+            while True:
+                wait = self._try_acquire(waiter_id, lane)
+                if not wait:
+                    break
+                if check is not None:
+                    check()
+                # Re-check at least every second so a waiter sees lane and pause changes.
+                time.sleep(min(wait, 1.0) * random.uniform(1.0, 1.2))
+        except BaseException:
+            with self._pool.connection() as conn:
+                conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+            raise
+        finally:
+            with self._lock:
+                self._waiting[lane] -= 1
+            metrics.rate_limit_wait_seconds.observe(time.perf_counter() - started, LANE_NAMES[lane])
+
+    def pause(self, seconds):
+        """
+        Stops every process from calling for `seconds` and empties the bucket.
+        """
+        now = time.time()
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO bucket (name, tokens, updated, paused_until) VALUES (?, 0, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET tokens = 0, updated = excluded.updated, "
+                "paused_until = MAX(paused_until, excluded.paused_until)",
+                (self.name, now, now + seconds)
+            )
+
+    def backoff(self, attempt, error=None):
+        """
+        Seconds to pause after the `attempt`-th (0-based) 429: Retry-After if given, else jittered exponential.
+        """
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after:
+            return retry_after
+        delay = min(self.backoff_cap, self.backoff_base * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def call(self, agent, fn, *args, **kwargs):
+        """
+        fn(*args, **kwargs) once a token is available, retried after a shared pause on 429.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                metrics.llm_rate_limited.inc(agent)
+                if attempt == self.max_retries:
+                    raise LLMRateLimited(agent) from e
+                self.pause(self.backoff(attempt, e))
+
+    def stream(self, agent, open_stream):
+        """
+        Yields the chunks of open_stream(); a 429 before the first chunk is retried like call().
+        """
+        def first_chunk():
+            chunks = iter(open_stream())
+            return chunks, next(chunks, None)
+
+        chunks, head = self.call(agent, first_chunk)
+        if head is not None:
+            yield head
+        yield from chunks
+
+    def queue_depth(self):
+        """
+        {lane name: (callers waiting in this process, callers waiting in all processes)}.
+        """
+        with self._lock:
+            local = dict(self._waiting)
+        with self._pool.connection() as conn:
+            shared = dict(conn.execute(
+                "SELECT lane, COUNT(*) FROM waiters WHERE seen >= ? GROUP BY lane", (time.time() - STALE_WAITER_SECONDS,)
+            ).fetchall())
+        return {name: (local[lane], shared.get(lane, 0)) for lane, name in LANE_NAMES.items()}
+
+
+llm_limiter = SharedRateLimiter(
+    os.getenv("LLM_RATE_LIMIT_PATH", "llm_ratelimit.db"),
+    rate_per_minute=float(os.getenv("LLM_RATE_LIMIT_RPM", "0")),
+    burst=float(os.getenv("LLM_RATE_LIMIT_BURST", "5")),
+    max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+    backoff_base=float(os.getenv("LLM_BACKOFF_BASE", "1.0")),
+    backoff_cap=float(os.getenv("LLM_BACKOFF_CAP", "30"))
+)
+
+
+def _queue_lines():
+    depth = llm_limiter.queue_depth()
+    lines = ["# HELP llm_rate_limit_queue_depth LLM calls waiting for the shared rate limit, by lane.",
+             "# TYPE llm_rate_limit_queue_depth gauge"]
+    for lane, (local, shared) in depth.items():
+        lines.append(f'llm_rate_limit_queue_depth{{lane="{lane}",scope="process"}} {local}')
+        lines.append(f'llm_rate_limit_queue_depth{{lane="{lane}",scope="all"}} {shared}')
+    return lines
+
+
+metrics.register_collector(_queue_lines)
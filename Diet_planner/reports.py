@@ -0,0 +1,262 @@
+"""
+HTML diet reports, one at a time for the app or in bulk for coaching staff.
+
+    python reports.py clients.jsonl weekly_reports.zip --workers 4
+    python reports.py clients.jsonl weekly_reports/
+
+Each input line describes one client: `id`, `user_profile` (or the profile
+fields at the top level), the meal plan as `plan` (MealPlan.to_dict()) or
+`meal_plan_text`, `tracker_summary` and `motivation`. batch.py output rows
+are accepted as they are. Reports are rendered in worker processes and
+written one by one, next to a single shared report.css and an index.html.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from meal_plan import MealPlan, load_meal_plan, parse_meal_plan
+
+REPORT_CSS = """
+body {
+    font-family: 'Arial', sans-serif; line-height: 1.6; color: #333;
+    max-width: 800px; margin: 0 auto; padding: 20px;
+    background-color: #f4f4f4; border: 1px solid #ddd;
+    box-shadow: 0 0 10px rgba(0,0,0,0.1);
+    direction: rtl; text-align: right;
+}
+h1, h2, h3 { color: #2c3e50; text-align: center; }
+.container {
+    background-color: #fff; padding: 30px; border-radius: 8px; margin-top: 20px;
+}
+.section-title {
+    font-size: 24px; color: #34495e; border-bottom: 2px solid #34495e;
+    padding-bottom: 10px; margin-bottom: 20px; text-align: right;
+}
+.content-box {
+    background-color: #f9f9f9; border: 1px solid #eee; border-radius: 5px;
+    padding: 15px; margin-bottom: 15px; white-space: pre-wrap;
+    text-align: right; word-wrap: break-word;
+}
+.user-profile-table { width: 100%; border-collapse: collapse; margin-bottom: 20px; }
+.user-profile-table th, .user-profile-table td { border: 1px solid #ddd; padding: 8px; text-align: right; }
+.user-profile-table th { background-color: #e9ecef; width: 30%; }
+.meal-section h4 { margin: 10px 0 5px; color: #2c3e50; }
+.meal-section ul { margin: 0 0 10px; padding-right: 20px; }
+.meal-total { font-weight: bold; margin-top: 10px; }
+.footer { text-align: center; margin-top: 40px; font-size: 0.9em; color: #777; }
+""".strip()
+
+INLINE_STYLES = f"<style>\n{REPORT_CSS}\n</style>"
+LINKED_STYLES = '<link rel="stylesheet" href="report.css">'
+
+# (label, profile key, unit, fallback)
+PROFILE_ROWS = (
+    ("الاسم", "name", "", "غير متوفر"),
+    ("الوزن", "weight", " كجم", "غير متوفر"),
+    ("الطول", "height", " سم", "غير متوفر"),
+    ("العمر", "age", " سنة", "غير متوفر"),
+    ("الجنس", "sex", "", "غير متوفر"),
+    ("مستوى النشاط", "activity_level", "", "غير متوفر"),
+    ("الهدف", "goal", "", "غير متوفر"),
+    ("نوع النظام الغذائي", "diet_type", "", "غير متوفر"),
+    ("الحساسيات الغذائية", "allergy", "", "لا يوجد"),
+    ("الحالات الطبية", "conditions", "", "لا يوجد"),
+)
+
+# Parsed once at import; rendering is a single format_map over escaped values.
+REPORT_TEMPLATE = """<!DOCTYPE html>
+<html lang="ar" dir="rtl">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>تقرير النظام الغذائي - {username}</title>
+{styles}
+</head>
+<body>
+<div class="container">
+<h1>تقرير النظام الغذائي الشامل</h1>
+<h3>تاريخ التقرير: {report_date}</h3>
+<hr>
+<h2 class="section-title">بيانات المستخدم</h2>
+<table class="user-profile-table">
+{profile_rows}
+</table>
+<h2 class="section-title">خطة الوجبات</h2>
+<div class="content-box">{meal_plan}</div>
+<h2 class="section-title">ملخص تقييم الالتزام</h2>
+<div class="content-box">{tracker_summary}</div>
+<h2 class="section-title">التحفيز والنصائح</h2>
+<div class="content-box">{motivation}</div>
+<div class="footer">تم إنشاء هذا التقرير بواسطة مساعد النظام الغذائي الذكي الخاص بك.</div>
+</div>
+</body>
+</html>
+"""
+
+
+def render_meal_plan_html(plan):
+    parts = []
+    for note in plan.notes:
+        parts.append(f'<p>{escape(note)}</p>')
+    for section in plan.sections:
+        items = "".join(f'<li>{escape(item.text)}</li>' for item in section.items)
+        heading = f'<h4>{escape(section.heading)}</h4>' if section.heading else ""
+        parts.append(f'<div class="meal-section">{heading}<ul>{items}</ul></div>')
+    if plan.total_line:
+        parts.append(f'<p class="meal-total">{escape(plan.total_line)}</p>')
+    return "".join(parts)
+
+
+def _text_html(text):
+    return escape(str(text)).replace("\n", "<br>")
+
+
+def render_report(report_data, styles=INLINE_STYLES, report_date=None):
+    """
+    Full HTML report for one user.
+
+    `report_data` has username, meal_plan (a MealPlan or plain text),
+    tracker_summary, motivation and user_profile. `styles` is the <head>
+    markup for the CSS: inline for a single download, LINKED_STYLES when the
+    report sits next to a shared report.css.
+    """
+    username = report_data.get("username")
+    meal_plan = report_data.get("meal_plan", "لا توجد خطة وجبات متاحة.")
+    user_profile = report_data.get("user_profile") or {}
+    profile_rows = "\n".join(
+        f"<tr><th>{label}</th><td>{escape(str(user_profile.get(key, fallback)))}"
+        f"{unit if key in user_profile else ''}</td></tr>"
+        for label, key, unit, fallback in PROFILE_ROWS
+    )
+    return REPORT_TEMPLATE.format_map({
+        "username": escape(username if username and username != "الزائر" else "العميل"),
+        "styles": styles,
+        "report_date": report_date or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "profile_rows": profile_rows,
+        "meal_plan": render_meal_plan_html(meal_plan) if isinstance(meal_plan, MealPlan) else _text_html(meal_plan),
+        "tracker_summary": _text_html(report_data.get("tracker_summary", "لا يوجد تقييم التزام متاح.")),
+        "motivation": _text_html(report_data.get("motivation", "لا يوجد تحفيز متاح.")),
+    })
+
+
+def read_report_rows(path):
+    """
+    Yields (row_id, report_data) from a JSONL export; row ids default to the 1-based line number.
+    """
+    with open(path, encoding="utf-8-sig") as f:
+        for position, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            profile = row.get("user_profile") or {key: row[key] for _, key, _, _ in PROFILE_ROWS if key in row}
+            row_id = row.get("id")
+            yield str(position if row_id in (None, "") else row_id), {
+                "username": row.get("username") or row.get("name") or profile.get("name"),
+                "user_profile": profile,
+                "plan": row.get("plan"),
+                "meal_plan_text": row.get("meal_plan_text"),
+                "tracker_summary": row.get("tracker_summary", "لا يوجد تقييم التزام متاح."),
+                "motivation": row.get("motivation", "لا يوجد تحفيز متاح."),
+            }
+
+
+def _render_row(row, report_date):
+    row_id, data = row
+    plan = load_meal_plan({"plan": data["plan"]}) if data["plan"] else None
+    if plan is None and data["meal_plan_text"]:
+        plan = parse_meal_plan(data["meal_plan_text"])
+    report_data = dict(data, meal_plan=plan or "لا توجد خطة وجبات متاحة.")
+    return row_id, data["username"], render_report(report_data, styles=LINKED_STYLES, report_date=report_date)
+
+
+def _bounded_map(executor, fn, items, window, *args):
+    """
+    executor.map() that keeps at most `window` items in flight, so results are not buffered for the whole input.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def report_filename(row_id, username):
+    safe_name = re.sub(r"[^\w\-]+", "_", username or "", flags=re.UNICODE).strip("_")
+    return f"{row_id}_{safe_name}.html" if safe_name else f"{row_id}.html"
+
+
+class _DirectoryWriter:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, name, text):
+        with open(os.path.join(self.path, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def close(self):
+        pass
+
+
+class _ZipWriter:
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+
+    def write(self, name, text):
+        self.zip.writestr(name, text)
+
+    def close(self):
+        self.zip.close()
+
+
+def export_reports(rows, output, workers=4, log=sys.stderr):
+    """
+    Renders every (row_id, report_data) into `output` (a .zip path or a directory) and returns the report count.
+    """
+    writer = _ZipWriter(output) if output.lower().endswith(".zip") else _DirectoryWriter(output)
+    report_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    index = []
+    started = time.perf_counter()
+    try:
+        writer.write("report.css", REPORT_CSS)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for row_id, username, html in _bounded_map(executor, _render_row, rows, workers * 4, report_date):
+                name = report_filename(row_id, username)
+                writer.write(name, html)
+                index.append(f'<li><a href="{escape(name)}">{escape(username or row_id)}</a></li>')
+                if len(index) % 500 == 0:
+                    print(f"{len(index)} reports written", file=log)
+        writer.write("index.html", (
+            f'<!DOCTYPE html>\n<html lang="ar" dir="rtl">\n<head>\n<meta charset="UTF-8">\n'
+            f'<title>تقارير النظام الغذائي - {report_date}</title>\n{LINKED_STYLES}\n</head>\n'
+            f'<body>\n<div class="container">\n<h1>تقارير النظام الغذائي</h1>\n<h3>{report_date}</h3>\n'
+            f'<ul>\n{chr(10).join(index)}\n</ul>\n</div>\n</body>\n</html>\n'
+        ))
+    finally:
+        writer.close()
+    print(f"{len(index)} reports in {time.perf_counter() - started:.1f} s -> {output}", file=log)
+    return len(index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export HTML diet reports for many users.")
+    parser.add_argument("input", help="JSONL file, one client per line")
+    parser.add_argument("output", help="a .zip file or a directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="rendering processes")
+    args = parser.parse_args(argv)
+    export_reports(read_report_rows(args.input), args.output, workers=args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
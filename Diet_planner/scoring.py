@@ -0,0 +1,92 @@
+from difflib import SequenceMatcher
+
+from arabic import tokenize
+from meal_plan import MealPlan, parse_meal_plan
+
+# Meal names, quantities and filler words that say nothing about which food was eaten.
+STOPWORDS = {
+    "فطور", "افطار", "فطار", "غداء", "غدا", "عشاء", "عشا", "سناكس", "سناك", "وجبه", "وجبات", "خفيفه",
+    "تحليه", "حلو", "اليوم", "اكلت", "تناولت", "شربت",
+    "مع", "من", "او", "في", "علي", "الي", "عن", "مثل", "غير", "قليل", "كثير", "بدون", "ثم", "بعض",
+    "كوب", "اكواب", "ملعقه", "ملاعق", "حفنه", "طبق", "شريحه", "شرائح", "قطعه", "قطع", "ثمره", "حبه",
+    "نصف", "ربع", "صغير", "صغيره", "كبير", "كبيره", "متوسط", "جم", "جرام", "غرام", "مل", "g",
+    "الدسم", "دسم", "رشه", "مقطع", "مشكله", "طازجه", "طازج",
+}
+FUZZY_THRESHOLD = 0.8
+# An item whose description names this many matched food words counts as fully eaten.
+ITEM_FULL_MATCH_TOKENS = 2
+
+COMMITMENT_BANDS = (
+    (85, "🟢🔥"),
+    (70, "🟡👍"),
+    (50, "🟠⚠️"),
+    (0, "🔴❌"),
+)
+
+
+def commitment_emoji(percentage):
+    for threshold, emoji in COMMITMENT_BANDS:
+        if percentage >= threshold:
+            return emoji
+    return COMMITMENT_BANDS[-1][1]
+
+
+def food_tokens(text):
+    return [token for token in tokenize(text) if token not in STOPWORDS and not token.isdigit()]
+
+
+def _token_matches(token, candidates):
+    if token in candidates:
+        return True
+    if len(token) < 3:
+        return False
+    for candidate in candidates:
+        if len(candidate) < 3 or abs(len(candidate) - len(token)) > 3:
+            continue
+        if candidate.startswith(token) or token.startswith(candidate):
+            return True
+        if SequenceMatcher(None, token, candidate).ratio() >= FUZZY_THRESHOLD:
+            return True
+    return False
+
+
+def score_commitment(planned_meal, eaten_meal):
+    """
+    Scores how much of the planned meals (a MealPlan or plan text) appear in the eaten-meal text.
+
+    Each plan item scores by how many of its food words are found (fuzzily)
+    in the eaten text, with full marks at ITEM_FULL_MATCH_TOKENS; the
+    percentage is the mean over all items. `confidence` is the share of eaten
+    food words that matched something in the plan, so a low value means the
+    eaten text is mostly unrecognised and the number should not be trusted
+    on its own.
+    """
+    plan = planned_meal if isinstance(planned_meal, MealPlan) else parse_meal_plan(planned_meal)
+    eaten_tokens = set(food_tokens(eaten_meal))
+    plan_tokens = set()
+    item_scores = []
+    matched_items = []
+    missed_items = []
+    for item in plan.items:
+        tokens = set(food_tokens(item.name))
+        if not tokens:
+            continue
+        plan_tokens.update(tokens)
+        hits = sum(1 for token in tokens if _token_matches(token, eaten_tokens))
+        item_scores.append(min(1.0, hits / min(len(tokens), ITEM_FULL_MATCH_TOKENS)))
+        (matched_items if hits else missed_items).append(item.text)
+
+    percentage = round(100 * sum(item_scores) / len(item_scores)) if item_scores else 0
+    if eaten_tokens and item_scores:
+        recognised = sum(1 for token in eaten_tokens if _token_matches(token, plan_tokens))
+        confidence = recognised / len(eaten_tokens)
+    else:
+        confidence = 0.0
+    return {
+        "percentage": percentage,
+        "emoji": commitment_emoji(percentage),
+        "confidence": round(confidence, 3),
+        "sections": len(plan.sections),
+        "matched_items": matched_items,
+        "missed_items": missed_items,
+    }
@@ -0,0 +1,88 @@
+"""
+Server-side session state for the Dash pages.
+
+The meal plan, tracker summary, motivation text and user profile used to
+travel in the browser's dcc.Store components and were re-uploaded as State
+on most callbacks. They now stay on the server: every page load gets a
+session id, and each store only holds a small reference
+{"sid": <session id>, "rev": <write time>} to the value saved under that
+session. `rev` changes on every write so callbacks listening to the store
+still fire.
+
+Each slot value is saved together with its `rev`. Under gunicorn every
+worker has its own memory tier in front of the shared SQLite file, so a
+memory copy older than the reference being read is skipped for the disk row.
+"""
+import os
+import re
+import secrets
+import time
+
+from cache import TTLCache
+
+SLOTS = ("user_inputs", "meal_plan", "tracker", "motivation")
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+
+def new_session_id():
+    return secrets.token_urlsafe(16)
+
+
+def valid_id(value):
+    """
+    Whether a browser-supplied session or user key looks like one new_session_id() made.
+    """
+    return isinstance(value, str) and bool(_SESSION_ID.match(value))
+
+
+class SessionStore:
+    """
+    Per-session slot values in a TTLCache: a bounded in-memory LRU that
+    spills to SQLite, so sessions pushed out of memory are still served from
+    disk until they expire. A slot expires `ttl` seconds after its last write.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def put(self, session_id, slot, value):
+        """
+        Saves `value` under the session's `slot` and returns the reference to put in the store.
+        """
+        if slot not in SLOTS:
+            raise ValueError(f"Unknown session slot: {slot}")
+        if not valid_id(session_id):
+            raise ValueError("Invalid session id")
+        rev = time.time_ns()
+        self.cache.set(f"{session_id}:{slot}", {"rev": rev, "value": value})
+        return {"sid": session_id, "rev": rev}
+
+    def get(self, ref, slot, default=None):
+        """
+        The value a store reference points to, or `default` when there is none or it expired.
+        """
+        session_id = ref.get("sid") if isinstance(ref, dict) else None
+        if not valid_id(session_id):
+            return default
+        key = f"{session_id}:{slot}"
+        entry = self.cache.get(key)
+        if entry is not None and entry["rev"] < (ref.get("rev") or 0):
+            # Written by another worker since this one cached it.
+            entry = self.cache.get(key, memory=False)
+        return entry["value"] if entry is not None else default
+
+    def clear(self, session_id):
+        for slot in SLOTS:
+            self.cache.delete(f"{session_id}:{slot}")
+
+    def stats(self):
+        return self.cache.stats()
+
+
+session_store = SessionStore(TTLCache(
+    os.getenv("SESSION_STORE_PATH", "sessions.db"),
+    table="sessions",
+    max_items=int(os.getenv("SESSION_MAX_ITEMS", "2048")),
+    max_disk_items=int(os.getenv("SESSION_MAX_DISK_ITEMS", "100000")),
+    ttl=int(os.getenv("SESSION_TTL", str(24 * 3600)))
+))
@@ -0,0 +1,141 @@
+import threading
+import time
+from concurrent.futures import Future
+
+
+class _Call:
+    __slots__ = ("future", "started_at", "waiters")
+
+    def __init__(self):
+        self.future = Future()
+        self.started_at = time.time()
+        self.waiters = 0
+
+
+class _Abandoned(Exception):
+    """
+    Set on a call whose leader stopped for a reason of its own; its waiters start over.
+    """
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for, and receive, the same result or exception. Thread
+    callers use do(), asyncio callers use do_async(); both share the same
+    in-flight calls. Nothing is cached once the call completes.
+
+    Exceptions in `private_errors` belong to the leader alone (e.g. its own
+    job being cancelled): they are raised to the leader only, and the
+    waiters run the call again, one of them as the new leader.
+    """
+
+    def __init__(self, name, private_errors=()):
+        self.name = name
+        self.private_errors = tuple(private_errors)
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "executions": 0, "shared": 0, "abandoned": 0}
+
+    def _join(self, key):
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["shared"] += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self._stats["executions"] += 1
+            return call, True
+
+    def _complete(self, key, call, result=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            call.future.set_exception(error)
+        else:
+            call.future.set_result(result)
+
+    def _abandon(self, key, call):
+        with self._lock:
+            self._stats["abandoned"] += 1
+        self._complete(key, call, error=_Abandoned())
+
+    def do(self, key, fn, *args, **kwargs):
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return call.future.result()
+            except _Abandoned:
+                continue
+        try:
+            result = fn(*args, **kwargs)
+        except self.private_errors:
+            self._abandon(key, call)
+            raise
+        except BaseException as e:
+            self._complete(key, call, error=e)
+            raise
+        self._complete(key, call, result=result)
+        return result
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """
+        Awaitable variant; `fn` may be a coroutine function or a blocking one (run in the default executor).
+        """
+        import asyncio
+
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return await asyncio.wrap_future(call.future)
+            except _Abandoned:
+                continue
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                result = await fn(*args, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(None, lambda: fn(*args, **kwargs))
+        except self.private_errors:
+            self._abandon(key, call)
+            raise
+        except BaseException as e:
+            self._complete(key, call, error=e)
+            raise
+        self._complete(key, call, result=result)
+        return result
+
+    def inflight(self):
+        now = time.time()
+        with self._lock:
+            return [{"key": key, "age_s": round(now - call.started_at, 3), "waiters": call.waiters}
+                    for key, call in self._calls.items()]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["inflight"] = len(self._calls)
+        return stats
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def get_flight(name, private_errors=()):
+    with _groups_lock:
+        if name not in _groups:
+            _groups[name] = SingleFlight(name, private_errors)
+        return _groups[name]
+
+
+def inflight_snapshot():
+    return {name: {"stats": group.stats(), "inflight": group.inflight()} for name, group in _groups.items()}
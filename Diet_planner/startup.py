@@ -0,0 +1,102 @@
+"""
+Boot-time accounting for the app.
+
+In-process, app.py calls mark() after each startup phase and /startup serves
+the result. From the command line this module imports a target module under
+`python -X importtime` and prints where the import time goes:
+
+    python startup.py            # breakdown for `import app`
+    python startup.py --json     # machine-readable, to track across commits
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+
+BOOT_STARTED = time.perf_counter()
+_last_mark = BOOT_STARTED
+_phases = []
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def mark(phase):
+    """
+    Records the time spent since the previous mark (or process boot) under `phase`.
+    """
+    global _last_mark
+    now = time.perf_counter()
+    _phases.append((phase, round((now - _last_mark) * 1000, 3)))
+    _last_mark = now
+
+
+def startup_report():
+    from agents import registry
+
+    return {
+        "phases_ms": dict(_phases),
+        "total_ms": round((_last_mark - BOOT_STARTED) * 1000, 3),
+        "lazy_builds_ms": registry.build_timings(),
+    }
+
+
+def profile_imports(module="app", python=sys.executable):
+    """
+    Runs `import <module>` in a fresh interpreter with -X importtime and parses the timings.
+    """
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=None
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({"module": name, "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+                            "depth": len(indent) // 2})
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    return entries
+
+
+def summarize(entries, top=15):
+    by_package = {}
+    for entry in entries:
+        package = entry["module"].split(".")[0]
+        by_package[package] = by_package.get(package, 0) + entry["self_us"]
+    total_us = sum(entry["self_us"] for entry in entries)
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "packages_ms": {name: round(us / 1000, 1) for name, us in
+                        sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]},
+        "slowest_modules_ms": {entry["module"]: round(entry["cumulative_us"] / 1000, 1) for entry in
+                               sorted(entries, key=lambda item: item["cumulative_us"], reverse=True)[:top]},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Break down the import time of a module.")
+    parser.add_argument("module", nargs="?", default="app")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    summary = summarize(profile_imports(args.module), top=args.top)
+    if args.json:
+        print(json.dumps(summary))
+        return 0
+    print(f"import {args.module}: {summary['total_ms']} ms")
+    print("\nself time by top-level package:")
+    for name, ms in summary["packages_ms"].items():
+        print(f"  {ms:>9.1f} ms  {name}")
+    print("\nslowest modules (cumulative):")
+    for name, ms in summary["slowest_modules_ms"].items():
+        print(f"  {ms:>9.1f} ms  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+
+
+class StreamBuffer:
+    """
+    Accumulates text chunks from a producer thread and lets any number of readers follow along.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.created_at = time.time()
+        self.first_chunk_at = None
+        self.finished_at = None
+        self._cond = threading.Condition()
+
+    def append(self, text):
+        with self._cond:
+            if self.first_chunk_at is None:
+                self.first_chunk_at = time.time()
+            self.chunks.append(text)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.done = True
+            self.error = error
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    @property
+    def text(self):
+        with self._cond:
+            return "".join(self.chunks)
+
+    def follow(self, timeout=15):
+        """
+        Yields chunks as they arrive, starting from the first one. Yields None on idle timeouts.
+        """
+        position = 0
+        while True:
+            with self._cond:
+                if position >= len(self.chunks) and not self.done:
+                    self._cond.wait(timeout)
+                pending = self.chunks[position:]
+                position += len(pending)
+                finished = self.done and position >= len(self.chunks)
+            if pending:
+                yield "".join(pending)
+            elif not finished:
+                yield None
+            if finished:
+                return
+
+
+class StreamRegistry:
+    """
+    Stream buffers by id. Finished buffers are dropped `retention` seconds after
+    they finish, and unfinished ones `max_age` seconds after they were created.
+    """
+
+    def __init__(self, retention=300, max_age=3600):
+        self.retention = retention
+        self.max_age = max_age
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def get_or_create(self, stream_id):
+        self._purge()
+        with self._lock:
+            buffer = self._buffers.get(stream_id)
+            if buffer is None:
+                buffer = self._buffers[stream_id] = StreamBuffer()
+            return buffer
+
+    def get(self, stream_id):
+        with self._lock:
+            return self._buffers.get(stream_id)
+
+    def _purge(self):
+        now = time.time()
+        cutoff = now - self.retention
+        with self._lock:
+            stale = [key for key, buffer in self._buffers.items()
+                     if buffer.done and buffer.finished_at < cutoff]
+            abandoned = [key for key, buffer in self._buffers.items()
+                         if not buffer.done and buffer.created_at < now - self.max_age]
+            expired = [self._buffers.pop(key) for key in abandoned]
+            for key in stale:
+                del self._buffers[key]
+        # Let anyone still following an abandoned buffer see it end.
+        for buffer in expired:
+            buffer.finish(error="stream expired")
+
+
+def sse_events(buffer, heartbeat=15):
+    """
+    Renders a StreamBuffer as Server-Sent Events: `chunk` events, then `done` or `error`.
+    """
+    for text in buffer.follow(timeout=heartbeat):
+        if text is None:
+            yield ": keep-alive\n\n"
+        else:
+            yield f"event: chunk\ndata: {json.dumps({'text': text}, ensure_ascii=False)}\n\n"
+    if buffer.error:
+        yield f"event: error\ndata: {json.dumps({'error': buffer.error}, ensure_ascii=False)}\n\n"
+    else:
+        yield "event: done\ndata: {}\n\n"
+
+
+stream_registry = StreamRegistry(max_age=int(os.getenv("STREAM_MAX_AGE", "3600")))
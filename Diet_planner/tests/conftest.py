@@ -0,0 +1,11 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the module-level caches in memory instead of creating .db files in the working directory.
+for name in ("PLAN_CACHE_PATH", "SESSION_STORE_PATH", "MOTIVATION_LIBRARY_PATH", "SPOONACULAR_CACHE_PATH",
+             "AGENT_JOB_DB_PATH"):
+    os.environ.setdefault(name, "")
+# A fixed signing key, so importing auth does not write auth_secret.key either.
+os.environ.setdefault("AUTH_SECRET_KEY", "test-secret")
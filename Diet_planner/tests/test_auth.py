@@ -0,0 +1,46 @@
+import threading
+
+import pytest
+
+flask = pytest.importorskip("flask")
+
+import auth
+
+
+def test_load_secret_key_is_generated_once_and_shared(tmp_path):
+    path = str(tmp_path / "auth_secret.key")
+    keys = []
+    threads = [threading.Thread(target=lambda: keys.append(auth.load_secret_key(path))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(keys)) == 1 and len(keys[0]) == 64
+    assert auth.load_secret_key(path) == keys[0]
+    assert [p.name for p in tmp_path.iterdir()] == ["auth_secret.key"]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(auth.authenticator, "limiter", auth.AttemptLimiter(max_attempts=3, window=300))
+    monkeypatch.setattr(auth.authenticator, "login", lambda email, password: (None, "wrong"))
+    server = flask.Flask(__name__)
+    auth.init_app(server, required=False)
+    return server.test_client()
+
+
+def post_login(client, address, email="owner@example.com"):
+    return client.post("/login", data={"email": email, "password": "guess"},
+                       environ_base={"REMOTE_ADDR": address}).status_code
+
+
+def test_failed_logins_from_one_address_do_not_lock_out_another(client):
+    assert [post_login(client, "10.0.0.1") for _ in range(3)] == [401, 401, 401]
+    assert post_login(client, "10.0.0.1") == 429
+    assert post_login(client, "10.0.0.2") == 401
+
+
+def test_address_bucket_covers_every_email(client):
+    for n in range(3):
+        post_login(client, "10.0.0.1", f"user{n}@example.com")
+    assert post_login(client, "10.0.0.1", "other@example.com") == 429
@@ -0,0 +1,57 @@
+import io
+import json
+
+import pytest
+
+pytest.importorskip("crewai")
+
+import batch  # noqa: E402
+from agents.llm_backends import SAMPLE_MEAL_PLAN, FakeStreamingLLM  # noqa: E402
+from cache import plan_cache  # noqa: E402
+
+PROFILES = [
+    {"id": "a", "name": "سارة", "weight": 64, "height": 165, "age": 29, "sex": "أنثى",
+     "activity_level": "خفيف", "goal": "فقدان الوزن"},
+    {"id": "b", "name": "خالد", "weight": 90, "height": 182, "age": 41, "sex": "ذكر",
+     "activity_level": "نشط", "goal": "زيادة الوزن", "allergy": "مكسرات"},
+    {"id": "c", "name": "ناقص", "weight": 70},
+]
+
+
+@pytest.fixture
+def profiles(tmp_path):
+    path = tmp_path / "profiles.jsonl"
+    path.write_text("\n".join(json.dumps(profile, ensure_ascii=False) for profile in PROFILES), encoding="utf-8")
+    return str(path)
+
+
+def _records(path):
+    with open(path, encoding="utf-8") as f:
+        return {record["id"]: record for record in map(json.loads, f)}
+
+
+def test_fake_llm_batch_round_trip_leaves_the_plan_cache_alone(profiles, tmp_path):
+    output = str(tmp_path / "plans.jsonl")
+    writes = plan_cache.stats()["writes"]
+    llm = FakeStreamingLLM(first_token_delay=0, chunk_delay=0)
+
+    summary = batch.run_batch(profiles, output, concurrency=2, llm=llm, log=io.StringIO())
+
+    assert (summary["ok"], summary["error"], summary["skipped"]) == (2, 1, 0)
+    records = _records(output)
+    assert records["a"]["meal_plan_text"] == records["b"]["meal_plan_text"] == SAMPLE_MEAL_PLAN
+    assert records["c"]["status"] == "error" and "missing fields" in records["c"]["error"]
+    assert plan_cache.stats()["writes"] == writes
+
+    # A rerun resumes from the output file: only the failed row is tried again.
+    summary = batch.run_batch(profiles, output, concurrency=2, llm=llm, log=io.StringIO())
+    assert (summary["ok"], summary["error"], summary["skipped"]) == (0, 1, 2)
+    assert plan_cache.stats()["writes"] == writes
+
+
+def test_fake_llm_cli_runs_without_the_cache(profiles, tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(batch, "run_batch", lambda *args, **kwargs: calls.append(kwargs) or {"error": 0})
+
+    assert batch.main([profiles, str(tmp_path / "plans.jsonl"), "--fake-llm", "--fake-latency", "0"]) == 0
+    assert calls[0]["use_cache"] is False
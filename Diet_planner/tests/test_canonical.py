@@ -0,0 +1,27 @@
+import pytest
+
+from canonical import canonical_terms, canonical_text
+
+
+@pytest.mark.parametrize("field, text, expected", [
+    ("allergy", "بيض كيوي", ("بيض", "كيوي")),
+    ("allergy", "كيوي بيض", ("بيض", "كيوي")),
+    ("allergy", "gluten, kiwi and eggs", ("بيض", "جلوتين", "kiwi")),
+    ("allergy", "حساسية من الفراولة", ("الفراولة",)),
+    ("conditions", "سكري نوع 2", ("سكري", "نوع 2")),
+    ("diet_type", "كيتو بدون ألبان", ("كيتو", "بدون ألبان")),
+])
+def test_unknown_words_are_kept_after_the_labels(field, text, expected):
+    assert canonical_terms(field, text) == expected
+
+
+@pytest.mark.parametrize("field, text, expected", [
+    ("allergy", "جلوتين، لاكتوز", "جلوتين، لاكتوز"),
+    ("allergy", "لاكتوز و الجلوتين", "جلوتين، لاكتوز"),
+    ("allergy", "gluten, lactose", "جلوتين، لاكتوز"),
+    ("diet_type", "كيتو دايت", "كيتو"),
+    ("diet_type", "", "عادي"),
+    ("conditions", "لا يوجد", "لا يوجد"),
+])
+def test_known_values_are_canonical(field, text, expected):
+    assert canonical_text(field, text) == expected
@@ -0,0 +1,35 @@
+import pytest
+
+from agents import meal_planner_agent
+from agents.meal_planner_agent import prepare_inputs
+from energy import GOAL_ADJUSTMENTS, canonical_goal, energy_targets
+
+# The goal-input dropdown values in app.py.
+DROPDOWN_GOALS = ["فقدان الوزن", "زيادة الوزن", "الحفاظ على الوزن"]
+PROFILE = {"name": "أحمد", "weight": 82, "height": 176, "age": 34, "sex": "ذكر", "activity_level": "متوسط",
+           "diet_type": "عادي", "allergy": "لا يوجد", "conditions": "لا يوجد"}
+
+
+def test_every_dropdown_goal_is_known():
+    assert sorted(DROPDOWN_GOALS) == sorted(GOAL_ADJUSTMENTS)
+    assert canonical_goal("خسارة الوزن") == "فقدان الوزن"
+
+
+@pytest.mark.parametrize("version", sorted(meal_planner_agent.BUCKETED_PROMPT_VERSIONS))
+def test_each_dropdown_goal_gets_its_own_band(monkeypatch, version):
+    monkeypatch.setattr(meal_planner_agent, "MEAL_PLAN_PROMPT_VERSION", version)
+    inputs = {goal: prepare_inputs(dict(PROFILE, goal=goal)) for goal in DROPDOWN_GOALS}
+
+    assert [inputs[goal]["goal"] for goal in DROPDOWN_GOALS] == DROPDOWN_GOALS
+    assert len({(prepared["calorie_min"], prepared["calorie_max"]) for prepared in inputs.values()}) == 3
+    assert inputs["فقدان الوزن"]["calorie_max"] <= inputs["الحفاظ على الوزن"]["calorie_min"]
+    assert inputs["زيادة الوزن"]["calorie_min"] > inputs["الحفاظ على الوزن"]["calorie_min"]
+
+
+def test_sample_inputs_match_their_profile():
+    from prompts import SAMPLE_INPUTS
+
+    sample = SAMPLE_INPUTS["generate_meal_plan_task"]
+    targets = energy_targets(sample)
+    assert {key: sample[key] for key in ("calorie_min", "calorie_max", "protein_g", "carbs_g", "fat_g")} == \
+        {key: targets[key] for key in ("calorie_min", "calorie_max", "protein_g", "carbs_g", "fat_g")}
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from jobs import CANCELLED, DONE, FAILED, JOB_LOST, JobManager
+
+
+def _wait_for_status(manager, job_id, status, timeout=5):
+    deadline = time.time() + timeout
+    while manager.status(job_id)["status"] != status:
+        assert time.time() < deadline, manager.status(job_id)
+        time.sleep(0.01)
+
+
+def test_another_worker_sees_progress_and_result(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    owner, other = JobManager(max_workers=1, path=path), JobManager(max_workers=1, path=path)
+    release = threading.Event()
+
+    def work(job):
+        job.set_progress("half way")
+        release.wait(5)
+        return ["day 1", "day 2"]
+
+    job_id = owner.submit("meal_plan", work)
+    _wait_for_status(other, job_id, "running")
+    assert other.get(job_id) is None
+    assert other.status(job_id)["progress"] == "half way"
+    release.set()
+    _wait_for_status(other, job_id, DONE)
+    assert other.status(job_id)["result"] == ["day 1", "day 2"]
+
+
+def test_cancel_from_another_worker(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    owner, other = JobManager(max_workers=1, path=path), JobManager(max_workers=1, path=path)
+
+    def work(job):
+        while True:
+            job.check_cancelled()
+            time.sleep(0.01)
+
+    job_id = owner.submit("meal_plan", work)
+    _wait_for_status(other, job_id, "running")
+    assert other.cancel(job_id)
+    _wait_for_status(owner, job_id, CANCELLED)
+    assert not other.cancel(job_id)
+
+
+def test_job_of_a_dead_process_is_lost(tmp_path):
+    manager = JobManager(max_workers=1, path=str(tmp_path / "jobs.db"))
+    with manager._store.connection() as conn:
+        conn.execute("INSERT INTO jobs (id, name, streaming, status, progress, owner, created_at) "
+                     "VALUES ('gone', 'meal_plan', 0, 'running', '', 2147483646, ?)", (time.time(),))
+
+    status = manager.status("gone")
+    assert (status["status"], status["error"]) == (FAILED, JOB_LOST)
+    assert manager.status("never-submitted") is None
@@ -0,0 +1,55 @@
+import pytest
+
+from agents.llm_backends import SAMPLE_MEAL_PLAN
+from meal_plan import MealPlan, combine_day_plans, parse_meal_plan
+from reports import render_meal_plan_html
+
+
+def test_sample_plan():
+    plan = parse_meal_plan(SAMPLE_MEAL_PLAN)
+
+    assert [section.heading for section in plan.sections] == ["🍳 الفطور", "🍽️ الغداء", "🥣 العشاء", "🥕 سناكس"]
+    assert plan.sections[1].items[0].grams == 150
+    assert plan.sections[1].items[0].name == "صدر دجاج مشوي متبل بالأعشاب"
+    assert plan.sections[1].items[2].quantity == "4 ملاعق"
+    assert (plan.calories_min, plan.calories_max) == (1800, 2000)
+    assert MealPlan.from_dict(plan.to_dict()).to_text() == plan.to_text()
+
+
+@pytest.mark.parametrize("text", ["- بيض\n- خبز", "1. بيض\n2. خبز", "* بيض\n• خبز"])
+def test_items_before_any_header_go_to_an_untitled_section(text):
+    plan = parse_meal_plan(text)
+
+    assert [(section.heading, [item.text for item in section.items]) for section in plan.sections] == \
+        [("", ["بيض", "خبز"])]
+    assert plan.to_text() == "- بيض\n- خبز"
+    assert "<h4>" not in render_meal_plan_html(plan)
+
+
+@pytest.mark.parametrize("header, heading", [
+    ("**الفطور:**", "الفطور"),
+    ("**🍳 الفطور:**", "🍳 الفطور"),
+    ("**الفطور**:", "الفطور"),
+    ("__الفطور:__", "الفطور"),
+    ("### 🍳 الفطور:", "🍳 الفطور"),
+    ("🍳 الفطور:", "🍳 الفطور"),
+])
+def test_markdown_headers(header, heading):
+    plan = parse_meal_plan(f"{header}\n- بيض\n\n**الغداء:**\n- دجاج")
+
+    assert [section.heading for section in plan.sections] == [heading, "الغداء"]
+    assert [item.text for item in plan.items] == ["بيض", "دجاج"]
+
+
+def test_untitled_items_then_a_section():
+    plan = parse_meal_plan("إليك خطتك المقترحة\n- ماء\n🍳 الفطور:\n- بيض")
+
+    assert plan.notes == ["إليك خطتك المقترحة"]
+    assert [(section.heading, [item.text for item in section.items]) for section in plan.sections] == \
+        [("", ["ماء"]), ("🍳 الفطور", ["بيض"])]
+
+
+def test_combined_untitled_day_is_labelled_by_day():
+    combined = combine_day_plans([parse_meal_plan("- بيض"), parse_meal_plan("🍳 الفطور:\n- شوفان")])
+
+    assert [section.title for section in combined.sections] == ["اليوم الأول", "اليوم الثاني - الفطور"]
@@ -0,0 +1,30 @@
+import random
+
+from cache import TTLCache
+from energy import GOAL_ADJUSTMENTS
+from motivation import BANDS, GOAL_TIPS, MotivationLibrary
+
+
+def _library(path):
+    return MotivationLibrary(TTLCache(path, table="motivation_library"), generate=lambda band: f"message {band}")
+
+
+def test_every_goal_has_tips():
+    assert set(GOAL_TIPS) == set(GOAL_ADJUSTMENTS)
+    library = _library("")
+    for goal in GOAL_ADJUSTMENTS:
+        tip = library.compose(BANDS[0], "سارة", goal, random.Random(0)).split("**📚")[0]
+        assert any(goal_tip in tip for goal_tip in GOAL_TIPS[goal])
+
+
+def test_one_process_holds_the_refresh_lease(tmp_path):
+    path = str(tmp_path / "motivation_library.db")
+    first, second = _library(path), _library(path)
+
+    assert first.hold_lease(60, holder="1")
+    assert not second.hold_lease(60, holder="2")
+    assert first.hold_lease(60, holder="1")
+    # An expired lease goes to whoever asks next.
+    assert first.hold_lease(-1, holder="1")
+    assert second.hold_lease(60, holder="2")
+    assert not first.hold_lease(60, holder="1")
@@ -0,0 +1,30 @@
+import os
+import sqlite3
+
+from nutrition import NUTRITION_DB_PATH, NutritionIndex, build_database
+
+
+def test_rebuild_replaces_the_database_in_one_step(tmp_path):
+    db_path = str(tmp_path / "nutrition.db")
+    sqlite3.connect(db_path).execute("CREATE TABLE stale (id INTEGER)").connection.commit()
+
+    build_database(db_path=db_path)
+
+    assert os.listdir(tmp_path) == ["nutrition.db"]
+    tables = {row[0] for row in sqlite3.connect(db_path).execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert tables == {"foods"}
+
+
+def test_index_builds_a_missing_database_and_reuses_a_fresh_one(tmp_path):
+    db_path = str(tmp_path / "nutrition.db")
+    index = NutritionIndex(db_path=db_path)
+    built_at = os.path.getmtime(db_path)
+
+    assert len(index) > 0 and index.get("بيض") is not None
+    assert len(NutritionIndex(db_path=db_path)) == len(index)
+    assert os.path.getmtime(db_path) == built_at
+
+
+def test_default_path_does_not_depend_on_the_working_directory():
+    assert os.path.isabs(NUTRITION_DB_PATH)
+    assert os.path.dirname(NUTRITION_DB_PATH) == os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
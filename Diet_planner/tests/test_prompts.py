@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from agents.llm_backends import SAMPLE_MEAL_PLAN, interpolate_inputs, render_task_messages
+from agents.tracker_agent import TRACK_PROGRESS_PROMPTS
+from prompts import SAMPLE_INPUTS, prompt_versions
+
+
+def _render(description, inputs):
+    agent = SimpleNamespace(role="role", backstory="backstory", goal="goal")
+    task = SimpleNamespace(description=description, expected_output="expected")
+    return render_task_messages(agent, task, inputs)[1]["content"]
+
+
+def test_tracker_v1_prompt_contains_the_plan():
+    inputs = SAMPLE_INPUTS["track_progress_task"]
+    prompt = _render(TRACK_PROGRESS_PROMPTS["1"], inputs)
+
+    assert SAMPLE_MEAL_PLAN in prompt
+    assert inputs["eaten_meal"] in prompt
+    assert "{planned_meal}" not in prompt
+
+
+def test_interpolation_leaves_other_braces_alone():
+    assert interpolate_inputs('{"goal": "{goal}"} {{goal}}', {"goal": "x"}) == '{"goal": "x"} {x}'
+
+
+def test_every_prompt_version_renders_with_its_sample_inputs():
+    for task, (templates, _, _) in prompt_versions().items():
+        for version, template in templates.items():
+            rendered = interpolate_inputs(template, SAMPLE_INPUTS[task])
+            assert not any("{" + name + "}" in rendered for name in SAMPLE_INPUTS[task]), (task, version)
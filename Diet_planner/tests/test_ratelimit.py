@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from jobs import Job, JobCancelled
+from ratelimit import SharedRateLimiter, is_rate_limit_error
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class HTTPError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@pytest.mark.parametrize("error, expected", [
+    (HTTPError("Too many requests", 429), True),
+    (RateLimitError("quota exceeded"), True),
+    (type("GeminiRateLimitError", (RateLimitError,), {})("quota"), True),
+    (ValueError("meal plan for 1429 kcal"), False),
+    (HTTPError("upstream said 429 once", 500), False),
+])
+def test_rate_limit_errors_are_matched_by_status_or_type(error, expected):
+    assert is_rate_limit_error(error) is expected
+
+
+def test_cancelled_job_stops_waiting_for_the_bucket(tmp_path):
+    limiter = SharedRateLimiter(str(tmp_path / "ratelimit.db"), rate_per_minute=60)
+    limiter.pause(60)
+    job = Job("job", "meal_plan")
+    outcome = []
+
+    def wait():
+        with limiter.cancellable(job.check_cancelled):
+            try:
+                limiter.acquire()
+                outcome.append("acquired")
+            except JobCancelled:
+                outcome.append("cancelled")
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    job._cancel_event.set()
+    thread.join(5)
+
+    assert outcome == ["cancelled"]
+    assert limiter.queue_depth()["interactive"] == (0, 0)
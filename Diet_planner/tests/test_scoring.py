@@ -0,0 +1,51 @@
+import pytest
+
+from agents.llm_backends import SAMPLE_MEAL_PLAN
+from meal_plan import parse_meal_plan
+from scoring import commitment_emoji, score_commitment
+
+EATEN_ALL = ("بيضتان مسلوقتان مع خبز أسمر وشوفان بالحليب والقرفة، صدر دجاج مشوي وسلطة خضراء وأرز بني، "
+             "سمك مشوي مع خضار مشكلة، ومكسرات")
+
+
+@pytest.mark.parametrize("percentage, emoji", [(100, "🟢🔥"), (85, "🟢🔥"), (84, "🟡👍"), (70, "🟡👍"),
+                                               (69, "🟠⚠️"), (50, "🟠⚠️"), (49, "🔴❌"), (0, "🔴❌")])
+def test_commitment_bands(percentage, emoji):
+    assert commitment_emoji(percentage) == emoji
+
+
+def test_eating_the_whole_plan_scores_high_with_confidence():
+    result = score_commitment(SAMPLE_MEAL_PLAN, EATEN_ALL)
+
+    assert result["percentage"] >= 85
+    assert result["emoji"] == "🟢🔥"
+    assert result["confidence"] >= 0.8
+    assert result["sections"] == 4
+    assert not result["missed_items"]
+
+
+def test_eating_part_of_the_plan_scores_in_between():
+    result = score_commitment(SAMPLE_MEAL_PLAN, "بيضتان مسلوقتان وخبز أسمر، ثم بيتزا وبرجر في الغداء والعشاء")
+
+    assert 0 < result["percentage"] < 50
+    assert "بيضتان مسلوقتان" in result["matched_items"]
+    assert "سمك مشوي (150 جم)" in result["missed_items"]
+
+
+def test_unrelated_text_has_low_confidence():
+    result = score_commitment(SAMPLE_MEAL_PLAN, "بيتزا وبرجر ومشروب غازي")
+
+    assert result["percentage"] == 0
+    assert result["confidence"] == 0
+
+
+def test_accepts_a_parsed_plan_and_fuzzy_spelling():
+    plan = parse_meal_plan(SAMPLE_MEAL_PLAN)
+
+    assert score_commitment(plan, EATEN_ALL) == score_commitment(SAMPLE_MEAL_PLAN, EATEN_ALL)
+    assert "صدر دجاج مشوي (150 جم) متبل بالأعشاب" in score_commitment(plan, "صدور الدجاج المشوية")["matched_items"]
+
+
+def test_empty_inputs_score_zero():
+    assert score_commitment("", "بيض")["percentage"] == 0
+    assert score_commitment(SAMPLE_MEAL_PLAN, "")["confidence"] == 0
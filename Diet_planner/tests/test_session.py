@@ -0,0 +1,15 @@
+from cache import TTLCache
+from session import SessionStore, new_session_id
+
+
+def test_worker_sees_a_newer_write_from_another_worker(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first, second = (SessionStore(TTLCache(path, table="sessions")) for _ in range(2))
+    session_id = new_session_id()
+
+    old_ref = first.put(session_id, "meal_plan", {"plan": "old"})
+    assert second.get(old_ref, "meal_plan") == {"plan": "old"}
+
+    new_ref = first.put(session_id, "meal_plan", {"plan": "new"})
+    assert second.get(new_ref, "meal_plan") == {"plan": "new"}
+    assert second.get({"sid": new_session_id()}, "meal_plan", "missing") == "missing"
@@ -0,0 +1,76 @@
+import threading
+import time
+
+from jobs import Job, JobCancelled
+from singleflight import SingleFlight
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flight = SingleFlight("test", private_errors=(JobCancelled,))
+    leader_job, follower_job = Job("leader", "meal_plan"), Job("follower", "meal_plan")
+    runs = []
+
+    def generate(job):
+        runs.append(job.id)
+        if job is leader_job:
+            # Hold the call open until the follower is waiting on it, then cancel only the leader.
+            _wait_for(lambda: flight.inflight() and flight.inflight()[0]["waiters"] == 1)
+            leader_job._cancel_event.set()
+        job.check_cancelled()
+        return f"plan for {job.id}"
+
+    results = {}
+
+    def call(job):
+        try:
+            results[job.id] = flight.do("key", generate, job)
+        except JobCancelled:
+            results[job.id] = "cancelled"
+
+    leader = threading.Thread(target=call, args=(leader_job,))
+    leader.start()
+    _wait_for(lambda: flight.inflight())
+    follower = threading.Thread(target=call, args=(follower_job,))
+    follower.start()
+    leader.join(5)
+    follower.join(5)
+
+    assert results == {"leader": "cancelled", "follower": "plan for follower"}
+    assert runs == ["leader", "follower"]
+    assert flight.stats()["abandoned"] == 1
+
+
+def test_other_errors_are_shared():
+    flight = SingleFlight("test", private_errors=(JobCancelled,))
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("key", fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    threads[0].start()
+    _wait_for(lambda: flight.inflight())
+    threads[1].start()
+    _wait_for(lambda: flight.inflight()[0]["waiters"] == 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == ["boom", "boom"]
+    assert flight.stats()["executions"] == 1
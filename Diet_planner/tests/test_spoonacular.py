@@ -0,0 +1,93 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("crewai")
+
+from agents import tools  # noqa: E402
+from cache import TTLCache  # noqa: E402
+
+RECIPE = {"title": "سلطة عدس", "sourceUrl": "https://example.com/lentils",
+          "nutrition": {"nutrients": [{"name": "Calories", "amount": 320}, {"name": "Protein", "amount": 18}]}}
+OK = (200, {"results": [RECIPE]})
+
+
+class StubSpoonacular:
+    """
+    Local HTTP server answering /recipes/complexSearch with the scripted (status, body) responses in turn.
+    """
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(self.path)
+                status, body = stub.responses.pop(0) if len(stub.responses) > 1 else stub.responses[0]
+                payload = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+
+@pytest.fixture
+def spoonacular(monkeypatch):
+    servers = []
+
+    def start(*responses):
+        stub = StubSpoonacular(responses)
+        servers.append(stub)
+        monkeypatch.setattr(tools, "SPOONACULAR_BASE_URL", stub.url)
+        return stub
+
+    monkeypatch.setenv("SPOONACULAR_API_KEY", "test-key")
+    monkeypatch.setattr(tools, "spoonacular_cache", TTLCache("", table="recipes"))
+    monkeypatch.setattr(tools, "_session", None)
+    yield start
+    for stub in servers:
+        stub.server.shutdown()
+
+
+def search(query="عدس"):
+    return json.loads(tools.SpoonacularTool()._run(json.dumps({"query": query, "calories": 500})))
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_retries_rate_limits_and_server_errors(spoonacular, status):
+    stub = spoonacular((status, {"message": "try again"}), OK)
+
+    assert search() == [{"title": "سلطة عدس", "link": "https://example.com/lentils", "calories": 320,
+                         "protein": 18, "carbs": "N/A", "fats": "N/A"}]
+    assert len(stub.requests) == 2
+    assert "/recipes/complexSearch?" in stub.requests[0]
+
+
+def test_second_search_is_served_from_the_cache(spoonacular):
+    stub = spoonacular(OK)
+
+    assert search() == search()
+    assert len(stub.requests) == 1
+    search("فول")
+    assert len(stub.requests) == 2
+
+
+@pytest.mark.parametrize("response", [(404, {"message": "not found"}), (200, "<html>proxy error</html>"),
+                                      (200, {"results": []})])
+def test_errors_are_returned_and_not_cached(spoonacular, response):
+    stub = spoonacular(response, OK)
+
+    assert "error" in search()[0]
+    assert search()[0]["title"] == "سلطة عدس"
+    assert len(stub.requests) == 2
@@ -0,0 +1,53 @@
+import json
+import threading
+
+from agents.llm_backends import SAMPLE_MEAL_PLAN, FakeStreamingLLM
+from streaming import StreamBuffer, StreamRegistry, sse_events
+
+
+def _fast_llm(text=SAMPLE_MEAL_PLAN):
+    return FakeStreamingLLM(text, first_token_delay=0, chunk_delay=0, chunk_size=8)
+
+
+def test_fake_llm_streams_the_text_in_order():
+    chunks = list(_fast_llm().stream([]))
+
+    assert "".join(chunks) == SAMPLE_MEAL_PLAN
+    assert all(len(chunk) == 8 for chunk in chunks[:-1])
+    assert _fast_llm("abc").complete([]) == "abc"
+
+
+def _produce(buffer, llm, error=None):
+    for text in llm.stream([]):
+        buffer.append(text)
+    buffer.finish(error=error)
+
+
+def test_sse_events_follow_a_producer_to_done():
+    buffer = StreamBuffer()
+    producer = threading.Thread(target=_produce, args=(buffer, FakeStreamingLLM(chunk_size=16)))
+    producer.start()
+    events = list(sse_events(buffer, heartbeat=1))
+    producer.join(5)
+
+    texts = [json.loads(event.split("data: ", 1)[1])["text"] for event in events if event.startswith("event: chunk")]
+    assert "".join(texts) == SAMPLE_MEAL_PLAN == buffer.text
+    assert events[-1] == "event: done\ndata: {}\n\n"
+
+
+def test_sse_events_end_with_the_error():
+    buffer = StreamBuffer()
+    _produce(buffer, _fast_llm("partial"), error="boom")
+    events = list(sse_events(buffer))
+
+    assert events[0].startswith("event: chunk")
+    assert events[-1] == 'event: error\ndata: {"error": "boom"}\n\n'
+
+
+def test_registry_drops_abandoned_buffers():
+    registry = StreamRegistry(retention=0, max_age=-1)
+    abandoned = registry.get_or_create("abandoned")
+    registry.get_or_create("next")
+
+    assert registry.get("abandoned") is None
+    assert abandoned.done and abandoned.error